@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Moorea Life Schedule - Timeline merge benchmark
+Compares the ways of merging the sorted per-(company, week, route)
+streams of the unify stage into route timelines and into the unified
+schedule: a full sort of the concatenation, heapq.merge, and the run
+merge done by list.sort on streams laid end to end
+
+Usage:
+    python benchmarks/bench_merge.py --companies 6 --weeks 26 --departures 60
+"""
+
+import argparse
+import heapq
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from schedule_pipeline import (  # noqa: E402
+    _departure_minute, iter_departures, merge_departures, merge_timelines, split_directions
+)
+from firebase_standin import generate_week_payload  # noqa: E402
+
+
+def best_of(repeat: int, fn: Callable) -> float:
+    """
+    Time a function
+
+    Args:
+        repeat: Number of runs
+        fn: Function to time
+
+    Returns:
+        Median duration in milliseconds
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point
+
+    Args:
+        argv: Command line arguments, defaults to sys.argv
+
+    Returns:
+        Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Benchmark des fusions de flux triés")
+    parser.add_argument('--companies', type=int, default=6, help="nombre de compagnies synthétiques")
+    parser.add_argument('--weeks', type=int, default=26, help="nombre de semaines")
+    parser.add_argument('--departures', type=int, default=60,
+                        help="départs par jour et par direction")
+    parser.add_argument('--repeat', type=int, default=7, help="nombre d'exécutions")
+    args = parser.parse_args(argv)
+
+    week_departures = [
+        list(iter_departures(generate_week_payload(company, 2025, week, args.departures), week, 2025,
+                             {'name': f"Compagnie {company}"}))
+        for company in range(args.companies)
+        for week in range(1, args.weeks + 1)
+    ]
+    streams = [split_directions(departures) for departures in week_departures]
+    timelines = merge_timelines(streams)
+    total = sum(len(departures) for departures in week_departures)
+
+    def full_sort():
+        departures = [d for week in week_departures for d in week]
+        departures.sort(key=_departure_minute)
+
+    def heap_timelines() -> Dict[tuple, List]:
+        by_direction: Dict[tuple, List[List]] = {}
+        for week_streams in streams:
+            for direction, stream in week_streams.items():
+                by_direction.setdefault(direction, []).append(stream)
+        return {direction: list(heapq.merge(*parts, key=_departure_minute))
+                for direction, parts in by_direction.items()}
+
+    timings = {
+        'split (tri de chaque flux)': best_of(args.repeat, lambda: [split_directions(d) for d in week_departures]),
+        'tri complet de la concaténation': best_of(args.repeat, full_sort),
+        'lignes: heapq.merge': best_of(args.repeat, heap_timelines),
+        'lignes: fusion de séquences (list.sort)': best_of(args.repeat, lambda: merge_timelines(streams)),
+        'unifié: heapq.merge des lignes': best_of(
+            args.repeat, lambda: list(heapq.merge(*timelines.values(), key=_departure_minute))
+        ),
+        'unifié: fusion de séquences (list.sort)': best_of(args.repeat, lambda: merge_departures(timelines)),
+    }
+
+    print(f"{total} départs, {len(streams)} semaines de compagnie, médiane de {args.repeat} exécutions")
+    for name, milliseconds in timings.items():
+        print(f"  {name:<42} {milliseconds:8.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
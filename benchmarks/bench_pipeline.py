@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Moorea Life Schedule - Pipeline benchmarks
+Times the fetch, unify and render stages against synthetic payloads served
+by a local Firebase stand-in, and writes machine-readable results that can
+be compared between commits
+
+Usage:
+    python benchmarks/bench_pipeline.py --companies 4 --weeks 8 --departures 12
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/abc1234.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import fetch_schedules  # noqa: E402
+from firebase_http import configure_session_pool  # noqa: E402
+from http_cache import set_http_cache  # noqa: E402
+from firebase_standin import FirebaseStandin, generate_week_payload  # noqa: E402
+
+
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+
+
+def get_commit() -> str:
+    """
+    Get the short hash of the checked out commit
+
+    Returns:
+        Short commit hash, or "unknown" outside of a git checkout
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def summarize(samples: List[float]) -> Dict:
+    """
+    Summarize timing samples
+
+    Args:
+        samples: Durations in seconds
+
+    Returns:
+        Dictionary with min, median, mean and raw runs (seconds)
+    """
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'runs': samples
+    }
+
+
+def timed(samples: Dict[str, List[float]], name: str, fn: Callable, *args, **kwargs):
+    """
+    Run a function with its output silenced and record its duration
+
+    Args:
+        samples: Samples by benchmark name
+        name: Benchmark name
+        fn: Function to time
+        *args: Positional arguments for fn
+        **kwargs: Keyword arguments for fn
+
+    Returns:
+        Return value of fn
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        value = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+    samples.setdefault(name, []).append(elapsed)
+    return value
+
+
+def run_benchmarks(companies_count: int, weeks_count: int, departures_per_day: int,
+                   latency: float, jitter: float, repeat: int, error_rate: float = 0.0,
+                   stall_rate: float = 0.0, stall: float = 5.0) -> Dict:
+    """
+    Run every benchmark against a set of local stand-ins
+
+    Args:
+        companies_count: Number of synthetic companies (one stand-in host each)
+        weeks_count: Number of weeks in the horizon
+        departures_per_day: Departures per day and per direction
+        latency: Latency injected in every stand-in response, in seconds
+        jitter: Maximum random latency added on top, in seconds
+        repeat: Number of runs of each benchmark
+        error_rate: Probability of a stand-in answering with a 503
+        stall_rate: Probability of a stand-in stalling before answering
+        stall: Duration of a stall in seconds
+
+    Returns:
+        Benchmark results
+    """
+    horizon = fetch_schedules.get_horizon_weeks(datetime.now(), weeks_count)
+    current_week, current_year = horizon[0]
+
+    standins = []
+    companies = []
+    for index in range(companies_count):
+        calendar: Dict[int, Dict[int, Dict]] = {}
+        for week, year in horizon:
+            calendar.setdefault(year, {})[week] = generate_week_payload(
+                index, year, week, departures_per_day
+            )
+        standin = FirebaseStandin(calendar, latency=latency, jitter=jitter, error_rate=error_rate,
+                                  stall_rate=stall_rate, stall=stall).start()
+        standins.append(standin)
+        companies.append({
+            'id': f'bench{index}',
+            'name': f'Bench {index}',
+            'firebase': {'databaseURL': standin.url}
+        })
+
+    samples: Dict[str, List[float]] = {}
+    record_counts = set()
+    failed_counts = []
+    previous_dir = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            os.chdir(work_dir)
+            set_http_cache(None)
+
+            for _ in range(repeat):
+                configure_session_pool()
+
+                # One request per (company, week), in sequence
+                def fetch_each_week():
+                    return [
+                        fetch_schedules.fetch_company_schedules(company, week, year)
+                        for company in companies for week, year in horizon
+                    ]
+                timed(samples, 'fetch_company_schedules', fetch_each_week)
+
+                # Concurrent engine with range queries
+                results = timed(samples, 'fetch_all_results', fetch_schedules.fetch_all_results,
+                                companies, horizon)
+                failed_counts.append(sum(1 for r in results if not r['success']))
+
+                timed(samples, 'normalize_results', fetch_schedules.normalize_results, results)
+
+                departures = timed(samples, 'create_unified_horaires_json',
+                                   fetch_schedules.create_unified_horaires_json, results)
+                record_counts.add(len(departures))
+
+                timed(samples, 'generate_multi_company_html',
+                      fetch_schedules.generate_multi_company_html, results, current_week,
+                      current_year, horizon_weeks=weeks_count, departures=departures)
+
+            output_sizes = {name: os.path.getsize(name) for name in ('horaires.json', 'index.html')}
+    finally:
+        os.chdir(previous_dir)
+        for standin in standins:
+            standin.stop()
+
+    return {
+        'commit': get_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'params': {
+            'companies': companies_count,
+            'weeks': weeks_count,
+            'departuresPerDay': departures_per_day,
+            'latency': latency,
+            'jitter': jitter,
+            'repeat': repeat,
+            'errorRate': error_rate,
+            'stallRate': stall_rate,
+            'stall': stall
+        },
+        'records': sorted(record_counts),
+        'requests': sum(standin.request_count for standin in standins),
+        'faults': {fault: sum(standin.fault_counts[fault] for standin in standins)
+                   for fault in FirebaseStandin.FAULTS},
+        'failedWeeks': failed_counts,
+        'outputBytes': output_sizes,
+        'benchmarks': {name: summarize(values) for name, values in samples.items()}
+    }
+
+
+def print_results(results: Dict, baseline: Optional[Dict] = None):
+    """
+    Print a results table, compared with a baseline if given
+
+    Args:
+        results: Output of run_benchmarks
+        baseline: Results of a previous run to compare with
+    """
+    print(f"📊 Commit {results['commit']} - {results['params']}")
+    print(f"   {results['records']} horaires, {results['requests']} requêtes, "
+          f"sorties: {results['outputBytes']}")
+    faults = results.get('faults', {})
+    if any(faults.values()):
+        print(f"   pannes injectées: {faults}, semaines en échec par exécution: {results['failedWeeks']}")
+    header = f"{'benchmark':32} {'médiane (ms)':>14}"
+    if baseline:
+        header += f" {baseline['commit'] + ' (ms)':>16} {'ratio':>8}"
+    print(header)
+
+    for name, summary in results['benchmarks'].items():
+        line = f"{name:32} {summary['median'] * 1000:14.2f}"
+        if baseline:
+            previous = baseline['benchmarks'].get(name)
+            if previous:
+                line += f" {previous['median'] * 1000:16.2f} {summary['median'] / previous['median']:8.2f}"
+            else:
+                line += f" {'-':>16} {'-':>8}"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point
+
+    Args:
+        argv: Command line arguments, defaults to sys.argv
+
+    Returns:
+        Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks du pipeline fetch/unify/render")
+    parser.add_argument('--companies', type=int, default=4, help="nombre de compagnies synthétiques")
+    parser.add_argument('--weeks', type=int, default=2, help="nombre de semaines")
+    parser.add_argument('--departures', type=int, default=10,
+                        help="départs par jour et par direction")
+    parser.add_argument('--latency', type=float, default=0.02, help="latence injectée (s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="latence aléatoire ajoutée (s)")
+    parser.add_argument('--repeat', type=int, default=5, help="nombre d'exécutions")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="probabilité qu'une réponse soit une erreur 503")
+    parser.add_argument('--stall-rate', type=float, default=0.0,
+                        help="probabilité qu'une réponse soit bloquée --stall secondes")
+    parser.add_argument('--stall', type=float, default=5.0, help="durée d'un blocage (s)")
+    parser.add_argument('--output', help="fichier de résultats (défaut: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="résultats d'un commit précédent à comparer")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.companies, args.weeks, args.departures,
+                             args.latency, args.jitter, args.repeat, args.error_rate,
+                             args.stall_rate, args.stall)
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+    print(f"💾 Résultats sauvegardés: {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
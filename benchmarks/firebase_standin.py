@@ -0,0 +1,384 @@
+"""
+Moorea Life Schedule - Local stand-in for the Firebase REST API
+Serves synthetic Calendar/{year}/{week} payloads over HTTP so the fetch
+and streaming paths can be exercised and timed without touching live
+Firebase
+"""
+
+import copy
+import hashlib
+import json
+import queue
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from firebase_stream import apply_stream_event
+
+
+# Synthetic vessel names, including the raw "Aremiti N-xx" form seen in Firebase
+SYNTHETIC_VESSELS = ('Aremiti 5-26v', 'Aremiti 6-12a', 'Terevau', 'VAEARAI', 'Tauati Ferry')
+
+
+def generate_week_payload(company_index: int, year: int, week: int,
+                          departures_per_day: int) -> Dict:
+    """
+    Generate a deterministic week payload in the Firebase format
+
+    Args:
+        company_index: Index of the synthetic company, used as seed
+        year: ISO year
+        week: ISO week number
+        departures_per_day: Departures per day and per direction
+
+    Returns:
+        Payload with MOZ and PPT lists of 7 day dictionaries
+    """
+    rng = random.Random(f"{company_index}/{year}/{week}")
+    vessel = SYNTHETIC_VESSELS[company_index % len(SYNTHETIC_VESSELS)]
+    step = max(1, (18 * 3600) // max(1, departures_per_day))
+
+    payload = {}
+    for destination, origin in (('MOZ', 'PPT'), ('PPT', 'MOZ')):
+        days = []
+        for day in range(7):
+            schedules = {}
+            for idx in range(departures_per_day):
+                time_begin = 5 * 3600 + idx * step + rng.randrange(0, 600, 300)
+                schedules[f'-N{company_index:02d}{day}{idx:04d}'] = {
+                    'day': day,
+                    'timeBegin': time_begin,
+                    'timeEnd': time_begin + 1800,
+                    'origin': origin,
+                    'destination': destination,
+                    'vessel': vessel,
+                    'status': rng.choice((3, 3, 3, 0))
+                }
+            days.append(schedules)
+        payload[destination] = days
+    return payload
+
+
+class FirebaseStandin:
+    """
+    Threaded HTTP server answering like the Firebase REST API
+
+    Serves Calendar/{year}/{week}.json, and Calendar/{year}.json with
+    orderBy="$key" / startAt / endAt range queries, from a dictionary of
+    payloads. Supports X-Firebase-ETag / If-None-Match, an injectable
+    latency per request and fault injection: requests can be answered
+    with a 503 ('error'), answered after a long stall ('stall') or have
+    their connection closed without an answer ('drop'), either scripted
+    with inject() or at random with the given rates.
+
+    Requests for a week with Accept: text/event-stream are answered like
+    the Firebase streaming API: a put of the whole week, then the put and
+    patch events of every push() to that week, with keep-alive events in
+    between.
+    """
+
+    FAULTS = ('error', 'stall', 'drop')
+
+    def __init__(self, calendar: Dict[int, Dict[int, Dict]], latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, stall_rate: float = 0.0,
+                 stall: float = 5.0, keep_alive: float = 30.0):
+        """
+        Args:
+            calendar: Payloads by year then week
+            latency: Delay added to every response in seconds
+            jitter: Maximum random delay added on top of latency in seconds
+            error_rate: Probability of answering a request with a 503
+            stall_rate: Probability of stalling a request before answering
+            stall: Duration of a stall in seconds
+            keep_alive: Seconds between keep-alive events of idle streams
+        """
+        self.calendar = calendar
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.keep_alive = keep_alive
+        self.request_count = 0
+        # Request targets (path and query string) in arrival order
+        self.request_paths: List[str] = []
+        self.fault_counts = {fault: 0 for fault in self.FAULTS}
+        self._faults = deque()
+        self._subscribers: Dict[Tuple[int, int], List[queue.Queue]] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as databaseURL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def resolve(self, path: str, query: Dict[str, List[str]]):
+        """
+        Get the value stored at a REST path
+
+        Args:
+            path: Request path without the .json suffix
+            query: Parsed query string
+
+        Returns:
+            JSON value, or None if nothing is stored there
+        """
+        parts = [part for part in path.split('/') if part]
+        if not parts or parts[0] != 'Calendar':
+            return None
+        if len(parts) == 1:
+            return {str(year): {str(week): data for week, data in weeks.items()}
+                    for year, weeks in self.calendar.items()}
+
+        weeks = self.calendar.get(int(parts[1]), {})
+        if len(parts) == 3:
+            return weeks.get(int(parts[2]))
+        if len(parts) != 2:
+            return None
+
+        start = int(json.loads(query['startAt'][0])) if 'startAt' in query else None
+        end = int(json.loads(query['endAt'][0])) if 'endAt' in query else None
+        selected = {
+            str(week): data for week, data in sorted(weeks.items())
+            if (start is None or week >= start) and (end is None or week <= end)
+        }
+        return selected or None
+
+    def inject(self, *faults: str):
+        """
+        Script the faults of the next requests, in order
+
+        Args:
+            *faults: 'error', 'stall', 'drop', or None for a normal answer
+        """
+        for fault in faults:
+            if fault is not None and fault not in self.FAULTS:
+                raise ValueError(f"Unknown fault: {fault}")
+        with self._lock:
+            self._faults.extend(faults)
+
+    def next_fault(self) -> Optional[str]:
+        """
+        Pick the fault of an incoming request and count the request
+
+        Returns:
+            Fault name, or None for a normal answer
+        """
+        with self._lock:
+            self.request_count += 1
+            if self._faults:
+                fault = self._faults.popleft()
+            elif self.error_rate and random.random() < self.error_rate:
+                fault = 'error'
+            elif self.stall_rate and random.random() < self.stall_rate:
+                fault = 'stall'
+            else:
+                fault = None
+            if fault:
+                self.fault_counts[fault] += 1
+            return fault
+
+    def subscribe(self, year: int, week: int) -> Tuple[queue.Queue, Any]:
+        """
+        Register a streaming subscriber of a week
+
+        Args:
+            year: ISO year
+            week: ISO week number
+
+        Returns:
+            Tuple of (queue receiving (event, message) tuples, None once the
+            stream must end; copy of the week payload at subscription time)
+        """
+        events: queue.Queue = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault((year, week), []).append(events)
+            return events, copy.deepcopy(self.calendar.get(year, {}).get(week))
+
+    def unsubscribe(self, year: int, week: int, events: queue.Queue):
+        """
+        Remove a streaming subscriber
+
+        Args:
+            year: ISO year
+            week: ISO week number
+            events: Queue returned by subscribe()
+        """
+        with self._lock:
+            subscribers = self._subscribers.get((year, week), [])
+            if events in subscribers:
+                subscribers.remove(events)
+
+    def push(self, year: int, week: int, path: str, data, event: str = 'put'):
+        """
+        Change a week payload and notify its streaming subscribers
+
+        Args:
+            year: ISO year
+            week: ISO week number
+            path: Path of the change inside the week, e.g. "/MOZ/2/-N0020001/status"
+            data: New value, None to delete it ('put'), or children to replace ('patch')
+            event: 'put' or 'patch'
+        """
+        with self._lock:
+            weeks = self.calendar.setdefault(year, {})
+            payload = apply_stream_event(weeks.get(week), event, path, copy.deepcopy(data))
+            if payload is None:
+                weeks.pop(week, None)
+            else:
+                weeks[week] = payload
+            for events in self._subscribers.get((year, week), ()):
+                events.put((event, {'path': path, 'data': data}))
+
+    def close_streams(self):
+        """End every open stream, as when the server drops its connections"""
+        with self._lock:
+            for subscribers in self._subscribers.values():
+                for events in subscribers:
+                    events.put(None)
+
+    def delay(self):
+        """Sleep for the configured latency"""
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def handler_class(self):
+        """Build the request handler bound to this stand-in"""
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately: avoid Nagle/delayed ACK stalls
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                standin.request_paths.append(self.path)
+                fault = standin.next_fault()
+                standin.delay()
+
+                if fault == 'drop':
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                if fault == 'error':
+                    self.send_json(503, {'error': 'Service Unavailable'})
+                    return
+                if fault == 'stall':
+                    time.sleep(standin.stall)
+
+                parsed = urlparse(self.path)
+                if not parsed.path.endswith('.json'):
+                    self.send_json(404, {'error': 'Not found'})
+                    return
+                if 'text/event-stream' in self.headers.get('Accept', ''):
+                    self.stream(parsed.path[:-5])
+                    return
+                value = standin.resolve(parsed.path[:-5], parse_qs(parsed.query))
+
+                body = json.dumps(value).encode('utf-8')
+                etag = hashlib.sha1(body).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                headers = {}
+                if self.headers.get('X-Firebase-ETag') == 'true':
+                    headers['ETag'] = etag
+                self.send_body(200, body, headers)
+
+            def stream(self, path: str):
+                parts = [part for part in path.split('/') if part]
+                if len(parts) != 3 or parts[0] != 'Calendar':
+                    self.send_json(400, {'error': 'Streaming is only served for weeks'})
+                    return
+                year, week = int(parts[1]), int(parts[2])
+
+                # Chunked, so each event reaches the client as soon as it is written
+                self.close_connection = True
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                events, value = standin.subscribe(year, week)
+                try:
+                    self.send_event('put', {'path': '/', 'data': value})
+                    while True:
+                        try:
+                            item = events.get(timeout=standin.keep_alive)
+                        except queue.Empty:
+                            self.send_event('keep-alive', None)
+                            continue
+                        if item is None:
+                            break
+                        self.send_event(*item)
+                    self.wfile.write(b'0\r\n\r\n')
+                except OSError:
+                    pass
+                finally:
+                    standin.unsubscribe(year, week, events)
+
+            def send_event(self, event: str, message):
+                chunk = f"event: {event}\ndata: {json.dumps(message, ensure_ascii=False)}\n\n".encode('utf-8')
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                self.wfile.flush()
+
+            def send_json(self, status: int, value):
+                self.send_body(status, json.dumps(value).encode('utf-8'))
+
+            def send_body(self, status: int, body: bytes, headers: Optional[Dict] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> 'FirebaseStandin':
+        """
+        Start serving in a background thread
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on, 0 for any free port
+
+        Returns:
+            The stand-in itself
+        """
+        self._server = ThreadingHTTPServer((host, port), self.handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        self.close_streams()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'FirebaseStandin':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
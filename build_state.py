@@ -0,0 +1,153 @@
+"""
+Moorea Life Schedule - Incremental build state
+Remembers the fingerprint of every (company, week) input and of every
+generated output so unchanged work can be skipped on the next run
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_BUILD_STATE_FILE = '.cache/build_state.json'
+
+# Bumped whenever the format of the cached records changes
+BUILD_STATE_VERSION = 4
+
+
+def fingerprint(value: Any) -> str:
+    """
+    Compute a stable fingerprint of a JSON-serializable value
+
+    Args:
+        value: Value to fingerprint
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+class BuildState:
+    """
+    Fingerprints and cached records carried over between runs
+
+    Inputs are keyed by "{company-id}/{year}/{week}" and keep the flattened
+    records produced from them. Outputs keep the fingerprint of what was
+    written along with the file size and modification time, so a file
+    replaced behind our back (e.g. by a fresh checkout) is rewritten.
+    """
+
+    def __init__(self, path: str = DEFAULT_BUILD_STATE_FILE):
+        """
+        Args:
+            path: File the state is persisted to
+        """
+        self.path = path
+        self.inputs: Dict[str, Dict] = {}
+        self.outputs: Dict[str, Dict] = {}
+        self._dirty = False
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == BUILD_STATE_VERSION:
+                self.inputs = state.get('inputs', {})
+                self.outputs = state.get('outputs', {})
+        except (OSError, ValueError):
+            pass
+
+    def cached_records(self, key: str, input_fingerprint: str) -> Optional[List[Dict]]:
+        """
+        Get the records built from an input if it did not change
+
+        Args:
+            key: Input key
+            input_fingerprint: Fingerprint of the input for this run
+
+        Returns:
+            Cached records, or None if the input is new or changed
+        """
+        entry = self.inputs.get(key)
+        if entry and entry.get('fingerprint') == input_fingerprint:
+            return entry['records']
+        return None
+
+    def record_input(self, key: str, input_fingerprint: str, records: List[Dict]):
+        """
+        Remember the records built from an input
+
+        Args:
+            key: Input key
+            input_fingerprint: Fingerprint of the input
+            records: Records built from it
+        """
+        self.inputs[key] = {'fingerprint': input_fingerprint, 'records': records}
+        self._dirty = True
+
+    def retain_inputs(self, keys: List[str]):
+        """
+        Forget the inputs that are not part of the current run
+
+        Args:
+            keys: Keys of the inputs used in this run
+        """
+        stale = set(self.inputs) - set(keys)
+        for key in stale:
+            del self.inputs[key]
+        if stale:
+            self._dirty = True
+
+    def output_is_current(self, filename: str, output_fingerprint: str) -> bool:
+        """
+        Check whether an output on disk already matches a fingerprint
+
+        Args:
+            filename: Output file
+            output_fingerprint: Fingerprint of the content it should have
+
+        Returns:
+            True if the file exists and was written with that fingerprint
+        """
+        entry = self.outputs.get(filename)
+        if not entry or entry.get('fingerprint') != output_fingerprint:
+            return False
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return False
+        return stat.st_size == entry.get('size') and stat.st_mtime_ns == entry.get('mtime')
+
+    def record_output(self, filename: str, output_fingerprint: str):
+        """
+        Remember the fingerprint of an output that was just written
+
+        Args:
+            filename: Output file
+            output_fingerprint: Fingerprint of its content
+        """
+        stat = os.stat(filename)
+        self.outputs[filename] = {
+            'fingerprint': output_fingerprint,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns
+        }
+        self._dirty = True
+
+    def save(self):
+        """Persist the state if it changed"""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': BUILD_STATE_VERSION,
+                'inputs': self.inputs,
+                'outputs': self.outputs
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -0,0 +1,242 @@
+"""
+Moorea Life Schedule - Client-side rendered page
+Writes a small static index.html shell and a compact columnar payload
+that the browser renders one day at a time, instead of inlining every
+departure in the HTML
+"""
+
+import json
+from datetime import datetime
+from html import escape
+from typing import Dict, List
+
+from schedule_model import Departure, get_routes, route_id
+
+
+DEFAULT_COMPACT_FILE = 'horaires.compact.json'
+
+# Bumped whenever the layout of the compact payload changes
+COMPACT_FORMAT_VERSION = 2
+
+
+def build_compact_payload(departures: List[Departure], now: datetime) -> Dict:
+    """
+    Encode departures as parallel columns
+
+    Departure times are minutes counted from midnight of the first day
+    (given in days since EPOCH as 'baseDay'), vessel names and routes are
+    dictionary-coded, and stale departures are listed by index. The
+    configured routes come first in 'routes', in configuration order, and
+    'labels' gives their names: the page shows one table per label.
+
+    Args:
+        departures: Unified departures sorted by departure time
+        now: Generation time
+
+    Returns:
+        JSON-serializable payload
+    """
+    base_day = departures[0].minute // 1440 if departures else 0
+    base_minute = base_day * 1440
+
+    configured = get_routes()
+    vessels: Dict[str, int] = {}
+    routes: Dict[str, int] = {route.id: index for index, route in enumerate(configured)}
+    minutes = []
+    vessel_codes = []
+    route_codes = []
+    stale = []
+    for index, departure in enumerate(departures):
+        minutes.append(departure.minute - base_minute)
+        vessel_codes.append(vessels.setdefault(departure.vessel, len(vessels)))
+        route = route_id(departure.origin, departure.destination)
+        route_codes.append(routes.setdefault(route, len(routes)))
+        if departure.stale:
+            stale.append(index)
+
+    return {
+        'format': COMPACT_FORMAT_VERSION,
+        'generatedAt': now.isoformat(timespec='seconds'),
+        'baseDay': base_day,
+        'vessels': list(vessels),
+        'routes': list(routes),
+        'labels': [route.label for route in configured],
+        'minute': minutes,
+        'vessel': vessel_codes,
+        'route': route_codes,
+        'stale': stale
+    }
+
+
+def write_compact_payload(departures: List[Departure], now: datetime,
+                          filename: str = DEFAULT_COMPACT_FILE):
+    """
+    Write the compact payload without whitespace
+
+    Args:
+        departures: Unified departures sorted by departure time
+        now: Generation time
+        filename: Output file
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(build_compact_payload(departures, now), f, separators=(',', ':'),
+                  ensure_ascii=False)
+
+
+def render_client_shell(weeks_label: str, horizon_label: str,
+                        data_file: str = DEFAULT_COMPACT_FILE) -> str:
+    """
+    Render the static page shell
+
+    The shell does not depend on the departures: it loads the compact
+    payload and renders today's departures first, then each following day
+    as the visitor scrolls.
+
+    Args:
+        weeks_label: Weeks covered, e.g. "Semaines 47 et 48 de 2025"
+        horizon_label: Horizon described in a sentence
+        data_file: URL of the compact payload, relative to the page
+
+    Returns:
+        HTML document
+    """
+    return f'''<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Horaires Ferries Tahiti-Moorea - Toutes Compagnies</title>
+<style>
+body{{font-family:'Segoe UI',Tahoma,Geneva,Verdana,sans-serif;max-width:1400px;margin:0 auto;padding:20px;background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);color:#333}}
+.container{{background:#fff;border-radius:15px;padding:30px;box-shadow:0 10px 40px rgba(0,0,0,.2)}}
+h1{{color:#667eea;text-align:center;margin-bottom:10px}}
+h2{{color:#764ba2;margin-top:30px}}
+.subtitle{{text-align:center;color:#666;margin-bottom:30px}}
+.info{{background:#f0f4ff;border-left:4px solid #667eea;padding:15px;margin:20px 0;border-radius:5px}}
+.day{{display:flex;flex-wrap:wrap;gap:20px}}
+.day>div{{flex:1 1 300px}}
+.schedule-table{{width:100%;border-collapse:collapse;box-shadow:0 2px 8px rgba(0,0,0,.1);border-radius:8px;overflow:hidden}}
+.schedule-table th{{background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);color:#fff;padding:12px 15px;text-align:left}}
+.schedule-table td{{padding:10px 15px;border-bottom:1px solid #e0e0e0}}
+.vessel-cell{{font-weight:600;color:#667eea}}
+.datetime-cell{{font-family:'Courier New',monospace;font-size:14px}}
+.today h2{{color:#f5576c}}
+.stale{{opacity:.6}}
+.footer{{text-align:center;margin-top:30px;padding-top:20px;border-top:2px solid #e0e0e0;color:#666;font-size:14px}}
+</style>
+</head>
+<body>
+<div class="container">
+<h1>🚢 Horaires Ferries Tahiti-Moorea</h1>
+<div class="subtitle">{escape(weeks_label)}</div>
+<div class="info"><strong>ℹ️ Informations:</strong><br>
+Cette page affiche les horaires de toutes les compagnies maritimes desservant la liaison Tahiti-Moorea pour {escape(horizon_label)}.<br>
+<span id="stale-notice" hidden>⏳ Certaines compagnies n'ont pas pu être mises à jour : leurs horaires proviennent de la dernière récupération réussie.<br></span>
+Dernière mise à jour: <span id="updated">-</span></div>
+<noscript><div class="info">JavaScript est nécessaire pour afficher les horaires. Les données sont disponibles dans <a href="horaires.json">horaires.json</a>.</div></noscript>
+<div id="days"></div>
+<div id="more"></div>
+<div class="footer"><p>🔄 Page générée automatiquement via GitHub Actions</p><p>Projet: Moorea Life Schedule</p></div>
+</div>
+<script>
+(function () {{
+  var DAYS = ['Dimanche', 'Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi'];
+  var MONTHS = ['janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet', 'août',
+                'septembre', 'octobre', 'novembre', 'décembre'];
+  var daysElement = document.getElementById('days');
+  var more = document.getElementById('more');
+
+  function pad(n) {{ return (n < 10 ? '0' : '') + n; }}
+
+  function cell(row, text, className) {{
+    var td = row.insertCell();
+    td.className = className;
+    td.textContent = text;
+  }}
+
+  fetch('{escape(data_file)}').then(function (response) {{ return response.json(); }}).then(function (data) {{
+    var updated = new Date(data.generatedAt);
+    document.getElementById('updated').textContent = pad(updated.getDate()) + '/' +
+      pad(updated.getMonth() + 1) + '/' + updated.getFullYear() + ' à ' + pad(updated.getHours()) +
+      ':' + pad(updated.getMinutes());
+    document.getElementById('stale-notice').hidden = data.stale.length === 0;
+
+    var stale = {{}};
+    data.stale.forEach(function (index) {{ stale[index] = true; }});
+
+    // Days as [day since EPOCH, first index, end index], minutes being sorted
+    var days = [];
+    for (var i = 0; i < data.minute.length; i++) {{
+      var day = data.baseDay + Math.floor(data.minute[i] / 1440);
+      if (!days.length || days[days.length - 1][0] !== day) days.push([day, i, i]);
+      days[days.length - 1][2] = i + 1;
+    }}
+
+    var now = new Date();
+    var today = Math.floor((now.getTime() - now.getTimezoneOffset() * 60000) / 86400000);
+    var next = 0;
+    while (next < days.length - 1 && days[next][0] < today) next++;
+
+    function renderDay(entry) {{
+      var date = new Date(entry[0] * 86400000);
+      var section = document.createElement('section');
+      if (entry[0] === today) section.className = 'today';
+      var title = document.createElement('h2');
+      title.textContent = DAYS[date.getUTCDay()] + ' ' + date.getUTCDate() + ' ' + MONTHS[date.getUTCMonth()];
+      section.appendChild(title);
+      var columns = document.createElement('div');
+      columns.className = 'day';
+
+      data.labels.forEach(function (label, code) {{
+        var column = document.createElement('div');
+        var table = document.createElement('table');
+        table.className = 'schedule-table';
+        var header = table.createTHead().insertRow();
+        header.innerHTML = '<th></th><th>Heure</th>';
+        header.cells[0].textContent = '🚢 Départs ' + label;
+        var body = table.createTBody();
+        for (var i = entry[1]; i < entry[2]; i++) {{
+          if (data.route[i] !== code) continue;
+          var row = body.insertRow();
+          if (stale[i]) row.className = 'stale';
+          var minute = data.minute[i] % 1440;
+          cell(row, data.vessels[data.vessel[i]] + (stale[i] ? ' ⏳' : ''), 'vessel-cell');
+          cell(row, pad(Math.floor(minute / 60)) + ':' + pad(minute % 60), 'datetime-cell');
+        }}
+        if (!body.rows.length) cell(body.insertRow(), 'Aucun horaire disponible', '');
+        column.appendChild(table);
+        columns.appendChild(column);
+      }});
+
+      section.appendChild(columns);
+      daysElement.appendChild(section);
+    }}
+
+    // Render following days until the end of the page is out of view
+    function fill() {{
+      do {{
+        renderDay(days[next++]);
+      }} while (next < days.length && more.getBoundingClientRect().top < window.innerHeight + 400);
+      if (next >= days.length && observer) observer.disconnect();
+    }}
+
+    var observer = null;
+    if (!days.length) {{
+      daysElement.textContent = 'Aucun horaire disponible';
+    }} else if ('IntersectionObserver' in window) {{
+      observer = new IntersectionObserver(function (entries) {{
+        if (entries[0].isIntersecting && next < days.length) fill();
+      }}, {{rootMargin: '400px'}});
+      fill();
+      if (next < days.length) observer.observe(more);
+    }} else {{
+      while (next < days.length) renderDay(days[next++]);
+    }}
+  }}).catch(function () {{
+    daysElement.textContent = '❌ Impossible de charger les horaires';
+  }});
+}})();
+</script>
+</body>
+</html>
+'''
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Moorea Life Schedule - Memory-mapped binary departure index
+Writes the unified schedule as a fixed-width binary file (departure
+minutes sorted per route, plus a string table for vessels, companies and
+ports) and answers lookups by binary search over a read-only mmap of it.
+
+Only the standard library is imported, and no JSON is parsed, so a
+lookup such as a shell prompt widget's starts in milliseconds:
+    python departure_index.py next MOZ -n 3
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from heapq import merge
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+DEFAULT_INDEX_FILE = 'horaires.idx'
+
+INDEX_MAGIC = b'MLSIDX\0\0'
+# Bumped whenever the layout of the file changes
+INDEX_FORMAT_VERSION = 1
+
+# Little-endian layout:
+#   header: magic, version, route count, record count, string count
+#   routes: origin string, destination string, first record, record count
+#   records: minute since EPOCH, vessel string, company string, status string, flags
+#   strings: offset of every string then their UTF-8 bytes, offsets counted
+#            from the start of the string data
+HEADER = struct.Struct('<8sIIII')
+ROUTE = struct.Struct('<IIII')
+RECORD = struct.Struct('<iHHHH')
+MINUTE = struct.Struct('<i')
+OFFSET = struct.Struct('<I')
+
+# Records refer to vessel, company and status strings by uint16 id
+MAX_RECORD_STRINGS = 1 << 16
+
+# Record flags
+FLAG_STALE = 1
+FLAG_INT_STATUS = 2
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class IndexedDeparture(NamedTuple):
+    """Departure read back from the index"""
+    minute: int
+    origin: str
+    destination: str
+    vessel: str
+    company: str
+    status: object
+    stale: bool
+
+    @property
+    def departure_time(self) -> datetime:
+        """Departure date and time"""
+        return EPOCH + timedelta(minutes=self.minute)
+
+
+def write_departure_index(departures: Iterable, filename: str = DEFAULT_INDEX_FILE):
+    """
+    Write the binary index of a schedule
+
+    The file is written next to its destination and renamed over it, so a
+    reader never maps a partially written index.
+
+    Args:
+        departures: Departures (schedule_model.Departure), in any order
+        filename: Output file
+
+    Raises:
+        ValueError: If the departures have more distinct strings than a
+            record can refer to; nothing is written then
+    """
+    strings: Dict[str, int] = {}
+
+    def string_id(value: str) -> int:
+        index = strings.setdefault(value, len(strings))
+        if index >= MAX_RECORD_STRINGS:
+            raise ValueError(f"Trop de noms distincts pour l'index binaire (maximum {MAX_RECORD_STRINGS})")
+        return index
+
+    routes: Dict[Tuple[str, str], List] = {}
+    for departure in departures:
+        routes.setdefault((departure.origin, departure.destination), []).append(departure)
+
+    route_table = bytearray()
+    records = bytearray()
+    record_count = 0
+    for (origin, destination), route_departures in sorted(routes.items()):
+        route_departures.sort(key=lambda d: d.minute)
+        route_table += ROUTE.pack(string_id(origin), string_id(destination), record_count,
+                                  len(route_departures))
+        for departure in route_departures:
+            flags = FLAG_STALE if departure.stale else 0
+            if isinstance(departure.status, int) and not isinstance(departure.status, bool):
+                flags |= FLAG_INT_STATUS
+            records += RECORD.pack(departure.minute, string_id(departure.vessel),
+                                   string_id(departure.company), string_id(str(departure.status)), flags)
+        record_count += len(route_departures)
+
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = bytearray()
+    position = 0
+    for value in encoded:
+        offsets += OFFSET.pack(position)
+        position += len(value)
+    offsets += OFFSET.pack(position)
+
+    temporary = f"{filename}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(INDEX_MAGIC, INDEX_FORMAT_VERSION, len(routes), record_count, len(strings)))
+        f.write(route_table)
+        f.write(records)
+        f.write(offsets)
+        f.write(b''.join(encoded))
+    os.replace(temporary, filename)
+
+
+class _RouteMinutes:
+    """Departure minutes of one route, as a sequence for bisect"""
+
+    def __init__(self, buffer: mmap.mmap, start: int, count: int):
+        self._buffer = buffer
+        self._start = start
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> int:
+        return MINUTE.unpack_from(self._buffer, self._start + index * RECORD.size)[0]
+
+
+class DepartureIndex:
+    """
+    Read-only view of a binary departure index
+
+    Nothing is decoded up front: lookups binary-search the departure
+    minutes of each route in place and only decode the records and
+    strings they return.
+    """
+
+    def __init__(self, filename: str = DEFAULT_INDEX_FILE):
+        """
+        Args:
+            filename: Index file written by write_departure_index
+
+        Raises:
+            ValueError: If the file is not an index of the supported format,
+                or is truncated
+        """
+        with open(filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # mmap cannot map an empty file, and a header-less file is not an index
+            if size < HEADER.size:
+                raise ValueError(f"{filename} n'est pas un index de départs au format {INDEX_FORMAT_VERSION}")
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, route_count, record_count, string_count = HEADER.unpack_from(self._buffer, 0)
+        if magic != INDEX_MAGIC or version != INDEX_FORMAT_VERSION:
+            self._buffer.close()
+            raise ValueError(f"{filename} n'est pas un index de départs au format {INDEX_FORMAT_VERSION}")
+
+        self._records_start = HEADER.size + route_count * ROUTE.size
+        self._offsets_start = self._records_start + record_count * RECORD.size
+        self._strings_start = self._offsets_start + (string_count + 1) * OFFSET.size
+        self._strings: Dict[int, str] = {}
+
+        # The last offset gives the length of the string data, hence of the file
+        expected = self._strings_start
+        if size >= expected:
+            expected += OFFSET.unpack_from(self._buffer, self._strings_start - OFFSET.size)[0]
+        if size != expected:
+            self._buffer.close()
+            raise ValueError(f"{filename} est tronqué ou corrompu ({size} octets au lieu de {expected})")
+
+        # route -> (first record, record count)
+        self.routes: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        for index in range(route_count):
+            origin, destination, first, count = ROUTE.unpack_from(self._buffer, HEADER.size + index * ROUTE.size)
+            self.routes[(self._string(origin), self._string(destination))] = (first, count)
+
+    def close(self):
+        """Unmap the file"""
+        self._buffer.close()
+
+    def __enter__(self) -> 'DepartureIndex':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _string(self, index: int) -> str:
+        """Decode an entry of the string table"""
+        value = self._strings.get(index)
+        if value is None:
+            start, end = struct.unpack_from('<II', self._buffer, self._offsets_start + index * OFFSET.size)
+            value = self._buffer[self._strings_start + start:self._strings_start + end].decode('utf-8')
+            self._strings[index] = value
+        return value
+
+    def _record(self, route: Tuple[str, str], position: int) -> IndexedDeparture:
+        """Decode the record at an absolute position"""
+        minute, vessel, company, status, flags = RECORD.unpack_from(
+            self._buffer, self._records_start + position * RECORD.size
+        )
+        status_value = self._string(status)
+        return IndexedDeparture(
+            minute, route[0], route[1], self._string(vessel), self._string(company),
+            int(status_value) if flags & FLAG_INT_STATUS else status_value, bool(flags & FLAG_STALE)
+        )
+
+    def _route_range(self, route: Tuple[str, str], start_minute: int,
+                     end_minute: Optional[int] = None, n: Optional[int] = None) -> List[IndexedDeparture]:
+        """Decode the departures of a route from start_minute, up to end_minute or n departures"""
+        first, count = self.routes[route]
+        minutes = _RouteMinutes(self._buffer, self._records_start + first * RECORD.size, count)
+        start = bisect_left(minutes, start_minute)
+        end = bisect_left(minutes, end_minute) if end_minute is not None else count
+        if n is not None:
+            end = min(end, start + n)
+        return [self._record(route, first + position) for position in range(start, end)]
+
+    def next_departures(self, origin: str, after: datetime, n: int = 5,
+                        destination: Optional[str] = None) -> List[IndexedDeparture]:
+        """
+        Get the next departures from a port
+
+        Args:
+            origin: Departure port code, e.g. "MOZ"
+            after: Earliest departure time (inclusive)
+            n: Maximum number of departures
+            destination: Arrival port code, or None for any destination
+
+        Returns:
+            Up to n departures sorted by departure time
+        """
+        after_minute = (after - EPOCH) // timedelta(minutes=1)
+        streams = [
+            self._route_range(route, after_minute, n=n) for route in self.routes
+            if route[0] == origin and (destination is None or route[1] == destination)
+        ]
+        return list(merge(*streams, key=lambda d: d.minute))[:n]
+
+    def departures_on(self, day: date) -> List[IndexedDeparture]:
+        """
+        Get every departure of a day
+
+        Args:
+            day: Date
+
+        Returns:
+            Departures of that day sorted by departure time
+        """
+        start_minute = (datetime(day.year, day.month, day.day) - EPOCH) // timedelta(minutes=1)
+        streams = [self._route_range(route, start_minute, start_minute + 1440) for route in self.routes]
+        return list(merge(*streams, key=lambda d: d.minute))
+
+
+def format_departure(departure: IndexedDeparture) -> str:
+    """
+    Format a departure like the query subcommand of fetch_schedules.py
+
+    Args:
+        departure: Departure
+
+    Returns:
+        Line such as "2025-11-24 08:30  PPT → MOZ  Aremiti 5 (Aremiti Express)"
+    """
+    return (f"{departure.departure_time.strftime('%Y-%m-%d %H:%M')}  "
+            f"{departure.origin} → {departure.destination}  "
+            f"{departure.vessel} ({departure.company})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point
+
+    Args:
+        argv: Command line arguments, defaults to sys.argv
+
+    Returns:
+        Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Recherche rapide dans l'index binaire des départs")
+    parser.add_argument('--file', default=DEFAULT_INDEX_FILE, help="index binaire des départs")
+    queries = parser.add_subparsers(dest='query', required=True)
+
+    next_parser = queries.add_parser('next', help="prochains départs depuis un port")
+    next_parser.add_argument('origin', help="port de départ (PPT, MOZ)")
+    next_parser.add_argument('--to', dest='destination', help="port d'arrivée")
+    next_parser.add_argument('--after', help="heure de début, HH:MM ou date ISO (défaut: maintenant)")
+    next_parser.add_argument('-n', type=int, default=5, help="nombre de départs (défaut: 5)")
+
+    day_parser = queries.add_parser('day', help="tous les départs d'une journée")
+    day_parser.add_argument('date', nargs='?', help="date AAAA-MM-JJ (défaut: aujourd'hui)")
+    args = parser.parse_args(argv)
+
+    try:
+        index = DepartureIndex(args.file)
+    except FileNotFoundError:
+        print(f"❌ Fichier introuvable: {args.file}")
+        return 1
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    with index:
+        ports = sorted({port for route in index.routes for port in route})
+        if args.query == 'next':
+            for port in (args.origin, args.destination):
+                if port and port.upper() not in ports:
+                    print(f"❌ Port inconnu (ports connus: {', '.join(ports)})")
+                    return 1
+            now = datetime.now().replace(second=0, microsecond=0)
+            if not args.after:
+                after = now
+            elif len(args.after) <= 5 and ':' in args.after:
+                hours, minutes = map(int, args.after.split(':'))
+                after = now.replace(hour=hours, minute=minutes)
+            else:
+                after = datetime.fromisoformat(args.after)
+            departures = index.next_departures(args.origin.upper(), after, args.n,
+                                               args.destination.upper() if args.destination else None)
+        else:
+            departures = index.departures_on(date.fromisoformat(args.date) if args.date else date.today())
+
+    if departures:
+        print('\n'.join(format_departure(departure) for departure in departures))
+    else:
+        print("Aucun départ trouvé")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,12 +4,81 @@ Moorea Life Schedule - Fetch ferry schedules from Firebase
 Fetches ferry schedules for Tahiti-Moorea route from multiple companies
 """
 
+import argparse
+import contextlib
 import json
 import os
+import queue
 import sys
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError, as_completed
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-import requests
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+from firebase_http import (
+    DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_MAXSIZE, DEFAULT_READ_TIMEOUT,
+    SessionPool, configure_session_pool, get_firebase_json, get_session_pool, iter_firebase_chunks
+)
+from http_resilience import (
+    DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_MAX, DEFAULT_BREAKER_RESET, DEFAULT_BREAKER_THRESHOLD,
+    DEFAULT_RETRIES, DaemonExecutor
+)
+from build_state import BuildState, fingerprint
+from schedule_model import (
+    Departure, configure_routes, from_epoch_minutes, get_monday_of_week,
+    get_payload_keys, get_routes, route_id, to_epoch_minutes
+)
+from schedule_pipeline import (
+    DepartureCollector, DepartureSink, OverlappedNormalizer,
+    SnapshotWriter, StreamingSnapshot, feed_sinks, iter_departures, merge_departures,
+    merge_timelines, normalize_schedule, split_directions
+)
+from json_stream import iter_json_events
+from schedule_query import add_query_arguments, run_query
+from schedule_delta import build_changes, diff_departures, load_schedule_version, write_changes
+from schedule_shards import DEFAULT_SHARDS_DIR, precompress, write_shards
+from client_render import DEFAULT_COMPACT_FILE, render_client_shell, write_compact_payload
+from departure_index import DEFAULT_INDEX_FILE, write_departure_index
+from firebase_stream import FirebaseStream
+from refresh_scheduler import (
+    DEFAULT_BACKOFF_FACTOR, DEFAULT_BASE_INTERVAL, DEFAULT_DISTANCE_FACTOR, DEFAULT_MAX_INTERVAL,
+    RefreshScheduler
+)
+from schedule_archive import (
+    DEFAULT_ARCHIVE_FILE, ScheduleArchive, add_archive_arguments, get_covered_weeks, run_archive
+)
+from http_cache import (
+    DEFAULT_CACHE_DIR, DEFAULT_MAX_AGE, DEFAULT_MAX_BYTES, DEFAULT_TTL,
+    HttpCache, get_http_cache, set_http_cache
+)
+from run_report import DEFAULT_REPORT_FILE, RunReport, get_run_report, log, start_run_report
+
+
+# Upper bound on concurrent (company, week) jobs in a single run
+DEFAULT_MAX_WORKERS = 16
+
+# Concurrent requests allowed against the same Firebase database host
+DEFAULT_MAX_PER_HOST = DEFAULT_POOL_MAXSIZE
+
+# French day and month names, indexed by weekday() and month - 1
+FRENCH_DAY_NAMES = ('Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche')
+FRENCH_MONTH_NAMES = ('janvier', 'février', 'mars', 'avril', 'mai', 'juin',
+                      'juillet', 'août', 'septembre', 'octobre', 'novembre', 'décembre')
+
+# Number of weeks fetched by default (current week and next week)
+DEFAULT_HORIZON_WEEKS = 2
+MAX_HORIZON_WEEKS = 52
+
+# index.html either lists every departure ('static') or loads them in the browser ('client')
+RENDER_MODES = ('static', 'client')
+
+# Streaming mode: quiet period before rebuilding the outputs, and longest wait after an event
+DEFAULT_STREAM_DEBOUNCE = 2.0
+DEFAULT_STREAM_MAX_DELAY = 30.0
+
+# Oldest data/ snapshot served in place of a week that could not be fetched
+DEFAULT_STALE_MAX_AGE_DAYS = 7
 
 
 def get_week_number(date: datetime) -> int:
@@ -25,24 +94,26 @@ def get_week_number(date: datetime) -> int:
     return date.isocalendar()[1]
 
 
-def get_monday_of_week(week: int, year: int) -> datetime:
+def get_horizon_weeks(start: datetime, count: int) -> List[Tuple[int, int]]:
     """
-    Get the Monday of a specific ISO week
+    Get the ISO weeks of a horizon starting at a given date
+
+    Uses the ISO year of each week, so the last days of December can
+    belong to week 1 of the next year and the first days of January to
+    week 52 or 53 of the previous one.
 
     Args:
-        week: ISO week number
-        year: Year
+        start: Date in the first week of the horizon
+        count: Number of weeks
 
     Returns:
-        Date of the Monday of that week
+        List of (week, year) tuples
     """
-    # January 4th is always in week 1
-    jan4 = datetime(year, 1, 4)
-    # Get the Monday of week 1
-    monday_week1 = jan4 - timedelta(days=jan4.weekday())
-    # Calculate target Monday
-    target_monday = monday_week1 + timedelta(weeks=week - 1)
-    return target_monday
+    weeks = []
+    for offset in range(count):
+        iso_year, iso_week, _ = (start + timedelta(weeks=offset)).isocalendar()
+        weeks.append((iso_week, iso_year))
+    return weeks
 
 
 def time_to_seconds(time_str: str) -> int:
@@ -74,33 +145,173 @@ def seconds_to_time(seconds: int) -> str:
     return f"{hours:02d}:{minutes:02d}"
 
 
-def extract_vessel_name(vessel_field: str) -> str:
+# Day names used in static schedule files, mapped to weekday indexes
+STATIC_DAY_INDEXES = {
+    'Lundi': 0,
+    'Mardi': 1,
+    'Mercredi': 2,
+    'Jeudi': 3,
+    'Vendredi': 4,
+    'Samedi': 5,
+    'Dimanche': 6
+}
+
+_static_schedules: Dict[Tuple, Dict] = {}
+_static_schedules_lock = threading.Lock()
+
+
+def build_static_day(times: List[str], day_index: int, origin: str, destination: str,
+                     company: Dict, vessel_name: str) -> Dict:
+    """
+    Build the Firebase-format schedules of one day from a static time list
+
+    Args:
+        times: Departure times ("HH:MM")
+        day_index: Weekday index (0 = Monday)
+        origin: Origin port code
+        destination: Destination port code
+        company: Company configuration
+        vessel_name: Vessel name to use
+
+    Returns:
+        Day dictionary mapping schedule ids to schedules
+    """
+    return {
+        f'schedule_{idx}': {
+            'day': day_index,
+            'timeBegin': time_to_seconds(time_str),
+            'origin': origin,
+            'destination': destination,
+            'vessel': company['name'],
+            'vessel_name': vessel_name,
+            'status': 'active'
+        }
+        for idx, time_str in enumerate(times)
+    }
+
+
+def get_static_directions() -> Tuple[Tuple[str, str, str, str], ...]:
+    """
+    Get the static file sections of the configured routes
+
+    Returns:
+        Tuples of (section, payload key, origin, destination), for every
+        route with a staticSection
+    """
+    return tuple(
+        (route.static_section, route.destination, route.origin, route.destination)
+        for route in get_routes() if route.static_section
+    )
+
+
+def compile_static_schedules(company: Dict) -> Optional[Dict]:
     """
-    Extract clean vessel name from Firebase vessel field
+    Compile a company's static schedule file into a week-agnostic template
+
+    The file is parsed and its times converted only once per file
+    modification: the result is memoized on the file path, its mtime, the
+    company settings and the route sections it depends on.
 
-    Examples:
-        "Aremiti 5-26v" -> "Aremiti 5"
-        "Aremiti 6-12a" -> "Aremiti 6"
-        "Terevau" -> "Terevau"
+    Static files may hold date-specific overrides in an "Exceptions"
+    section, keyed by ISO date. An override is either a day name whose
+    regular schedule applies (e.g. "Dimanche" on a public holiday) or an
+    object with its own time lists per route section (TahitiVersMoorea,
+    MooreaVersTahiti, ...); a route left out of the object keeps its
+    regular schedule.
 
     Args:
-        vessel_field: Raw vessel string from Firebase
+        company: Static schedule company configuration
 
     Returns:
-        Clean vessel name
+        Dictionary with the regular Firebase-format payload under 'data'
+        and the override days by ISO date under 'overrides', or None if
+        the file has no data for the company
+    """
+    path = company['scheduleFile']
+    vessel_name = company.get('vessel_name', company['name'])
+    static_directions = get_static_directions()
+    key = (path, os.stat(path).st_mtime_ns, company['name'], vessel_name, static_directions)
+
+    with _static_schedules_lock:
+        if key in _static_schedules:
+            return _static_schedules[key]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            company_data = json.load(f).get(company['name'])
+
+        compiled = None
+        if company_data:
+            # Convert static format to Firebase format
+            converted_data = {}
+            for section, payload_key, origin, destination in static_directions:
+                if section not in company_data:
+                    continue
+                converted_data[payload_key] = [{} for _ in range(7)]
+                for day_name, times in company_data[section].items():
+                    day_index = STATIC_DAY_INDEXES.get(day_name)
+                    if day_index is not None and isinstance(times, list):
+                        converted_data[payload_key][day_index] = build_static_day(
+                            times, day_index, origin, destination, company, vessel_name
+                        )
+
+            # Compile date-specific overrides to the weekday they fall on
+            overrides = {}
+            for date_str, override in company_data.get('Exceptions', {}).items():
+                day_index = datetime.fromisoformat(date_str).weekday()
+                override_days = {}
+                for section, payload_key, origin, destination in static_directions:
+                    if isinstance(override, str):
+                        times = company_data.get(section, {}).get(override)
+                    else:
+                        times = override.get(section)
+                    if isinstance(times, list):
+                        override_days[payload_key] = build_static_day(
+                            times, day_index, origin, destination, company, vessel_name
+                        )
+                overrides[date_str] = override_days
+
+            compiled = {'data': converted_data, 'overrides': overrides}
+
+        # Drop templates of previous versions of the file
+        for stale_key in [k for k in _static_schedules if k[0] == path and k[2] == company['name']]:
+            del _static_schedules[stale_key]
+        _static_schedules[key] = compiled
+        return compiled
+
+
+def project_static_week(compiled: Dict, week: int, year: int) -> Dict:
     """
-    import re
+    Project a compiled static schedule onto a given week
 
-    if not vessel_field:
-        return ""
+    Weeks without overrides share the template payload as is, so
+    projecting any number of weeks costs next to nothing.
 
-    # Try to extract "Aremiti N" pattern (where N is a number)
-    match = re.match(r'(Aremiti \d+)', vessel_field, re.IGNORECASE)
-    if match:
-        return match.group(1)
+    Args:
+        compiled: Output of compile_static_schedules
+        week: ISO week number
+        year: ISO year
 
-    # For other vessels, return as-is
-    return vessel_field
+    Returns:
+        Firebase-format payload for that week
+    """
+    overrides = compiled['overrides']
+    data = compiled['data']
+    if not overrides:
+        return data
+
+    monday = get_monday_of_week(week, year)
+    week_data = None
+    for day_index in range(7):
+        override_days = overrides.get((monday + timedelta(days=day_index)).date().isoformat())
+        if override_days is None:
+            continue
+        if week_data is None:
+            week_data = {key: list(days) for key, days in data.items()}
+        for payload_key, override_day in override_days.items():
+            if payload_key in week_data:
+                week_data[payload_key][day_index] = override_day
+
+    return week_data if week_data is not None else data
 
 
 def load_static_schedules(company: Dict, week: int, year: int) -> Dict:
@@ -115,100 +326,44 @@ def load_static_schedules(company: Dict, week: int, year: int) -> Dict:
     Returns:
         Result dictionary with success status and data
     """
-    print(f"\n🚢 Traitement de {company['name']} (horaires statiques) - Semaine {week}...")
+    log(f"\n🚢 Traitement de {company['name']} (horaires statiques) - Semaine {week}...")
 
     try:
-        with open(company['scheduleFile'], 'r', encoding='utf-8') as f:
-            schedule_data = json.load(f)
-
-        company_data = schedule_data.get(company['name'])
+        compiled = compile_static_schedules(company)
 
-        if not company_data:
-            print(f"❌ Aucune donnée trouvée pour {company['name']} dans {company['scheduleFile']}")
+        if not compiled:
+            log(f"❌ Aucune donnée trouvée pour {company['name']} dans {company['scheduleFile']}")
             return {
                 'success': False,
                 'company': company,
                 'error': 'Aucune donnée trouvée dans le fichier'
             }
 
-        # Convert static format to Firebase format
-        converted_data = {}
-        day_mapping = {
-            'Lundi': 0,
-            'Mardi': 1,
-            'Mercredi': 2,
-            'Jeudi': 3,
-            'Vendredi': 4,
-            'Samedi': 5,
-            'Dimanche': 6
-        }
+        converted_data = project_static_week(compiled, week, year)
+
+        log(f"✅ Données statiques chargées pour {company['name']}")
 
-        # Determine vessel_name (use company name if not specified)
-        vessel_name = company.get('vessel_name', company['name'])
-
-        # Convert Tahiti to Moorea schedules
-        if 'TahitiVersMoorea' in company_data:
-            converted_data['MOZ'] = [{} for _ in range(7)]
-
-            for day_name, times in company_data['TahitiVersMoorea'].items():
-                day_index = day_mapping.get(day_name)
-                if day_index is not None and isinstance(times, list):
-                    for idx, time_str in enumerate(times):
-                        converted_data['MOZ'][day_index][f'schedule_{idx}'] = {
-                            'day': day_index,
-                            'timeBegin': time_to_seconds(time_str),
-                            'origin': 'PPT',
-                            'destination': 'MOZ',
-                            'vessel': company['name'],
-                            'vessel_name': vessel_name,
-                            'status': 'active'
-                        }
-
-        # Convert Moorea to Tahiti schedules
-        if 'MooreaVersTahiti' in company_data:
-            converted_data['PPT'] = [{} for _ in range(7)]
-
-            for day_name, times in company_data['MooreaVersTahiti'].items():
-                day_index = day_mapping.get(day_name)
-                if day_index is not None and isinstance(times, list):
-                    for idx, time_str in enumerate(times):
-                        converted_data['PPT'][day_index][f'schedule_{idx}'] = {
-                            'day': day_index,
-                            'timeBegin': time_to_seconds(time_str),
-                            'origin': 'MOZ',
-                            'destination': 'PPT',
-                            'vessel': company['name'],
-                            'vessel_name': vessel_name,
-                            'status': 'active'
-                        }
-
-        print(f"✅ Données statiques chargées pour {company['name']}")
-
-        # Save to data/{company-id}_week{week}.json
-        os.makedirs('data', exist_ok=True)
-        filename = f"data/{company['id']}_week{week}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump({
-                'company': company['name'],
-                'companyId': company['id'],
-                'week': week,
-                'year': year,
-                'data': converted_data,
-                'lastUpdate': datetime.now().isoformat(),
-                'source': 'static'
-            }, f, indent=2, ensure_ascii=False)
-        print(f"💾 Données sauvegardées: {filename}")
+        # Compare with the data/{company-id}_week{week}.json snapshot of the previous run
+        unchanged = False
+        try:
+            with open(f"data/{company['id']}_week{week}.json", 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            unchanged = previous.get('year') == year and previous.get('data') == converted_data
+        except (OSError, ValueError):
+            pass
 
         return {
             'success': True,
             'company': company,
             'week': week,
             'year': year,
-            'data': converted_data
+            'data': converted_data,
+            'unchanged': unchanged,
+            'source': 'static'
         }
 
     except Exception as e:
-        print(f"❌ Erreur pour {company['name']}: {str(e)}")
+        log(f"❌ Erreur pour {company['name']}: {str(e)}")
         return {
             'success': False,
             'company': company,
@@ -216,6 +371,82 @@ def load_static_schedules(company: Dict, week: int, year: int) -> Dict:
         }
 
 
+def get_firebase_params(company: Dict) -> Dict:
+    """
+    Build the query parameters common to every Firebase request of a company
+
+    Args:
+        company: Company configuration with Firebase settings
+
+    Returns:
+        Query parameters dictionary
+    """
+    # Add auth parameter if needed
+    params = {}
+    if company['firebase'].get('apiKey'):
+        params['auth'] = company['firebase']['apiKey']
+    return params
+
+
+def record_firebase_request(company: Dict, path: str, year: int, weeks: List[int],
+                            stats: Dict, error: Optional[str] = None):
+    """
+    Record a Firebase request in the run report, if a run is being recorded
+
+    Args:
+        company: Company configuration
+        path: Requested path
+        year: ISO year
+        weeks: ISO week numbers covered by the request
+        stats: Request statistics filled by get_firebase_json
+        error: Error message if the request failed
+    """
+    report = get_run_report()
+    if report is None:
+        return
+    report.record_request(
+        company=company['id'], host=get_company_host(company), path=path, year=year,
+        weeks=weeks, status=stats.get('status'), bytes=stats.get('bytes', 0),
+        seconds=stats.get('seconds'), cache=stats.get('cache'),
+        attempts=stats.get('attempts', 0), hedged=stats.get('hedged', 0), error=error
+    )
+
+
+def build_week_result(company: Dict, week: int, year: int, data: Optional[Dict],
+                      unchanged: bool = False) -> Dict:
+    """
+    Build the result of one week from its Firebase payload
+
+    Args:
+        company: Company configuration
+        week: ISO week number
+        year: ISO year
+        data: Week payload from Firebase
+        unchanged: Whether the payload is identical to the previous run
+
+    Returns:
+        Result dictionary with success status and data
+    """
+    if not data:
+        log(f"❌ Aucune donnée trouvée pour {company['name']} - Semaine {week}")
+        return {
+            'success': False,
+            'company': company,
+            'week': week,
+            'year': year,
+            'error': f"Aucune donnée trouvée pour la semaine {week}"
+        }
+
+    return {
+        'success': True,
+        'company': company,
+        'week': week,
+        'year': year,
+        'data': data,
+        'unchanged': unchanged
+    }
+
+
 def fetch_company_schedules(company: Dict, week: int, year: int) -> Dict:
     """
     Fetch schedules for a company from Firebase
@@ -223,93 +454,221 @@ def fetch_company_schedules(company: Dict, week: int, year: int) -> Dict:
     Args:
         company: Company configuration with Firebase settings
         week: ISO week number
-        year: Year
+        year: ISO year
 
     Returns:
         Result dictionary with success status and data
     """
-    print(f"\n🚢 Traitement de {company['name']} - Semaine {week}...")
+    log(f"\n🚢 Traitement de {company['name']} - Semaine {week}...")
 
+    week_path = f"Calendar/{year}/{week}"
+    stats = {}
     try:
-        # Build Firebase REST API URL
+        # Build Firebase REST API path
         database_url = company['firebase']['databaseURL']
-        week_path = f"Calendar/{year}/{week}"
-        url = f"{database_url}/{week_path}.json"
-
-        # Add auth parameter if needed
-        params = {}
-        if company['firebase'].get('apiKey'):
-            params['auth'] = company['firebase']['apiKey']
-
-        print(f"🔗 Chemin Firebase: {week_path}")
 
-        # Make request to Firebase REST API
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
+        log(f"🔗 Chemin Firebase de {company['name']}: {week_path}")
 
-        data = response.json()
+        # Make request to Firebase REST API, revalidating the cached payload
+        data, unchanged = get_firebase_json(
+            database_url, week_path, get_firebase_params(company), cache=get_http_cache(),
+            stats=stats
+        )
+        record_firebase_request(company, week_path, year, [week], stats)
 
         if data:
-            print(f"✅ Données récupérées pour {company['name']}")
-
-            # Determine vessel_name (use company name if not specified)
-            default_vessel_name = company.get('vessel_name', company['name'])
-
-            # Add vessel_name to each schedule if not present
-            for destination in ['MOZ', 'PPT']:
-                if destination in data and isinstance(data[destination], list):
-                    for day_data in data[destination]:
-                        if day_data and isinstance(day_data, dict):
-                            for schedule_id, schedule in day_data.items():
-                                if schedule and isinstance(schedule, dict):
-                                    # Extract vessel name from the 'vessel' field if present
-                                    if 'vessel' in schedule and schedule['vessel']:
-                                        extracted_name = extract_vessel_name(schedule['vessel'])
-                                        schedule['vessel_name'] = extracted_name
-                                    elif 'vessel_name' not in schedule:
-                                        schedule['vessel_name'] = default_vessel_name
-
-                                    if 'vessel' not in schedule:
-                                        schedule['vessel'] = company['name']
-
-            # Save to data/{company-id}_week{week}.json
-            os.makedirs('data', exist_ok=True)
-            filename = f"data/{company['id']}_week{week}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'company': company['name'],
-                    'companyId': company['id'],
-                    'week': week,
-                    'year': year,
-                    'data': data,
-                    'lastUpdate': datetime.now().isoformat()
-                }, f, indent=2, ensure_ascii=False)
-            print(f"💾 Données sauvegardées: {filename}")
+            if unchanged:
+                log(f"♻️  Données inchangées pour {company['name']}")
+            else:
+                log(f"✅ Données récupérées pour {company['name']}")
 
-            return {
-                'success': True,
-                'company': company,
-                'week': week,
-                'year': year,
-                'data': data
-            }
-        else:
-            print(f"❌ Aucune donnée trouvée pour {company['name']}")
-            return {
-                'success': False,
-                'company': company,
-                'error': f"Aucune donnée trouvée pour la semaine {week}"
-            }
+        return build_week_result(company, week, year, data, unchanged)
 
     except Exception as e:
-        print(f"❌ Erreur pour {company['name']}: {str(e)}")
+        log(f"❌ Erreur pour {company['name']}: {str(e)}")
+        record_firebase_request(company, week_path, year, [week], stats, str(e))
         return {
             'success': False,
             'company': company,
+            'week': week,
+            'year': year,
             'error': str(e)
         }
 
 
+def fetch_company_schedule_range(company: Dict, year: int, weeks: List[int]) -> List[Dict]:
+    """
+    Fetch several weeks of a company's schedules in a single Firebase request
+
+    Uses a REST range query on Calendar/{year} ordered by key, so a whole
+    horizon within one ISO year costs one request instead of one per week.
+
+    Args:
+        company: Company configuration with Firebase settings
+        year: ISO year
+        weeks: ISO week numbers of that year to fetch
+
+    Returns:
+        List of result dictionaries, one per requested week
+    """
+    log(f"\n🚢 Traitement de {company['name']} - Semaines {min(weeks)} à {max(weeks)} de {year}...")
+
+    year_path = f"Calendar/{year}"
+    stats = {}
+    try:
+        database_url = company['firebase']['databaseURL']
+
+        params = get_firebase_params(company)
+        params.update({
+            'orderBy': '"$key"',
+            'startAt': f'"{min(weeks)}"',
+            'endAt': f'"{max(weeks)}"'
+        })
+
+        log(f"🔗 Chemin Firebase de {company['name']}: {year_path} (semaines {min(weeks)} à {max(weeks)})")
+
+        year_data, unchanged = get_firebase_json(database_url, year_path, params,
+                                                 cache=get_http_cache(), stats=stats)
+        record_firebase_request(company, year_path, year, weeks, stats)
+
+        if year_data:
+            if unchanged:
+                log(f"♻️  Données inchangées pour {company['name']}")
+            else:
+                log(f"✅ Données récupérées pour {company['name']}")
+
+        # Firebase returns integer-like keys as an array when they are dense enough
+        if isinstance(year_data, list):
+            year_data = {str(index): value for index, value in enumerate(year_data) if value}
+        year_data = year_data or {}
+
+        return [
+            build_week_result(company, week, year, year_data.get(str(week)), unchanged)
+            for week in weeks
+        ]
+
+    except Exception as e:
+        log(f"❌ Erreur pour {company['name']}: {str(e)}")
+        record_firebase_request(company, year_path, year, weeks, stats, str(e))
+        return [{
+            'success': False,
+            'company': company,
+            'week': week,
+            'year': year,
+            'error': str(e)
+        } for week in weeks]
+
+
+def stream_company_schedule_range(company: Dict, year: int, weeks: List[int]) -> List[Dict]:
+    """
+    Fetch several weeks of a company's schedules in a single streamed Firebase request
+
+    Sends the same range query as fetch_company_schedule_range, but parses
+    the body as it arrives: each schedule entry is normalized into a
+    departure as soon as it is decoded, then written to the data/ snapshot
+    of its week, so the payload is never held in memory as a whole. The
+    results carry their 'departures' and the 'dataHash' of their snapshot
+    instead of the payload. Weeks completed before a failure are kept.
+
+    Args:
+        company: Company configuration with Firebase settings
+        year: ISO year
+        weeks: ISO week numbers of that year to fetch
+
+    Returns:
+        List of result dictionaries, one per requested week
+    """
+    log(f"\n🚢 Traitement de {company['name']} - Semaines {min(weeks)} à {max(weeks)} de {year} (lecture progressive)...")
+
+    year_path = f"Calendar/{year}"
+    stats = {}
+    snapshot_writer = SnapshotWriter()
+    wanted = {str(week): week for week in weeks}
+    payload_keys = set(get_payload_keys())
+    streamed: Dict[int, Dict] = {}
+    snapshot = None
+    try:
+        database_url = company['firebase']['databaseURL']
+
+        params = get_firebase_params(company)
+        params.update({
+            'orderBy': '"$key"',
+            'startAt': f'"{min(weeks)}"',
+            'endAt': f'"{max(weeks)}"'
+        })
+
+        log(f"🔗 Chemin Firebase de {company['name']}: {year_path} (semaines {min(weeks)} à {max(weeks)})")
+
+        chunks = iter_firebase_chunks(database_url, year_path, params, stats=stats)
+        # Paths are (week, direction, day, key): schedule dicts are decoded one at a time.
+        # Firebase returns integer-like keys as an array when they are dense enough,
+        # hence str() on the week index
+        for event, path, value in iter_json_events(chunks, depth=4):
+            if not path or str(path[0]) not in wanted:
+                continue
+            week = wanted[str(path[0])]
+
+            if len(path) == 1:
+                if event == 'start':
+                    result = {'success': True, 'company': company, 'week': week, 'year': year,
+                              'departures': [], 'streamed': True}
+                    snapshot = StreamingSnapshot(snapshot_writer, result)
+                    snapshot.start((), value)
+                    monday_minute = to_epoch_minutes(get_monday_of_week(week, year))
+                    day_lists = set()
+                    empty = True
+                elif event == 'end':
+                    snapshot.end()
+                    if empty:
+                        snapshot.abort()
+                    else:
+                        result['dataHash'], result['unchanged'] = snapshot.finish()
+                        streamed[week] = result
+                    snapshot = None
+                continue
+
+            relative = path[1:]
+            empty = False
+            if event == 'start':
+                if len(relative) == 1 and value == '[' and relative[0] in payload_keys:
+                    day_lists.add(relative[0])
+                snapshot.start(relative, value)
+            elif event == 'end':
+                snapshot.end()
+            else:
+                # Schedule dicts of the day lists are normalized as they are decoded
+                if (len(relative) == 3 and relative[0] in day_lists and isinstance(relative[2], str)
+                        and value and isinstance(value, dict)):
+                    departure = normalize_schedule(value, monday_minute, company)
+                    if departure is not None:
+                        result['departures'].append(departure)
+                snapshot.value(relative, value)
+
+        record_firebase_request(company, year_path, year, weeks, stats)
+
+        if streamed:
+            if all(result['unchanged'] for result in streamed.values()):
+                log(f"♻️  Données inchangées pour {company['name']}")
+            else:
+                log(f"✅ Données récupérées pour {company['name']} "
+                    f"({sum(len(r['departures']) for r in streamed.values())} horaires)")
+
+        return [streamed.get(week) or build_week_result(company, week, year, None) for week in weeks]
+
+    except Exception as e:
+        if snapshot is not None:
+            snapshot.abort()
+        log(f"❌ Erreur pour {company['name']}: {str(e)}")
+        record_firebase_request(company, year_path, year, weeks, stats, str(e))
+        return [streamed.get(week) or {
+            'success': False,
+            'company': company,
+            'week': week,
+            'year': year,
+            'error': str(e)
+        } for week in weeks]
+
+
 def is_company_configured(company: Dict) -> bool:
     """
     Check if a company is properly configured
@@ -356,48 +715,26 @@ def parse_schedule_data(data: Dict, current_week: int, current_year: int) -> str
     monday_date = get_monday_of_week(current_week, current_year)
     today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
+    monday_minute = to_epoch_minutes(monday_date)
+    routes = get_routes()
     schedule_by_day = {}
 
-    # Parse data for both directions
-    for destination in ['MOZ', 'PPT']:
-        if destination not in data or not isinstance(data[destination], list):
-            continue
-
-        for day_data in data[destination]:
-            if not day_data or not isinstance(day_data, dict):
-                continue
+    # Parse data for every route from the normalized departure stream, each
+    # route sorted once so that every day receives its times in order
+    streams = split_directions(iter_departures(data, current_week, current_year, {'name': 'N/A'}))
+    for index, route in enumerate(routes):
+        for departure in streams.get((route.origin, route.destination), ()):
+            day = (departure.minute - monday_minute) // 1440
 
-            for schedule_id, schedule in day_data.items():
-                if not schedule or not isinstance(schedule, dict):
-                    continue
-
-                day = schedule.get('day')
-                if day is None:
-                    continue
+            if day not in schedule_by_day:
+                schedule_by_day[day] = [[] for _ in routes]
 
-                if day not in schedule_by_day:
-                    schedule_by_day[day] = {
-                        'pptToMoz': [],
-                        'mozToPpt': []
-                    }
-
-                time_str = seconds_to_time(schedule.get('timeBegin', 0))
-                schedule_info = {
-                    'time': time_str,
-                    'timeBegin': schedule.get('timeBegin', 0),
-                    'vessel': schedule.get('vessel', 'N/A'),
-                    'status': schedule.get('status')
-                }
-
-                if schedule.get('origin') == 'PPT' and schedule.get('destination') == 'MOZ':
-                    schedule_by_day[day]['pptToMoz'].append(schedule_info)
-                elif schedule.get('origin') == 'MOZ' and schedule.get('destination') == 'PPT':
-                    schedule_by_day[day]['mozToPpt'].append(schedule_info)
-
-    # Sort schedules by time
-    for day in schedule_by_day:
-        schedule_by_day[day]['pptToMoz'].sort(key=lambda x: x['timeBegin'])
-        schedule_by_day[day]['mozToPpt'].sort(key=lambda x: x['timeBegin'])
+            schedule_by_day[day][index].append({
+                'time': seconds_to_time((departure.minute - monday_minute) % 1440 * 60),
+                'minute': departure.minute,
+                'vessel': departure.vessel,
+                'status': departure.status
+            })
 
     # Generate HTML rows
     rows = []
@@ -406,41 +743,17 @@ def parse_schedule_data(data: Dict, current_week: int, current_year: int) -> str
     for day in days_of_week:
         current_date = monday_date + timedelta(days=day)
 
-        date_str = current_date.strftime('%A %d %B').capitalize()
-        # Translate day names to French
-        day_names = {
-            'Monday': 'Lundi',
-            'Tuesday': 'Mardi',
-            'Wednesday': 'Mercredi',
-            'Thursday': 'Jeudi',
-            'Friday': 'Vendredi',
-            'Saturday': 'Samedi',
-            'Sunday': 'Dimanche'
-        }
-        for en, fr in day_names.items():
-            date_str = date_str.replace(en, fr)
-
-        # Translate month names to French
-        month_names = {
-            'January': 'janvier', 'February': 'février', 'March': 'mars',
-            'April': 'avril', 'May': 'mai', 'June': 'juin',
-            'July': 'juillet', 'August': 'août', 'September': 'septembre',
-            'October': 'octobre', 'November': 'novembre', 'December': 'décembre'
-        }
-        for en, fr in month_names.items():
-            date_str = date_str.replace(en, fr)
+        date_str = (f"{FRENCH_DAY_NAMES[current_date.weekday()]} {current_date.day:02d} "
+                    f"{FRENCH_MONTH_NAMES[current_date.month - 1]}")
 
-        ppt_to_moz_times = schedule_by_day[day]['pptToMoz']
-        ppt_to_moz_html = ' '.join([
-            f'<span class="time-badge">{s["time"]}</span>'
-            for s in ppt_to_moz_times
-        ]) if ppt_to_moz_times else '<span style="color: #999;">-</span>'
-
-        moz_to_ppt_times = schedule_by_day[day]['mozToPpt']
-        moz_to_ppt_html = ' '.join([
-            f'<span class="time-badge">{s["time"]}</span>'
-            for s in moz_to_ppt_times
-        ]) if moz_to_ppt_times else '<span style="color: #999;">-</span>'
+        cells = []
+        for route_times in schedule_by_day[day]:
+            times_html = ' '.join([
+                f'<span class="time-badge">{s["time"]}</span>'
+                for s in route_times
+            ]) if route_times else '<span style="color: #999;">-</span>'
+            cells.append(f'<td class="times-cell">{times_html}</td>')
+        cells_html = '\n        '.join(cells)
 
         is_today = current_date.date() == today.date()
         row_class = 'today' if is_today else ''
@@ -448,21 +761,20 @@ def parse_schedule_data(data: Dict, current_week: int, current_year: int) -> str
         rows.append(f'''
       <tr class="{row_class}">
         <td class="date-cell">{date_str}</td>
-        <td class="times-cell">{ppt_to_moz_html}</td>
-        <td class="times-cell">{moz_to_ppt_html}</td>
+        {cells_html}
       </tr>
     ''')
 
     if not rows:
         return '<div class="info">❌ Aucun horaire trouvé dans les données</div>'
 
+    headers = '\n          '.join(f'<th>🚢 Départs {route.label}</th>' for route in routes)
     return f'''
     <table class="schedule-table">
       <thead>
         <tr>
           <th>📅 Date</th>
-          <th>🚢 Départs Papeete → Moorea</th>
-          <th>🚢 Départs Moorea → Papeete</th>
+          {headers}
         </tr>
       </thead>
       <tbody>
@@ -472,101 +784,178 @@ def parse_schedule_data(data: Dict, current_week: int, current_year: int) -> str
   '''
 
 
-def generate_multi_company_html(results: List[Dict], current_week: int, current_year: int):
+def load_unified_departures(filename: str = 'horaires.json') -> List[Departure]:
     """
-    Generate HTML page with schedules for all companies using unified horaires.json
+    Load the departures of an existing unified schedule file
 
     Args:
-        results: List of fetch results for each company (not used, kept for compatibility)
-        current_week: Current ISO week number
-        current_year: Current year
-    """
-    now = datetime.now()
+        filename: Unified schedule file
 
-    # Load unified schedules from horaires.json
+    Returns:
+        Departures in file order (sorted by departure time)
+    """
     try:
-        with open('horaires.json', 'r', encoding='utf-8') as f:
-            all_schedules = json.load(f)
+        with open(filename, 'r', encoding='utf-8') as f:
+            records = json.load(f)
     except FileNotFoundError:
-        all_schedules = []
-
-    # Separate schedules by direction
-    tahiti_to_moorea = []
-    moorea_to_tahiti = []
-
-    for schedule in all_schedules:
-        # Translate day names to French
-        day_translation = {
-            'Monday': 'Lundi',
-            'Tuesday': 'Mardi',
-            'Wednesday': 'Mercredi',
-            'Thursday': 'Jeudi',
-            'Friday': 'Vendredi',
-            'Saturday': 'Samedi',
-            'Sunday': 'Dimanche'
-        }
-        jour_fr = day_translation.get(schedule['jour'], schedule['jour'])
+        return []
 
-        # Format: "Lundi 25 novembre - 08:30"
-        date_obj = datetime.fromisoformat(schedule['timestamp'])
-        month_names_fr = {
-            1: 'janvier', 2: 'février', 3: 'mars', 4: 'avril', 5: 'mai', 6: 'juin',
-            7: 'juillet', 8: 'août', 9: 'septembre', 10: 'octobre', 11: 'novembre', 12: 'décembre'
-        }
-        date_formatted = f"{jour_fr} {date_obj.day} {month_names_fr[date_obj.month]}"
+    departures = [Departure.from_record(record) for record in records]
+    return [d for d in departures if d is not None]
 
-        schedule_entry = {
-            'bateau': schedule['bateau'],
-            'date_heure': f"{date_formatted} - {schedule['heure']}",
-            'timestamp': schedule['timestamp'],
-            'date': date_obj
-        }
 
-        if schedule['origine'] == 'PPT' and schedule['destination'] == 'MOZ':
-            tahiti_to_moorea.append(schedule_entry)
-        elif schedule['origine'] == 'MOZ' and schedule['destination'] == 'PPT':
-            moorea_to_tahiti.append(schedule_entry)
+def describe_horizon(current_week: int, current_year: int, horizon_weeks: int) -> Tuple[str, str]:
+    """
+    Describe a horizon for display
 
-    # Sort by timestamp
-    tahiti_to_moorea.sort(key=lambda x: x['timestamp'])
-    moorea_to_tahiti.sort(key=lambda x: x['timestamp'])
+    Args:
+        current_week: First ISO week of the horizon
+        current_year: ISO year of the first week
+        horizon_weeks: Number of weeks
 
-    # Generate table rows for Tahiti to Moorea
-    tahiti_moorea_rows = []
-    for schedule in tahiti_to_moorea:
-        is_today = schedule['date'].date() == now.date()
-        row_class = 'today' if is_today else ''
-        tahiti_moorea_rows.append(f'''
-          <tr class="{row_class}">
-            <td class="vessel-cell">{schedule['bateau']}</td>
-            <td class="datetime-cell">{schedule['date_heure']}</td>
-          </tr>
-        ''')
+    Returns:
+        Tuple of (weeks label, horizon described in a sentence)
+    """
+    horizon = get_horizon_weeks(get_monday_of_week(current_week, current_year), horizon_weeks)
+    last_week, last_year = horizon[-1]
+    if horizon_weeks == 1:
+        return f"Semaine {current_week} de {current_year}", "la semaine en cours"
+    if horizon_weeks == 2 and last_year == current_year:
+        return f"Semaines {current_week} et {last_week} de {current_year}", "les deux prochaines semaines"
+    if last_year == current_year:
+        weeks_label = f"Semaines {current_week} à {last_week} de {current_year}"
+    else:
+        weeks_label = f"Semaines {current_week}/{current_year} à {last_week}/{last_year}"
+    return weeks_label, f"les {horizon_weeks} prochaines semaines"
+
+
+def generate_multi_company_html(results: List[Dict], current_week: int, current_year: int,
+                                build_state: Optional[BuildState] = None,
+                                horizon_weeks: int = DEFAULT_HORIZON_WEEKS,
+                                departures: Optional[List[Departure]] = None,
+                                render_mode: str = 'static',
+                                timelines: Optional[Dict[str, List[Departure]]] = None):
+    """
+    Generate HTML page with schedules for all companies
 
-    # Generate table rows for Moorea to Tahiti
-    moorea_tahiti_rows = []
-    for schedule in moorea_to_tahiti:
-        is_today = schedule['date'].date() == now.date()
-        row_class = 'today' if is_today else ''
-        moorea_tahiti_rows.append(f'''
+    The page is rendered from the unified departures handed over by
+    create_unified_horaires_json, already sorted by departure time, and
+    from the per-route timelines they were merged from: each configured
+    route gets its own table, read from its own timeline. When they are
+    not given, the normalized departures of the results are merged.
+    To regenerate the page from an existing horaires.json, pass the output
+    of load_unified_departures.
+
+    With a build state, the page is only rendered again when horaires.json
+    or the current day changed since it was last written.
+
+    In 'client' render mode, index.html is a small static shell and the
+    departures are written to a compact columnar payload that the browser
+    renders one day at a time.
+
+    Args:
+        results: List of fetch results for each company
+        current_week: Current ISO week number
+        current_year: Current year
+        build_state: Incremental build state, or None for a full rebuild
+        horizon_weeks: Number of weeks covered by the schedules
+        departures: Unified departures sorted by departure time
+        render_mode: 'static' or 'client'
+        timelines: Departures of each route id sorted by departure time,
+            as returned by get_result_timelines
+    """
+    now = datetime.now()
+
+    if build_state is not None:
+        horaires_output = build_state.outputs.get('horaires.json', {})
+        page_fingerprint = fingerprint([
+            horaires_output.get('fingerprint'), now.date().isoformat(), current_week, current_year,
+            horizon_weeks, render_mode, [[route.id, route.label] for route in get_routes()]
+        ])
+        if build_state.output_is_current('index.html', page_fingerprint):
+            log("✅ Page HTML déjà à jour: index.html")
+            return
+
+    if departures is None:
+        timelines = get_result_timelines(results)
+        departures = merge_departures(timelines)
+
+    weeks_label, horizon_label = describe_horizon(current_week, current_year, horizon_weeks)
+
+    if render_mode == 'client':
+        write_compact_payload(departures, now)
+        precompress(DEFAULT_COMPACT_FILE)
+        with open('index.html', 'w', encoding='utf-8') as f:
+            f.write(render_client_shell(weeks_label, horizon_label))
+        precompress('index.html')
+
+        if build_state is not None:
+            build_state.record_output('index.html', page_fingerprint)
+
+        log(f"✅ Page HTML multi-compagnies générée: index.html (rendu client, {DEFAULT_COMPACT_FILE})")
+        return
+
+    if timelines is None:
+        # Separate schedules by route, keeping the departure time order
+        timelines = {}
+        for departure in departures:
+            timelines.setdefault(route_id(departure.origin, departure.destination), []).append(departure)
+
+    today_index = to_epoch_minutes(now) // 1440
+    day_labels = {}
+
+    def render_row(departure: Departure) -> str:
+        day_index, minute_of_day = divmod(departure.minute, 1440)
+
+        # Format: "Lundi 25 novembre - 08:30", day part computed once per day
+        day_label = day_labels.get(day_index)
+        if day_label is None:
+            date_obj = from_epoch_minutes(day_index * 1440)
+            day_label = (f"{FRENCH_DAY_NAMES[date_obj.weekday()]} {date_obj.day} "
+                         f"{FRENCH_MONTH_NAMES[date_obj.month - 1]}")
+            day_labels[day_index] = day_label
+        date_heure = f"{day_label} - {minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+
+        row_class = 'today' if day_index == today_index else ''
+        stale_badge = ''
+        if departure.stale:
+            row_class = f"{row_class} stale".strip()
+            stale_badge = ' <span title="Horaire de la dernière récupération réussie">⏳</span>'
+        return f'''
           <tr class="{row_class}">
-            <td class="vessel-cell">{schedule['bateau']}</td>
-            <td class="datetime-cell">{schedule['date_heure']}</td>
+            <td class="vessel-cell">{departure.vessel}{stale_badge}</td>
+            <td class="datetime-cell">{date_heure}</td>
           </tr>
-        ''')
+        '''
 
-    # French date formatting
-    day_names = ['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']
-    month_names = ['janvier', 'février', 'mars', 'avril', 'mai', 'juin',
-                   'juillet', 'août', 'septembre', 'octobre', 'novembre', 'décembre']
+    # Generate one table per route, from the timeline of that route only
+    route_tables = []
+    for route in get_routes():
+        route_rows = [render_row(departure) for departure in timelines.get(route.id, ())]
+        route_tables.append(f'''<h2>🚢 Départs {route.label}</h2>
+        <table class="schedule-table">
+            <thead>
+                <tr>
+                    <th>Nom du Bateau</th>
+                    <th>Jour et Heure du Départ</th>
+                </tr>
+            </thead>
+            <tbody>
+                {''.join(route_rows) if route_rows else '<tr><td colspan="2">Aucun horaire disponible</td></tr>'}
+            </tbody>
+        </table>''')
 
-    weekday = day_names[now.weekday()]
-    month = month_names[now.month - 1]
-    date_formatted = f"{weekday} {now.day} {month} {now.year}"
+    stale_notice = ''
+    if any(departure.stale for departure in departures):
+        stale_notice = ("⏳ Certaines compagnies n'ont pas pu être mises à jour : leurs horaires "
+                        "proviennent de la dernière récupération réussie.<br>")
 
-    # Determine next week for display
-    next_week_date = now + timedelta(weeks=1)
-    next_week = get_week_number(next_week_date)
+    route_sections = '\n\n        '.join(route_tables)
+
+    # French date formatting
+    weekday = FRENCH_DAY_NAMES[now.weekday()].lower()
+    month = FRENCH_MONTH_NAMES[now.month - 1]
+    date_formatted = f"{weekday} {now.day} {month} {now.year}"
 
     html = f'''<!DOCTYPE html>
 <html lang="fr">
@@ -654,6 +1043,9 @@ def generate_multi_company_html(results: List[Dict], current_week: int, current_
         .today .vessel-cell {{
             color: #f5576c;
         }}
+        .stale {{
+            opacity: 0.6;
+        }}
         .footer {{
             text-align: center;
             margin-top: 30px;
@@ -667,39 +1059,15 @@ def generate_multi_company_html(results: List[Dict], current_week: int, current_
 <body>
     <div class="container">
         <h1>🚢 Horaires Ferries Tahiti-Moorea</h1>
-        <div class="subtitle">Semaines {current_week} et {next_week} de {current_year} - {date_formatted}</div>
+        <div class="subtitle">{weeks_label} - {date_formatted}</div>
 
         <div class="info">
             <strong>ℹ️ Informations:</strong><br>
-            Cette page affiche les horaires de toutes les compagnies maritimes desservant la liaison Tahiti-Moorea pour les deux prochaines semaines.<br>
-            Dernière mise à jour: {now.strftime('%d/%m/%Y à %H:%M:%S')}
+            Cette page affiche les horaires de toutes les compagnies maritimes desservant la liaison Tahiti-Moorea pour {horizon_label}.<br>
+            {stale_notice}Dernière mise à jour: {now.strftime('%d/%m/%Y à %H:%M:%S')}
         </div>
 
-        <h2>🚢 Départs Papeete → Moorea</h2>
-        <table class="schedule-table">
-            <thead>
-                <tr>
-                    <th>Nom du Bateau</th>
-                    <th>Jour et Heure du Départ</th>
-                </tr>
-            </thead>
-            <tbody>
-                {''.join(tahiti_moorea_rows) if tahiti_moorea_rows else '<tr><td colspan="2">Aucun horaire disponible</td></tr>'}
-            </tbody>
-        </table>
-
-        <h2>🚢 Départs Moorea → Papeete</h2>
-        <table class="schedule-table">
-            <thead>
-                <tr>
-                    <th>Nom du Bateau</th>
-                    <th>Jour et Heure du Départ</th>
-                </tr>
-            </thead>
-            <tbody>
-                {''.join(moorea_tahiti_rows) if moorea_tahiti_rows else '<tr><td colspan="2">Aucun horaire disponible</td></tr>'}
-            </tbody>
-        </table>
+        {route_sections}
 
         <div class="footer">
             <p>🔄 Page générée automatiquement via GitHub Actions</p>
@@ -711,8 +1079,12 @@ def generate_multi_company_html(results: List[Dict], current_week: int, current_
 
     with open('index.html', 'w', encoding='utf-8') as f:
         f.write(html)
+    precompress('index.html')
+
+    if build_state is not None:
+        build_state.record_output('index.html', page_fingerprint)
 
-    print("✅ Page HTML multi-compagnies générée: index.html")
+    log("✅ Page HTML multi-compagnies générée: index.html")
 
 
 def generate_error_html(error_message: str):
@@ -795,147 +1167,1209 @@ def generate_error_html(error_message: str):
 
     with open('index.html', 'w', encoding='utf-8') as f:
         f.write(html)
+    precompress('index.html')
 
-    print("⚠️  Page HTML d'erreur générée: index.html")
+    log("⚠️  Page HTML d'erreur générée: index.html")
 
 
-def create_unified_horaires_json(all_results: List[Dict]):
+def get_result_key(result: Dict) -> str:
     """
-    Create a unified horaires.json file with all schedules from all companies for all weeks
+    Get the key identifying the (company, week) input of a result
 
     Args:
-        all_results: List of all fetch results (all companies, all weeks)
+        result: Fetch result
+
+    Returns:
+        Key in the form "{company-id}/{year}/{week}"
+    """
+    return f"{result['company']['id']}/{result['year']}/{result['week']}"
+
+
+def normalize_result(result: Dict, snapshot_writer: SnapshotWriter,
+                     build_state: Optional[BuildState] = None,
+                     sinks: Optional[List[DepartureSink]] = None):
     """
-    print("\n📦 Création du fichier horaires.json unifié...")
+    Normalize the payload of one successful result
 
-    unified_schedules = []
+    Args:
+        result: Successful fetch result, completed with 'departures'
+        snapshot_writer: Writer of the data/ snapshots
+        build_state: Incremental build state, or None for a full rebuild
+        sinks: Additional consumers of the departure stream
+    """
+    company = result['company']
+    if result.get('streamed'):
+        # Normalized while streaming, and its snapshot already written
+        if sinks:
+            feed_sinks(result['departures'], result, sinks)
+        if build_state is not None:
+            result['fingerprint'] = fingerprint([
+                company['name'], company.get('vessel_name'), False, result['dataHash'], get_payload_keys()
+            ])
+            build_state.record_input(
+                get_result_key(result), result['fingerprint'], [d.to_row() for d in result['departures']]
+            )
+        return
+
+    if build_state is not None:
+        result['fingerprint'] = fingerprint([
+            company['name'], company.get('vessel_name'), bool(result.get('stale')), result['data'],
+            get_payload_keys()
+        ])
+        rows = build_state.cached_records(get_result_key(result), result['fingerprint'])
+        if rows is not None and not sinks and snapshot_writer.is_current(result):
+            result['departures'] = [Departure.from_row(row) for row in rows]
+            result['reused'] = True
+            snapshot_writer.touch(result)
+            return
+
+    collector = DepartureCollector()
+    departures = iter_departures(result['data'], result['week'], result['year'], company,
+                                 stale=bool(result.get('stale')))
+    feed_sinks(departures, result, [snapshot_writer, collector] + (sinks or []))
+    result['departures'] = collector.departures
+
+    if build_state is not None:
+        build_state.record_input(
+            get_result_key(result), result['fingerprint'], [d.to_row() for d in collector.departures]
+        )
+
+
+def process_result(result: Dict, snapshot_writer: SnapshotWriter,
+                   build_state: Optional[BuildState] = None,
+                   sinks: Optional[List[DepartureSink]] = None):
+    """
+    Normalize one fetch result if it succeeded, and add its outcome to the run report
 
+    Args:
+        result: Fetch result
+        snapshot_writer: Writer of the data/ snapshots
+        build_state: Incremental build state, or None for a full rebuild
+        sinks: Additional consumers of the departure stream
+    """
+    start = time.perf_counter()
+    if result['success']:
+        normalize_result(result, snapshot_writer, build_state, sinks)
+
+    report = get_run_report()
+    if report is not None:
+        report.record_week(
+            company=result['company']['id'], week=result['week'], year=result['year'],
+            success=result['success'], source=result.get('source', 'firebase'),
+            unchanged=bool(result.get('unchanged')), reused=bool(result.get('reused')),
+            stale=bool(result.get('stale')), staleSince=result.get('staleSince'),
+            records=len(result.get('departures') or ()),
+            seconds=round(time.perf_counter() - start, 6), error=result.get('error')
+        )
+
+
+def normalize_results(all_results: List[Dict], build_state: Optional[BuildState] = None,
+                      sinks: Optional[List[DepartureSink]] = None):
+    """
+    Normalize the payload of every successful result in a single pass
+
+    Each payload is walked once by iter_departures and its departures are
+    streamed to the data/ snapshot writer, to a collector stored in the
+    result as 'departures', and to any extra sinks. With a build state,
+    results whose content and snapshot did not change reuse the
+    departures of the previous run without walking the payload at all.
+    Results fetched with streamingParse were already normalized and their
+    snapshots written while streaming: only the extra sinks and the build
+    state see them here. The outcome of every (company, week) is added to
+    the run report.
+
+    Args:
+        all_results: List of all fetch results (all companies, all weeks)
+        build_state: Incremental build state, or None for a full rebuild
+        sinks: Additional consumers of the departure streams
+    """
+    snapshot_writer = SnapshotWriter()
     for result in all_results:
-        if not result['success']:
-            continue
+        process_result(result, snapshot_writer, build_state, sinks)
 
-        company = result['company']
-        week = result['week']
-        year = result['year']
-        data = result['data']
 
-        # Get Monday of the week
-        monday_date = get_monday_of_week(week, year)
+def get_result_timelines(all_results: List[Dict]) -> Dict[str, List[Departure]]:
+    """
+    Merge the departures of every successful result into per-route timelines
 
-        # Process schedules
-        for destination in ['MOZ', 'PPT']:
-            if destination not in data or not isinstance(data[destination], list):
-                continue
+    Each (company, week, route) stream is sorted once by departure
+    minute, then the streams of each route are combined by a k-way merge.
 
-            for day_data in data[destination]:
-                if not day_data or not isinstance(day_data, dict):
-                    continue
+    Args:
+        all_results: List of all fetch results (all companies, all weeks),
+            normalized by normalize_results or not
+
+    Returns:
+        Dictionary mapping each route id to its departures sorted by
+        departure time
+    """
+    return merge_timelines(
+        split_directions(result['departures'] if result.get('departures') is not None else
+                         iter_departures(result['data'], result['week'], result['year'], result['company']))
+        for result in all_results if result['success']
+    )
+
+
+def create_unified_horaires_json(all_results: List[Dict],
+                                 build_state: Optional[BuildState] = None,
+                                 shards_dir: Optional[str] = DEFAULT_SHARDS_DIR,
+                                 timelines: Optional[Dict[str, List[Departure]]] = None) -> List[Departure]:
+    """
+    Create a unified horaires.json file with all schedules from all companies for all weeks
 
-                for schedule_id, schedule in day_data.items():
-                    if not schedule or not isinstance(schedule, dict):
-                        continue
-
-                    day = schedule.get('day')
-                    if day is None:
-                        continue
-
-                    # Calculate actual date
-                    actual_date = monday_date + timedelta(days=day)
-
-                    # Get vessel name - prioritize vessel_name field, then extract from vessel field
-                    vessel_name = schedule.get('vessel_name')
-                    if not vessel_name and 'vessel' in schedule:
-                        vessel_name = extract_vessel_name(schedule['vessel'])
-                    if not vessel_name:
-                        vessel_name = company.get('vessel_name', company['name'])
-
-                    # Create schedule entry
-                    unified_schedules.append({
-                        'bateau': vessel_name,
-                        'compagnie': company['name'],
-                        'origine': schedule.get('origin', ''),
-                        'destination': schedule.get('destination', ''),
-                        'date': actual_date.strftime('%Y-%m-%d'),
-                        'jour': actual_date.strftime('%A'),
-                        'heure': seconds_to_time(schedule.get('timeBegin', 0)),
-                        'timestamp': actual_date.replace(
-                            hour=schedule.get('timeBegin', 0) // 3600,
-                            minute=(schedule.get('timeBegin', 0) % 3600) // 60
-                        ).isoformat(),
-                        'statut': schedule.get('status', 'active')
-                    })
-
-    # Sort by timestamp
-    unified_schedules.sort(key=lambda x: x['timestamp'])
+    Uses the departures attached to each result by normalize_results,
+    merged from their per-route timelines rather than sorted again.
+    With a build state, horaires.json is only rewritten when the content
+    of its inputs changed since the previous run. Whenever it is
+    rewritten, the differences with the previous version are written to
+    changes.json, the binary departure index is rewritten, the schedule
+    is split into per-day and per-direction shards, and gzip copies of
+    every file are written alongside.
+
+    Args:
+        all_results: List of all fetch results (all companies, all weeks),
+            normalized by normalize_results when a build state is given
+        build_state: Incremental build state, or None for a full rebuild
+        shards_dir: Directory of the sharded copy, or None to skip it
+        timelines: Per-route timelines of the results, as returned by
+            get_result_timelines, computed when not given
+
+    Returns:
+        Unified departures sorted by departure time, departures at the
+        same minute in route order
+    """
+    log("\n📦 Création du fichier horaires.json unifié...")
+
+    if timelines is None:
+        timelines = get_result_timelines(all_results)
+    unified_schedules = merge_departures(timelines)
+
+    input_fingerprints = []
+    if build_state is not None:
+        input_fingerprints = [[get_result_key(result), result['fingerprint']]
+                              for result in all_results if result['success']]
+
+    if build_state is not None:
+        build_state.retain_inputs([key for key, _ in input_fingerprints])
+        reused_count = sum(1 for r in all_results if r.get('reused'))
+        log(f"♻️  {reused_count} semaine(s) réutilisée(s) sans recalcul")
+
+        unified_fingerprint = fingerprint(input_fingerprints)
+        if build_state.output_is_current('horaires.json', unified_fingerprint):
+            log(f"✅ Fichier horaires.json déjà à jour ({len(unified_schedules)} horaires)")
+            return unified_schedules
+
+    previous_schedules, previous_version = load_schedule_version('horaires.json')
 
     # Save to horaires.json
+    content = json.dumps([d.to_record() for d in unified_schedules], indent=2, ensure_ascii=False)
     with open('horaires.json', 'w', encoding='utf-8') as f:
-        json.dump(unified_schedules, f, indent=2, ensure_ascii=False)
+        f.write(content)
 
-    print(f"✅ Fichier horaires.json créé avec {len(unified_schedules)} horaires")
-    return unified_schedules
+    if build_state is not None:
+        build_state.record_output('horaires.json', unified_fingerprint)
 
+    log(f"✅ Fichier horaires.json créé avec {len(unified_schedules)} horaires")
 
-def fetch_all_schedules():
-    """Main function to fetch all schedules"""
+    # Publish what changed since the previous horaires.json
+    diff = diff_departures(previous_schedules, unified_schedules)
+    write_changes(build_changes(diff, previous_version, fingerprint(content)))
+    counts = {kind: len(items) for kind, items in diff.items()}
+    log(f"🔀 Fichier changes.json créé: {counts['added']} ajouté(s), {counts['removed']} supprimé(s), "
+        f"{counts['retimed']} décalé(s), {counts['updated']} modifié(s)")
+
+    precompress('horaires.json')
+    precompress('changes.json')
+
+    # Binary index for fast command line lookups (departure_index.py)
     try:
-        print("📋 Chargement de la configuration des compagnies...")
+        write_departure_index(unified_schedules, DEFAULT_INDEX_FILE)
+        log(f"🔎 Index binaire {DEFAULT_INDEX_FILE} écrit")
+    except ValueError as e:
+        # A lookup aid only: drop the outdated index rather than fail the build
+        if os.path.exists(DEFAULT_INDEX_FILE):
+            os.remove(DEFAULT_INDEX_FILE)
+        log(f"⚠️  {e}, {DEFAULT_INDEX_FILE} supprimé")
+
+    # Publish small content-addressed files per day and direction
+    if shards_dir:
+        manifest = write_shards(unified_schedules, shards_dir, fingerprint(content))
+        shard_count = sum(len(directions) for directions in manifest['days'].values())
+        log(f"🧩 {shard_count} fichier(s) par jour et direction écrits dans {shards_dir}/")
+
+    report = get_run_report()
+    if report is not None:
+        report.extra['changes'] = counts
 
-        # Load companies configuration
-        with open('companies.json', 'r', encoding='utf-8') as f:
-            companies_config = json.load(f)
+    return unified_schedules
 
-        all_companies = companies_config['companies']
 
-        # Filter only configured companies
-        companies = [c for c in all_companies if is_company_configured(c)]
+def get_company_host(company: Dict) -> str:
+    """
+    Get the host used to fetch a company's schedules
+
+    Static schedule companies share a pseudo-host so they are throttled
+    together like any other source.
 
-        print(f"✅ {len(companies)} compagnie(s) configurée(s) sur {len(all_companies)} au total")
+    Args:
+        company: Company configuration
+
+    Returns:
+        Network location of the Firebase database, or "static"
+    """
+    if company.get('staticSchedule'):
+        return 'static'
+    return urlparse(company['firebase']['databaseURL']).netloc
 
-        # Calculate current week and next week
-        now = datetime.now()
-        current_week = get_week_number(now)
-        current_year = now.year
 
-        # Calculate next week
-        next_week_date = now + timedelta(weeks=1)
-        next_week = get_week_number(next_week_date)
-        next_week_year = next_week_date.year
+def fetch_company_weeks(company: Dict, year: int, weeks: List[int]) -> List[Dict]:
+    """
+    Fetch or load the schedules of one company for several weeks of a year
 
-        print(f"📅 Récupération des semaines {current_week} et {next_week} de {current_year}")
+    Args:
+        company: Company configuration
+        year: ISO year
+        weeks: ISO week numbers
 
-        # Create data directory if it doesn't exist
-        os.makedirs('data', exist_ok=True)
+    Returns:
+        List of result dictionaries, one per week
+    """
+    if company.get('staticSchedule'):
+        # Load from static file
+        return [load_static_schedules(company, week, year) for week in weeks]
+    # Fetch from Firebase with one range request
+    if get_session_pool().stream_bodies:
+        return stream_company_schedule_range(company, year, weeks)
+    return fetch_company_schedule_range(company, year, weeks)
+
+
+def consecutive_runs(weeks: List[int]) -> List[List[int]]:
+    """
+    Split week numbers into runs of consecutive weeks
+
+    A range request covers every week between its bounds, so weeks with a
+    gap between them are fetched by separate requests rather than
+    downloading the weeks in the gap.
+
+    Args:
+        weeks: ISO week numbers of one year
+
+    Returns:
+        Lists of consecutive week numbers, in ascending order
+    """
+    runs: List[List[int]] = []
+    for week in sorted(set(weeks)):
+        if runs and week == runs[-1][-1] + 1:
+            runs[-1].append(week)
+        else:
+            runs.append([week])
+    return runs
+
+
+def fetch_all_results(companies: List[Dict], weeks: List[Tuple[int, int]],
+                      max_workers: int = DEFAULT_MAX_WORKERS,
+                      max_per_host: int = DEFAULT_MAX_PER_HOST,
+                      deadline: Optional[float] = None,
+                      on_late_results: Optional[Callable[[List[Dict]], None]] = None,
+                      on_results: Optional[Callable[[List[Dict]], None]] = None,
+                      keys: Optional[Set[Tuple[str, int, int]]] = None) -> List[Dict]:
+    """
+    Fetch every (company, week) pair concurrently
+
+    Firebase companies get one job per run of consecutive weeks of each
+    ISO year, static companies one job per week. Jobs are submitted round-robin across
+    companies so that no single host fills the pool, and each host is
+    limited to max_per_host jobs in flight. Results are returned in
+    company order then week order, whatever the completion order, and a
+    failure only affects its own results.
+
+    With a deadline, jobs still running when it expires are returned as
+    failed results without waiting for them. Jobs run on daemon threads,
+    so late jobs never keep the process alive. With on_late_results, late
+    jobs keep running in the background and their results, once
+    available, are handed over to it (from a worker thread); without it,
+    late jobs not started yet are cancelled.
+
+    Each job's results are also handed over to on_results as soon as the
+    job is done, in completion order, so later stages can start on them
+    while the other jobs are still running.
 
-        # Fetch schedules for each company for both weeks
-        all_results = []
-        for company in companies:
-            for week, year in [(current_week, current_year), (next_week, next_week_year)]:
-                if company.get('staticSchedule'):
-                    # Load from static file
-                    result = load_static_schedules(company, week, year)
+    Args:
+        companies: Configured companies
+        weeks: List of (week, year) tuples to fetch
+        max_workers: Maximum number of concurrent jobs
+        max_per_host: Maximum number of concurrent jobs per host
+        deadline: Seconds to wait for the jobs, or None to wait for all of them
+        on_late_results: Callback receiving the results of each late job
+        on_results: Callback receiving the results of each job in time
+        keys: (company id, week, year) pairs to fetch, or None for every
+            company and every week
+
+    Returns:
+        List of result dictionaries, one per (company, week)
+    """
+    if not companies or not weeks:
+        return []
+
+    weeks_by_year: Dict[int, List[int]] = {}
+    for week, year in weeks:
+        weeks_by_year.setdefault(year, []).append(week)
+
+    host_limits = {}
+    for company in companies:
+        host_limits.setdefault(get_company_host(company), threading.BoundedSemaphore(max_per_host))
+
+    def run(company: Dict, year: int, job_weeks: List[int]) -> List[Dict]:
+        with host_limits[get_company_host(company)]:
+            return fetch_company_weeks(company, year, job_weeks)
+
+    def wanted(company: Dict, week: int, year: int) -> bool:
+        return keys is None or (company['id'], week, year) in keys
+
+    jobs = []
+    for year, year_weeks in weeks_by_year.items():
+        for index, company in enumerate(companies):
+            job_weeks = [week for week in year_weeks if wanted(company, week, year)]
+            if not job_weeks:
+                continue
+            if company.get('staticSchedule'):
+                jobs.extend((index, year, [week]) for week in job_weeks)
+            else:
+                jobs.extend((index, year, run_weeks) for run_weeks in consecutive_runs(job_weeks))
+
+    def hand_over_late(future):
+        if not future.cancelled() and future.exception() is None:
+            on_late_results(future.result())
+
+    def failed_results(company: Dict, year: int, job_weeks: List[int], error: str) -> List[Dict]:
+        return [{
+            'success': False,
+            'company': company,
+            'week': week,
+            'year': year,
+            'error': error
+        } for week in job_weeks]
+
+    results_by_key = {}
+
+    def collect(index: int, year: int, job_weeks: List[int], job_results: List[Dict]):
+        for week, result in zip(job_weeks, job_results):
+            # Static load failures do not name their week
+            result.setdefault('week', week)
+            result.setdefault('year', year)
+            results_by_key[(index, week, year)] = result
+        if on_results is not None:
+            on_results(job_results)
+
+    late = False
+    executor = DaemonExecutor(min(max_workers, len(jobs)), 'fetch')
+    try:
+        futures = {
+            executor.submit(run, companies[index], year, job_weeks): (index, year, job_weeks)
+            for index, year, job_weeks in jobs
+        }
+
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                pending.discard(future)
+                index, year, job_weeks = futures[future]
+                company = companies[index]
+                try:
+                    job_results = future.result()
+                except Exception as e:
+                    log(f"❌ Erreur pour {company['name']}: {str(e)}")
+                    job_results = failed_results(company, year, job_weeks, str(e))
+                collect(index, year, job_weeks, job_results)
+        except FutureTimeoutError:
+            late = True
+            for future in [future for future in futures if future in pending]:
+                index, year, job_weeks = futures[future]
+                company = companies[index]
+                if on_late_results is not None:
+                    log(f"⏱️  Délai dépassé pour {company['name']}, récupération poursuivie en arrière-plan")
+                    future.add_done_callback(hand_over_late)
                 else:
-                    # Fetch from Firebase
-                    result = fetch_company_schedules(company, week, year)
+                    log(f"⏱️  Délai dépassé pour {company['name']}, récupération abandonnée")
+                collect(index, year, job_weeks,
+                        failed_results(company, year, job_weeks, f"Délai de {deadline} s dépassé"))
+    finally:
+        executor.shutdown(cancel_futures=late and on_late_results is None)
+
+    return [
+        results_by_key[(index, week, year)]
+        for index, company in enumerate(companies)
+        for week, year in weeks if wanted(company, week, year)
+    ]
+
+
+def serve_stale_results(all_results: List[Dict],
+                        max_age_days: Optional[float] = DEFAULT_STALE_MAX_AGE_DAYS,
+                        snapshot_writer: Optional[SnapshotWriter] = None) -> int:
+    """
+    Replace failed results with the last good data/ snapshot of their week
+
+    The replacement results are flagged 'stale', keep the fetch error and
+    give the time of the last successful fetch as 'staleSince'. Their
+    snapshots are left untouched.
+
+    Args:
+        all_results: List of all fetch results, updated in place
+        max_age_days: Oldest snapshot to serve in days, or None for any age
+        snapshot_writer: Snapshot store, defaults to data/
+
+    Returns:
+        Number of results served from a snapshot
+    """
+    snapshot_writer = snapshot_writer or SnapshotWriter()
+    now = datetime.now()
+    served = 0
 
-                all_results.append(result)
+    for index, result in enumerate(all_results):
+        if result['success']:
+            continue
+
+        snapshot = snapshot_writer.load(result)
+        if snapshot is None:
+            continue
+        validated_at = snapshot['validatedAt']
+        if max_age_days is not None and now - validated_at > timedelta(days=max_age_days):
+            continue
+
+        company = result['company']
+        log(f"⏳ {company['name']} - Semaine {result['week']}: données du "
+            f"{validated_at.strftime('%d/%m/%Y à %H:%M')} utilisées à la place")
+        stale_result = {
+            'success': True,
+            'company': company,
+            'week': result['week'],
+            'year': result['year'],
+            'data': snapshot['data'],
+            'unchanged': True,
+            'stale': True,
+            'staleSince': validated_at.isoformat(),
+            'error': result.get('error')
+        }
+        if snapshot.get('source'):
+            stale_result['source'] = snapshot['source']
+        all_results[index] = stale_result
+        served += 1
 
-        # Create unified horaires.json
-        unified_schedules = create_unified_horaires_json(all_results)
+    return served
 
-        # Generate HTML page with unified schedules
-        generate_multi_company_html(all_results, current_week, current_year)
 
-        print("\n✅ Processus terminé avec succès!")
+def print_connection_stats(session_pool: SessionPool):
+    """
+    Print how many HTTP connections were opened and reused per host, and
+    which hosts had their circuit opened
+
+    Args:
+        session_pool: Session pool used for the run
+    """
+    for host, stats in session_pool.stats().items():
+        log(f"🔌 {host}: {stats['requests']} requête(s), "
+            f"{stats['connections']} connexion(s) ouverte(s), {stats['reused']} réutilisée(s)")
+    for host, breaker in session_pool.breakers().items():
+        if breaker['state'] != 'closed':
+            log(f"🚫 {host}: circuit {breaker['state']} après {breaker['failures']} échec(s)")
+
+
+def configure_fetching(companies_config: Dict) -> SessionPool:
+    """
+    Configure the shared HTTP sessions and the payload cache
+
+    Args:
+        companies_config: Content of companies.json, with its optional
+            "http" and "cache" sections
+
+    Returns:
+        The shared session pool
+    """
+    http_config = companies_config.get('http', {})
+    session_pool = configure_session_pool(
+        pool_maxsize=http_config.get('poolMaxsize', DEFAULT_MAX_PER_HOST),
+        connect_timeout=http_config.get('connectTimeout', DEFAULT_CONNECT_TIMEOUT),
+        read_timeout=http_config.get('readTimeout', DEFAULT_READ_TIMEOUT),
+        retries=http_config.get('retries', DEFAULT_RETRIES),
+        backoff_base=http_config.get('backoffBase', DEFAULT_BACKOFF_BASE),
+        backoff_max=http_config.get('backoffMax', DEFAULT_BACKOFF_MAX),
+        hedge_percentile=http_config.get('hedgePercentile'),
+        breaker_threshold=http_config.get('breakerThreshold', DEFAULT_BREAKER_THRESHOLD),
+        breaker_reset=http_config.get('breakerResetSeconds', DEFAULT_BREAKER_RESET),
+        stream_bodies=http_config.get('streamingParse', False)
+    )
+
+    cache_config = companies_config.get('cache', {})
+    if cache_config.get('enabled', True):
+        set_http_cache(HttpCache(
+            directory=cache_config.get('directory', DEFAULT_CACHE_DIR),
+            ttl=cache_config.get('ttlDays', DEFAULT_TTL / 86400) * 86400,
+            max_bytes=int(cache_config.get('maxMegabytes', DEFAULT_MAX_BYTES / 1048576) * 1048576),
+            max_age=cache_config.get('maxAgeMinutes', DEFAULT_MAX_AGE / 60) * 60
+        ))
+    else:
+        set_http_cache(None)
+
+    return session_pool
+
+
+def publish_results(report: RunReport, all_results: List[Dict], companies_config: Dict,
+                    horizon: List[Tuple[int, int]], build_state: Optional[BuildState] = None,
+                    render_mode: Optional[str] = None, normalized: bool = False) -> List[Departure]:
+    """
+    Normalize fetch results and write every output
+
+    Runs the normalize, unify, archive and render stages of a run, each
+    timed in the run report, then saves the build state.
+
+    Args:
+        report: Run report of the run
+        all_results: List of all fetch results (all companies, all weeks)
+        companies_config: Content of companies.json
+        horizon: List of (week, year) tuples covered by the results
+        build_state: Incremental build state, or None for a full rebuild
+        render_mode: 'static' or 'client', defaults to the "render" section
+            of companies.json
+        normalized: Whether the results were already normalized and their
+            snapshots saved, as done by an OverlappedNormalizer during the fetch
+
+    Returns:
+        Unified departures sorted by departure time
+    """
+    current_week, current_year = horizon[0]
+
+    # Normalize every payload once and save data/ snapshots
+    with report.stage('normalize') as stage:
+        if not normalized:
+            normalize_results(all_results, build_state)
+        stage['records'] = sum(len(r.get('departures') or ()) for r in all_results)
+        stage['reused'] = sum(1 for r in all_results if r.get('reused'))
+
+    # Create unified horaires.json (optional "shards" section for its sharded copy)
+    shards_config = companies_config.get('shards', {})
+    shards_dir = shards_config.get('directory', DEFAULT_SHARDS_DIR) if shards_config.get('enabled', True) else None
+    with report.stage('unify') as stage:
+        timelines = get_result_timelines(all_results)
+        unified_schedules = create_unified_horaires_json(all_results, build_state, shards_dir, timelines)
+        stage['records'] = len(unified_schedules)
+        stage['outputBytes'] = os.path.getsize('horaires.json')
+
+    # Archive the published departures (optional "archive" section)
+    archive_config = companies_config.get('archive', {})
+    if archive_config.get('enabled', False):
+        with report.stage('archive') as stage:
+            with ScheduleArchive(archive_config.get('path', DEFAULT_ARCHIVE_FILE)) as archive:
+                stage.update(archive.record_run(unified_schedules, get_covered_weeks(all_results)))
+            log(f"🗄️  Archive mise à jour (exécution #{stage['id']}): +{stage['added']} "
+                f"~{stage['updated']} -{stage['removed']}")
+
+    # Generate HTML page from the unified schedules in memory
+    if render_mode is None:
+        render_mode = companies_config.get('render', {}).get('mode', 'static')
+    with report.stage('render') as stage:
+        generate_multi_company_html(all_results, current_week, current_year, build_state,
+                                    horizon_weeks=len(horizon), departures=unified_schedules,
+                                    render_mode=render_mode, timelines=timelines)
+        stage['mode'] = render_mode
+        stage['outputBytes'] = os.path.getsize('index.html')
+
+    if build_state is not None:
+        build_state.save()
+
+    return unified_schedules
+
+
+def fetch_all_schedules(incremental: bool = False, weeks: int = DEFAULT_HORIZON_WEEKS,
+                        report_file: Optional[str] = DEFAULT_REPORT_FILE,
+                        render_mode: Optional[str] = None):
+    """
+    Main function to fetch all schedules
+
+    Every stage is timed and the run is described in a report written next
+    to horaires.json, whether it succeeds or not.
+
+    Args:
+        weeks: Number of weeks to fetch, starting with the current one
+        incremental: Reuse the work of the previous run for unchanged inputs
+            and only rewrite outputs whose content changed
+        report_file: Run report file, or None to skip writing it
+        render_mode: 'static' or 'client', defaults to the "render" section
+            of companies.json
+    """
+    report = start_run_report()
+    report.extra.update({'incremental': incremental, 'horizonWeeks': weeks})
+    success = False
+
+    try:
+        with report.stage('config') as stage:
+            log("📋 Chargement de la configuration des compagnies...")
+
+            # Load companies configuration
+            with open('companies.json', 'r', encoding='utf-8') as f:
+                companies_config = json.load(f)
+
+            all_companies = companies_config['companies']
+            configure_routes(companies_config.get('routes'))
+
+            # Filter only configured companies
+            companies = [c for c in all_companies if is_company_configured(c)]
+            stage['companies'] = len(companies)
+
+            log(f"✅ {len(companies)} compagnie(s) configurée(s) sur {len(all_companies)} au total")
+
+            session_pool = configure_fetching(companies_config)
+
+            # Calculate the ISO weeks of the horizon
+            now = datetime.now()
+            horizon = get_horizon_weeks(now, weeks)
+
+            log(f"📅 Récupération de {len(horizon)} semaine(s): " +
+                ', '.join(f"{week}/{year}" for week, year in horizon))
+
+            # Create data directory if it doesn't exist
+            os.makedirs('data', exist_ok=True)
+
+        # Fetch schedules for each company for every week of the horizon concurrently,
+        # normalizing and saving each result as soon as it arrives
+        build_state = BuildState() if incremental else None
+        normalizer = OverlappedNormalizer(
+            lambda result, snapshot_writer: process_result(result, snapshot_writer, build_state)
+        )
+        stale_config = companies_config.get('stale', {})
+        with report.stage('fetch') as stage:
+            try:
+                all_results = fetch_all_results(companies, horizon, max_per_host=session_pool.pool_maxsize,
+                                                deadline=stale_config.get('deadlineSeconds'),
+                                                on_results=lambda results: normalizer.submit(
+                                                    [r for r in results if r['success']]))
+            except BaseException:
+                normalizer.close()
+                raise
+            print_connection_stats(session_pool)
+            report.extra['connections'] = session_pool.stats()
+            report.extra['breakers'] = session_pool.breakers()
+
+            stage['results'] = len(all_results)
+            stage['failed'] = sum(1 for r in all_results if not r['success'])
+
+            # Fall back to the last good snapshot of weeks that could not be fetched
+            if stage['failed'] and stale_config.get('enabled', True):
+                stage['stale'] = serve_stale_results(
+                    all_results, stale_config.get('maxAgeDays', DEFAULT_STALE_MAX_AGE_DAYS)
+                )
+
+            stage['unchanged'] = sum(1 for r in all_results if r.get('unchanged') and not r.get('stale'))
+
+            http_cache = get_http_cache()
+            if http_cache:
+                log(f"♻️  {stage['unchanged']} semaine(s) inchangée(s) depuis la dernière exécution")
+                http_cache.evict()
+
+        # Failed weeks, possibly served stale, are the only results left to hand over
+        with report.stage('drain') as stage:
+            normalizer.submit([r for r in all_results if r.get('stale') or not r['success']])
+            normalizer.close()
+            stage['normalized'] = normalizer.processed
+
+        publish_results(report, all_results, companies_config, horizon, build_state, render_mode,
+                        normalized=True)
+
+        log("\n✅ Processus terminé avec succès!")
+        success = True
         return 0
 
     except Exception as e:
-        print(f"❌ Erreur générale: {e}")
+        log(f"❌ Erreur générale: {e}")
         import traceback
         traceback.print_exc()
         generate_error_html(str(e))
         return 1
 
+    finally:
+        if report_file:
+            report.write(report_file, success)
+
+
+def open_week_streams(companies: List[Dict], horizon: List[Tuple[int, int]],
+                      streams: Dict[Tuple[str, int, int], FirebaseStream],
+                      on_change: Callable[[FirebaseStream], None]):
+    """
+    Subscribe to the weeks of a horizon, closing subscriptions outside of it
+
+    Args:
+        companies: Configured companies, static ones being skipped
+        horizon: List of (week, year) tuples to subscribe to
+        streams: Open streams by (company id, week, year), updated in place
+        on_change: Called from a stream thread after each applied event
+    """
+    wanted = {
+        (company['id'], week, year): company
+        for company in companies if not company.get('staticSchedule')
+        for week, year in horizon
+    }
+    for key in [key for key in streams if key not in wanted]:
+        streams.pop(key).stop()
+    for key, company in wanted.items():
+        if key not in streams:
+            _, week, year = key
+            log(f"📡 Abonnement à {company['name']} - Semaine {week}")
+            streams[key] = FirebaseStream(
+                company['firebase']['databaseURL'], f"Calendar/{year}/{week}",
+                get_firebase_params(company), on_change=on_change
+            ).start()
+
+
+def collect_stream_results(companies: List[Dict], horizon: List[Tuple[int, int]],
+                           streams: Dict[Tuple[str, int, int], FirebaseStream],
+                           fingerprints: Dict[Tuple[str, int, int], str]) -> List[Dict]:
+    """
+    Build fetch results from the live copies of the subscribed weeks
+
+    Args:
+        companies: Configured companies
+        horizon: List of (week, year) tuples
+        streams: Open streams by (company id, week, year)
+        fingerprints: Payload fingerprints of the previous build, updated in place
+
+    Returns:
+        List of result dictionaries, one per (company, week), a week being
+        unchanged when its payload is identical to the previous build
+    """
+    results = []
+    for company in companies:
+        for week, year in horizon:
+            if company.get('staticSchedule'):
+                results.append(load_static_schedules(company, week, year))
+                continue
+
+            key = (company['id'], week, year)
+            stream = streams[key]
+            data, version = stream.snapshot()
+            if not version:
+                results.append({
+                    'success': False,
+                    'company': company,
+                    'week': week,
+                    'year': year,
+                    'error': stream.error or "Aucune donnée reçue du flux"
+                })
+                continue
+            payload_fingerprint = fingerprint(data)
+            results.append(build_week_result(company, week, year, data,
+                                             fingerprints.get(key) == payload_fingerprint))
+            fingerprints[key] = payload_fingerprint
+    return results
+
+
+def wait_for_quiet(changed: threading.Event, debounce: float, max_delay: float):
+    """
+    Debounce change notifications after a first one
+
+    Args:
+        changed: Event set by the stream threads after each applied event
+        debounce: Quiet period in seconds ending the wait
+        max_delay: Longest wait in seconds, for events that never stop
+    """
+    first_event = time.monotonic()
+    changed.clear()
+    while True:
+        remaining = max_delay - (time.monotonic() - first_event)
+        if remaining <= 0 or not changed.wait(min(debounce, remaining)):
+            return
+        changed.clear()
+
+
+def stream_schedules(weeks: int = DEFAULT_HORIZON_WEEKS,
+                     report_file: Optional[str] = DEFAULT_REPORT_FILE,
+                     render_mode: Optional[str] = None,
+                     debounce: Optional[float] = None) -> int:
+    """
+    Keep the outputs up to date from live Firebase subscriptions
+
+    Every Firebase week of the horizon is subscribed to through the REST
+    streaming API, and its put and patch events are applied to an
+    in-memory copy. Once events stop arriving for the debounce delay (or
+    at most maxDelaySeconds after the first one), the outputs are rebuilt
+    incrementally: only the weeks that changed are normalized again and
+    only the outputs whose content changed are rewritten. Subscriptions
+    follow the horizon when the week changes. Runs until interrupted.
+
+    Args:
+        weeks: Number of weeks to follow, starting with the current one
+        report_file: Run report file rewritten after each rebuild, or None
+        render_mode: 'static' or 'client', defaults to the "render" section
+            of companies.json
+        debounce: Quiet period in seconds before rebuilding, defaults to
+            the "stream" section of companies.json
+
+    Returns:
+        Process exit code
+    """
+    log("📋 Chargement de la configuration des compagnies...")
+    with open('companies.json', 'r', encoding='utf-8') as f:
+        companies_config = json.load(f)
+    configure_routes(companies_config.get('routes'))
+    companies = [c for c in companies_config['companies'] if is_company_configured(c)]
+    log(f"✅ {len(companies)} compagnie(s) configurée(s)")
+
+    stream_config = companies_config.get('stream', {})
+    if debounce is None:
+        debounce = stream_config.get('debounceSeconds', DEFAULT_STREAM_DEBOUNCE)
+    max_delay = max(debounce, stream_config.get('maxDelaySeconds', DEFAULT_STREAM_MAX_DELAY))
+    stale_config = companies_config.get('stale', {})
+
+    os.makedirs('data', exist_ok=True)
+    build_state = BuildState()
+    changed = threading.Event()
+    streams: Dict[Tuple[str, int, int], FirebaseStream] = {}
+    fingerprints: Dict[Tuple[str, int, int], str] = {}
+    horizon: List[Tuple[int, int]] = []
+    published_on = None
+
+    try:
+        while True:
+            now = datetime.now()
+            current_horizon = get_horizon_weeks(now, weeks)
+            if current_horizon != horizon:
+                horizon = current_horizon
+                open_week_streams(companies, horizon, streams, lambda stream: changed.set())
+            if now.date() != published_on:
+                # Static weeks and the highlighted day change with the date
+                changed.set()
+
+            if not changed.wait(timeout=60):
+                continue
+
+            wait_for_quiet(changed, debounce, max_delay)
+
+            report = start_run_report()
+            report.extra.update({'mode': 'stream', 'horizonWeeks': weeks})
+            success = False
+            try:
+                all_results = collect_stream_results(companies, horizon, streams, fingerprints)
+                failed = sum(1 for r in all_results if not r['success'])
+                if failed and stale_config.get('enabled', True):
+                    serve_stale_results(all_results, stale_config.get('maxAgeDays', DEFAULT_STALE_MAX_AGE_DAYS))
+                report.extra['streams'] = {'/'.join(map(str, key)): stream.stats()
+                                           for key, stream in streams.items()}
+
+                publish_results(report, all_results, companies_config, horizon, build_state, render_mode)
+                published_on = now.date()
+                success = True
+                events = sum(stream.events for stream in streams.values())
+                log(f"🔴 Sorties à jour à {datetime.now().strftime('%H:%M:%S')} "
+                    f"({events} événement(s) reçu(s) depuis le démarrage)")
+            except Exception as e:
+                log(f"❌ Erreur lors de la mise à jour: {e}")
+                import traceback
+                traceback.print_exc()
+            finally:
+                if report_file:
+                    report.write(report_file, success)
+
+    except KeyboardInterrupt:
+        log("\n👋 Arrêt du suivi en direct")
+        return 0
+
+    finally:
+        for stream in streams.values():
+            stream.stop()
+
+
+def fetch_due_results(companies: List[Dict], due: List[Tuple[str, int, int]],
+                      max_per_host: int, deadline: Optional[float] = None,
+                      on_late_results: Optional[Callable[[List[Dict]], None]] = None) -> List[Dict]:
+    """
+    Fetch the due (company, week) pairs
+
+    Every due pair is fetched by a single fetch_all_results call, so the
+    slow weeks of one company overlap with those of the others, each host
+    keeps its concurrency limit and Firebase companies still get one range
+    request per run of consecutive due weeks, never downloading the weeks
+    in between that are not due.
+
+    Args:
+        companies: Configured companies
+        due: Due (company id, week, year) keys
+        max_per_host: Maximum number of concurrent jobs per host
+        deadline: Seconds to wait for the jobs, or None to wait for all of them
+        on_late_results: Callback receiving the results of each job that
+            completes after the deadline
+
+    Returns:
+        List of result dictionaries, one per due key
+    """
+    keys = set(due)
+    due_companies = [company for company in companies if any(key[0] == company['id'] for key in keys)]
+    weeks = sorted({(week, year) for _, week, year in keys}, key=lambda week_year: (week_year[1], week_year[0]))
+    return fetch_all_results(due_companies, weeks, max_per_host=max_per_host, deadline=deadline,
+                             on_late_results=on_late_results, keys=keys)
+
+
+def run_daemon(weeks: int = DEFAULT_HORIZON_WEEKS,
+               report_file: Optional[str] = DEFAULT_REPORT_FILE,
+               render_mode: Optional[str] = None) -> int:
+    """
+    Keep the outputs up to date by refreshing each (company, week) on its own schedule
+
+    A RefreshScheduler decides which weeks are due: the current week is
+    fetched every few minutes, later weeks less often, static schedules
+    once, and the interval of a week grows while its payload stays
+    unchanged. Only due weeks are fetched; the other weeks keep their
+    last payload. The outputs are rebuilt incrementally when a payload
+    changed or a week could not be fetched, and when the date changes.
+    Weeks still being fetched at the deadline of the "stale" section are
+    served from their snapshot, then refreshed as soon as their fetch
+    completes. Runs until interrupted.
+
+    Args:
+        weeks: Number of weeks to follow, starting with the current one
+        report_file: Run report file rewritten after each refresh, or None
+        render_mode: 'static' or 'client', defaults to the "render" section
+            of companies.json
+
+    Returns:
+        Process exit code
+    """
+    log("📋 Chargement de la configuration des compagnies...")
+    with open('companies.json', 'r', encoding='utf-8') as f:
+        companies_config = json.load(f)
+    configure_routes(companies_config.get('routes'))
+    companies = [c for c in companies_config['companies'] if is_company_configured(c)]
+    log(f"✅ {len(companies)} compagnie(s) configurée(s)")
+
+    session_pool = configure_fetching(companies_config)
+    daemon_config = companies_config.get('daemon', {})
+    scheduler = RefreshScheduler(
+        base_interval=daemon_config.get('baseIntervalMinutes', DEFAULT_BASE_INTERVAL / 60) * 60,
+        max_interval=daemon_config.get('maxIntervalMinutes', DEFAULT_MAX_INTERVAL / 60) * 60,
+        distance_factor=daemon_config.get('distanceFactor', DEFAULT_DISTANCE_FACTOR),
+        backoff_factor=daemon_config.get('backoffFactor', DEFAULT_BACKOFF_FACTOR)
+    )
+    stale_config = companies_config.get('stale', {})
+
+    os.makedirs('data', exist_ok=True)
+    build_state = BuildState()
+    # Latest result of every followed (company id, week, year), with its pristine payload
+    latest: Dict[Tuple[str, int, int], Dict] = {}
+    fingerprints: Dict[Tuple[str, int, int], str] = {}
+    published_on = None
+    # Results of fetches that completed after their deadline, handed over by worker threads
+    late_results: queue.SimpleQueue = queue.SimpleQueue()
+    wake = threading.Event()
+
+    def on_late_results(results: List[Dict]):
+        late_results.put(results)
+        wake.set()
+
+    try:
+        while True:
+            wake.clear()
+            now = datetime.now()
+            horizon = get_horizon_weeks(now, weeks)
+            keys = [
+                ((company['id'], week, year), None if company.get('staticSchedule') else distance)
+                for company in companies
+                for distance, (week, year) in enumerate(horizon)
+            ]
+            scheduler.sync(keys)
+            for key in [key for key in latest if key not in dict(keys)]:
+                del latest[key]
+                fingerprints.pop(key, None)
+
+            # Late results only replace weeks that are still failing
+            arrived = []
+            while not late_results.empty():
+                arrived.extend(
+                    result for result in late_results.get() if result['success']
+                    and not latest.get((result['company']['id'], result['week'], result['year']),
+                                       {'success': True})['success']
+                )
+
+            due = scheduler.due()
+            if not due and not arrived and now.date() == published_on:
+                next_due = scheduler.next_due()
+                delay = 60.0 if next_due is None else next_due - time.monotonic()
+                # Wake up at least every minute to notice a new day, or when late results arrive
+                wake.wait(min(60.0, max(0.0, delay)))
+                continue
+
+            report = start_run_report()
+            report.extra.update({'mode': 'daemon', 'horizonWeeks': weeks})
+            success = False
+            try:
+                changed = 0
+                with report.stage('fetch') as stage:
+                    if arrived:
+                        log(f"\n📥 {len(arrived)} semaine(s) reçue(s) après le délai")
+                    if due:
+                        log(f"\n🔄 {len(due)} semaine(s) à rafraîchir: " +
+                            ', '.join(f"{company_id} {week}/{year}" for company_id, week, year in due))
+                    fetched = fetch_due_results(companies, due, session_pool.pool_maxsize,
+                                                stale_config.get('deadlineSeconds'), on_late_results)
+                    for result in arrived + fetched:
+                        key = (result['company']['id'], result['week'], result['year'])
+                        previous = latest.get(key)
+                        if result['success']:
+                            payload_fingerprint = result.get('dataHash') or fingerprint(result['data'])
+                            week_changed = fingerprints.get(key) != payload_fingerprint
+                            fingerprints[key] = payload_fingerprint
+                        else:
+                            # A week that starts or stops failing changes the outputs too
+                            week_changed = previous is None or previous['success']
+                            fingerprints.pop(key, None)
+                        scheduler.record(key, week_changed, result['success'])
+                        # Unchanged now means identical to the published snapshot
+                        result['unchanged'] = result['success'] and not week_changed
+                        latest[key] = result
+                        changed += week_changed
+
+                    stage['refreshed'] = len(due)
+                    stage['late'] = len(arrived)
+                    stage['changed'] = changed
+                    report.extra['connections'] = session_pool.stats()
+                    report.extra['breakers'] = session_pool.breakers()
+
+                if changed or now.date() != published_on:
+                    # Publish copies: payloads are shared, the result flags are not
+                    all_results = [dict(latest[key]) for key, _ in keys if key in latest]
+                    if any(not r['success'] for r in all_results) and stale_config.get('enabled', True):
+                        serve_stale_results(all_results, stale_config.get('maxAgeDays', DEFAULT_STALE_MAX_AGE_DAYS))
+                    publish_results(report, all_results, companies_config, horizon, build_state, render_mode)
+                    published_on = now.date()
+                    for result in latest.values():
+                        result['unchanged'] = result['success']
+                else:
+                    log("♻️  Aucun changement, fichiers conservés")
+
+                report.extra['schedule'] = scheduler.describe()
+                success = True
+            except Exception as e:
+                log(f"❌ Erreur lors du rafraîchissement: {e}")
+                import traceback
+                traceback.print_exc()
+                # Retry the weeks of a failed refresh on their normal schedule
+                for key in due:
+                    scheduler.record(key, False, False)
+                time.sleep(60)
+            finally:
+                if report_file:
+                    report.write(report_file, success)
+
+            next_due = scheduler.next_due()
+            if next_due is not None:
+                delay = max(0.0, next_due - time.monotonic())
+                log(f"⏰ Prochain rafraîchissement dans " +
+                    (f"{delay / 60:.1f} min" if delay >= 60 else f"{delay:.0f} s"))
+
+    except KeyboardInterrupt:
+        log("\n👋 Arrêt du mode démon")
+        return 0
+
+
+def load_routes(filename: str = 'companies.json'):
+    """
+    Configure the routes of companies.json, if the file exists
+
+    The subcommands working on existing files do not need the rest of the
+    configuration, and keep the default routes without it.
+
+    Args:
+        filename: Companies configuration file
+    """
+    if not os.path.exists(filename):
+        return
+    with open(filename, 'r', encoding='utf-8') as f:
+        configure_routes(json.load(f).get('routes'))
+
+
+def render_from_file(filename: str = 'horaires.json', weeks: int = DEFAULT_HORIZON_WEEKS,
+                     render_mode: str = 'static') -> int:
+    """
+    Regenerate index.html from an existing unified schedule file
+
+    Args:
+        filename: Unified schedule file
+        weeks: Number of weeks covered by the schedules
+        render_mode: 'static' or 'client'
+
+    Returns:
+        Process exit code
+    """
+    if not os.path.exists(filename):
+        log(f"❌ Fichier introuvable: {filename}")
+        return 1
+
+    current_week, current_year = get_horizon_weeks(datetime.now(), 1)[0]
+    departures = load_unified_departures(filename)
+    log(f"📂 {len(departures)} horaires chargés depuis {filename}")
+    generate_multi_company_html([], current_week, current_year, horizon_weeks=weeks,
+                                departures=departures, render_mode=render_mode)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point
+
+    Args:
+        argv: Command line arguments, defaults to sys.argv
+
+    Returns:
+        Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Récupère les horaires des ferries Tahiti-Moorea")
+    parser.add_argument('--incremental', action='store_true',
+                        help="ne recalcule et ne réécrit que ce qui a changé depuis la dernière exécution")
+    parser.add_argument('--weeks', type=int, default=DEFAULT_HORIZON_WEEKS, metavar='N',
+                        help=f"nombre de semaines à récupérer à partir de la semaine en cours "
+                             f"(1 à {MAX_HORIZON_WEEKS}, défaut: {DEFAULT_HORIZON_WEEKS})")
+    parser.add_argument('--quiet', action='store_true',
+                        help="n'affiche rien sur la sortie standard (le rapport run_report.json est écrit)")
+    parser.add_argument('--report', default=DEFAULT_REPORT_FILE, metavar='FICHIER',
+                        help=f"rapport d'exécution (défaut: {DEFAULT_REPORT_FILE})")
+    parser.add_argument('--render-mode', choices=RENDER_MODES,
+                        help="index.html complet ('static') ou rendu dans le navigateur depuis "
+                             f"{DEFAULT_COMPACT_FILE} ('client'), défaut: section render de companies.json")
+    parser.add_argument('--stream', action='store_true',
+                        help="reste connecté à Firebase et met à jour les fichiers à chaque modification")
+    parser.add_argument('--daemon', action='store_true',
+                        help="reste actif et rafraîchit chaque semaine de chaque compagnie à son propre rythme")
+    parser.add_argument('--debounce', type=float, metavar='SECONDES',
+                        help="en mode --stream, délai sans modification avant de mettre à jour les fichiers "
+                             f"(défaut: {DEFAULT_STREAM_DEBOUNCE:g})")
+    subparsers = parser.add_subparsers(dest='command')
+    add_query_arguments(subparsers)
+    add_archive_arguments(subparsers)
+    render_parser = subparsers.add_parser('render', help="régénère index.html depuis un horaires.json existant")
+    render_parser.add_argument('--file', default='horaires.json', help="fichier horaires unifié")
+    args = parser.parse_args(argv)
+
+    if args.command:
+        load_routes()
+    if args.command == 'query':
+        return run_query(args)
+    if args.command == 'archive':
+        return run_archive(args)
+    if args.command == 'render':
+        return render_from_file(args.file, weeks=args.weeks, render_mode=args.render_mode or 'static')
+
+    if not 1 <= args.weeks <= MAX_HORIZON_WEEKS:
+        parser.error(f"--weeks doit être compris entre 1 et {MAX_HORIZON_WEEKS}")
+    if args.daemon and args.stream:
+        parser.error("--daemon et --stream ne peuvent pas être combinés")
+
+    with contextlib.ExitStack() as stack:
+        if args.quiet:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        if args.daemon:
+            return run_daemon(weeks=args.weeks, report_file=args.report, render_mode=args.render_mode)
+        if args.stream:
+            return stream_schedules(weeks=args.weeks, report_file=args.report,
+                                    render_mode=args.render_mode, debounce=args.debounce)
+        return fetch_all_schedules(incremental=args.incremental, weeks=args.weeks,
+                                   report_file=args.report, render_mode=args.render_mode)
+
 
 if __name__ == '__main__':
-    sys.exit(fetch_all_schedules())
+    sys.exit(main())
@@ -0,0 +1,493 @@
+"""
+Moorea Life Schedule - HTTP transport for Firebase REST requests
+Keeps one pooled keep-alive session per Firebase database host, with
+retries, hedged requests and a circuit breaker per host
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from http_cache import HttpCache, content_hash
+from http_resilience import (
+    DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_MAX, DEFAULT_BREAKER_RESET, DEFAULT_BREAKER_THRESHOLD,
+    DEFAULT_HEDGE_MIN_SAMPLES, DEFAULT_RETRIES, RETRYABLE_STATUSES, CircuitBreaker,
+    CircuitOpenError, DaemonExecutor, LatencyTracker, backoff_delay, snapshot_breakers
+)
+
+
+# Connections kept open per database host
+DEFAULT_POOL_MAXSIZE = 4
+
+# Timeouts in seconds for establishing a connection and reading a response
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 30
+
+# Size of the body chunks handed to an incremental parser
+DEFAULT_STREAM_CHUNK_SIZE = 65536
+
+
+def close_response(future: Future):
+    """
+    Close the response of a finished request that nobody will read
+
+    Args:
+        future: Future of a request sent by the session pool
+    """
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class SessionPool:
+    """
+    Shared requests sessions, one per database host
+
+    Every request to the same host goes through the same session, so the
+    DNS lookup, TCP connection and TLS handshake are paid once per
+    connection instead of once per request.
+
+    Failed attempts (connection errors, timeouts, 429 and 5xx answers) are
+    retried with exponential backoff. A request still unanswered after
+    the hedge percentile of the host's recent response times is sent a
+    second time, and the first answer wins. Each host has a circuit
+    breaker, so once a database keeps failing its remaining requests fail
+    immediately instead of each waiting out its timeouts.
+
+    With stream_bodies, Firebase bodies are meant to be read in chunks and
+    parsed as they arrive rather than loaded whole. Streamed requests are
+    never hedged, since the losing response would hold its connection.
+    """
+
+    def __init__(self, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE,
+                 backoff_max: float = DEFAULT_BACKOFF_MAX,
+                 hedge_percentile: Optional[float] = None,
+                 hedge_min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES,
+                 breaker_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+                 breaker_reset: float = DEFAULT_BREAKER_RESET,
+                 stream_bodies: bool = False):
+        """
+        Args:
+            pool_maxsize: Maximum number of connections kept per host
+            connect_timeout: Connection timeout in seconds
+            read_timeout: Read timeout in seconds
+            retries: Retries after a failed attempt
+            backoff_base: Delay ceiling of the first retry in seconds
+            backoff_max: Upper bound of any retry delay in seconds
+            hedge_percentile: Percentile of the host's response times after
+                which a hedged request is sent, or None to never hedge
+            hedge_min_samples: Response times needed before hedging
+            breaker_threshold: Consecutive failures opening a host's circuit
+            breaker_reset: Seconds before an open circuit is tried again
+            stream_bodies: Whether Firebase bodies are parsed incrementally
+        """
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.stream_bodies = stream_bodies
+        self._sessions: Dict[str, requests.Session] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self._hedge_executor: Optional[DaemonExecutor] = None
+        self._lock = threading.Lock()
+
+    def session_for(self, url: str) -> requests.Session:
+        """
+        Get the session dedicated to the host of a URL
+
+        Args:
+            url: Request URL
+
+        Returns:
+            Session bound to the URL's host
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sessions[host] = session
+            return session
+
+    def breaker_for(self, host: str) -> CircuitBreaker:
+        """
+        Get the circuit breaker of a host
+
+        Args:
+            host: Network location
+
+        Returns:
+            Circuit breaker of the host
+        """
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+                self._breakers[host] = breaker
+            return breaker
+
+    def latency_for(self, host: str) -> LatencyTracker:
+        """
+        Get the response time tracker of a host
+
+        Args:
+            host: Network location
+
+        Returns:
+            Latency tracker of the host
+        """
+        with self._lock:
+            latency = self._latencies.get(host)
+            if latency is None:
+                latency = LatencyTracker()
+                self._latencies[host] = latency
+            return latency
+
+    def get(self, url: str, stats: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """
+        Send a GET request through the host's session
+
+        Args:
+            url: Request URL
+            stats: Dictionary in which the number of 'attempts' and of
+                'hedged' requests sent are counted
+            **kwargs: Extra arguments passed to requests
+
+        Returns:
+            HTTP response, possibly a retryable error status once retries
+            are exhausted
+
+        Raises:
+            CircuitOpenError: If the host's circuit is open
+            requests.RequestException: If the last attempt failed
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlparse(url).netloc
+        session = self.session_for(url)
+        breaker = self.breaker_for(host)
+        if stats is None:
+            stats = {}
+        stats.setdefault('attempts', 0)
+        stats.setdefault('hedged', 0)
+
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit ouvert pour {host} après des échecs répétés")
+            stats['attempts'] += 1
+
+            try:
+                response = self._send(session, host, url, stats, kwargs)
+            except requests.RequestException:
+                breaker.record_failure()
+                if attempt == self.retries:
+                    raise
+                time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+                continue
+            except BaseException:
+                # Any other error must still end a half-open trial
+                breaker.record_failure()
+                raise
+
+            if response.status_code in RETRYABLE_STATUSES:
+                breaker.record_failure()
+                if attempt == self.retries:
+                    return response
+                # Release the connection, which a streamed body would keep busy
+                response.close()
+                time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max,
+                                         response.headers.get('Retry-After')))
+                continue
+
+            breaker.record_success()
+            return response
+
+    def _send(self, session: requests.Session, host: str, url: str, stats: Dict,
+              kwargs: Dict) -> requests.Response:
+        """
+        Send one attempt, hedged if the host is slower than usual
+
+        Args:
+            session: Session of the host
+            host: Network location
+            url: Request URL
+            stats: Request statistics, 'hedged' is incremented
+            kwargs: Arguments passed to requests
+
+        Returns:
+            First HTTP response received
+        """
+        latency = self.latency_for(host)
+        hedge_after = None
+        if self.hedge_percentile is not None and not kwargs.get('stream'):
+            hedge_after = latency.percentile(self.hedge_percentile, self.hedge_min_samples)
+        if hedge_after is None:
+            return self._timed_get(session, latency, url, kwargs)
+
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = DaemonExecutor(min(32, (os.cpu_count() or 1) + 4), 'hedge')
+            executor = self._hedge_executor
+
+        pending = {executor.submit(self._timed_get, session, latency, url, kwargs)}
+        done, _ = wait(pending, timeout=hedge_after)
+        if not done:
+            stats['hedged'] += 1
+            pending.add(executor.submit(self._timed_get, session, latency, url, kwargs))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    error = e
+                    continue
+                # The losing copy gives its connection back as soon as it answers
+                for other in (done | pending) - {future}:
+                    other.add_done_callback(close_response)
+                return response
+        raise error
+
+    @staticmethod
+    def _timed_get(session: requests.Session, latency: LatencyTracker, url: str,
+                   kwargs: Dict) -> requests.Response:
+        """Send a GET request, recording its duration unless the server failed"""
+        start = time.perf_counter()
+        response = session.get(url, **kwargs)
+        if response.status_code < 500:
+            latency.add(time.perf_counter() - start)
+        return response
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get connection usage per host
+
+        Returns:
+            Dictionary mapping each host to its request, connection and
+            reused connection counts
+        """
+        with self._lock:
+            sessions = dict(self._sessions)
+
+        stats = {}
+        for host, session in sessions.items():
+            requests_count = 0
+            connections_count = 0
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    requests_count += pool.num_requests
+                    connections_count += pool.num_connections
+            stats[host] = {
+                'requests': requests_count,
+                'connections': connections_count,
+                'reused': max(0, requests_count - connections_count)
+            }
+        return stats
+
+    def breakers(self) -> Dict[str, Dict]:
+        """
+        Get the circuit breaker state per host
+
+        Returns:
+            Dictionary mapping each host to its state and failure count
+        """
+        with self._lock:
+            breakers = dict(self._breakers)
+        return snapshot_breakers(breakers)
+
+    def close(self):
+        """Close every session and its pooled connections"""
+        with self._lock:
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(cancel_futures=True)
+                self._hedge_executor = None
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_session_pool: Optional[SessionPool] = None
+_session_pool_lock = threading.Lock()
+
+
+def configure_session_pool(**kwargs) -> SessionPool:
+    """
+    Replace the shared session pool with a newly configured one
+
+    Args:
+        **kwargs: Arguments passed to SessionPool
+
+    Returns:
+        The new shared session pool
+    """
+    global _session_pool
+    with _session_pool_lock:
+        if _session_pool is not None:
+            _session_pool.close()
+        _session_pool = SessionPool(**kwargs)
+        return _session_pool
+
+
+def get_session_pool() -> SessionPool:
+    """
+    Get the shared session pool, creating it with defaults if needed
+
+    Returns:
+        Shared session pool
+    """
+    global _session_pool
+    with _session_pool_lock:
+        if _session_pool is None:
+            _session_pool = SessionPool()
+        return _session_pool
+
+
+def get_firebase_json(database_url: str, path: str, params: Optional[Dict] = None,
+                      cache: Optional[HttpCache] = None,
+                      session_pool: Optional[SessionPool] = None,
+                      stats: Optional[Dict] = None) -> Tuple[Any, bool]:
+    """
+    Get a JSON payload from the Firebase REST API, revalidating against the cache
+
+    A cached payload revalidated less than the cache's max_age ago is
+    returned without any request. Otherwise, for a plain path, Firebase is
+    asked for the payload ETag (X-Firebase-ETag) and sent the cached one as
+    If-None-Match, so an unchanged payload costs a 304 without a body.
+    Firebase does not compute ETags for queries (orderBy, startAt, ...),
+    which is how the week ranges are fetched: their body is always
+    downloaded, and only compared with the cached content hash. Either
+    way, an identical ETag or content hash means the payload did not change.
+
+    Args:
+        database_url: Firebase database URL
+        path: Path inside the database, without the .json suffix
+        params: Query parameters (auth, ...)
+        cache: Payload cache, or None to disable caching
+        session_pool: Session pool to use, defaults to the shared one
+        stats: Dictionary filled with the HTTP status, body size in bytes,
+            duration in seconds, cache outcome ('hit', 'miss' or 'off'),
+            attempts and hedged requests, even when the request fails;
+            the cache outcome is 'fresh' when no request was sent
+
+    Returns:
+        Tuple of (payload, unchanged)
+    """
+    pool = session_pool or get_session_pool()
+    url = f"{database_url}/{path}.json"
+
+    # Cache queries separately from the plain path, leaving credentials out of the key
+    query = sorted((key, value) for key, value in (params or {}).items() if key != 'auth')
+    cache_path = f"{path}?{urlencode(query)}" if query else path
+
+    headers = {}
+    if not query:
+        headers['X-Firebase-ETag'] = 'true'
+
+    cached = cache.lookup(database_url, cache_path) if cache else None
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+
+    if stats is None:
+        stats = {}
+    stats['cache'] = 'off' if cache is None else 'miss'
+
+    if cached and cache.is_fresh(database_url, cache_path):
+        stats.update(cache='fresh', bytes=0, seconds=0.0)
+        return cached['payload'], True
+
+    start = time.perf_counter()
+    try:
+        response = pool.get(url, stats=stats, params=params, headers=headers)
+        stats['status'] = response.status_code
+        stats['bytes'] = len(response.content)
+
+        if cached and response.status_code == 304:
+            cache.touch(database_url, cache_path)
+            stats['cache'] = 'hit'
+            return cached['payload'], True
+        response.raise_for_status()
+
+        data = response.json()
+        if cache is None:
+            return data, False
+
+        etag = response.headers.get('ETag')
+        if cached and ((etag and etag == cached.get('etag')) or
+                       content_hash(data) == cached.get('contentHash')):
+            cache.touch(database_url, cache_path)
+            stats['cache'] = 'hit'
+            return data, True
+
+        cache.store(database_url, cache_path, etag, data)
+        return data, False
+    finally:
+        stats['seconds'] = round(time.perf_counter() - start, 6)
+
+
+def iter_firebase_chunks(database_url: str, path: str, params: Optional[Dict] = None,
+                         session_pool: Optional[SessionPool] = None,
+                         stats: Optional[Dict] = None,
+                         chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Get the body of a Firebase REST answer as a stream of chunks
+
+    Retries and the circuit breaker apply until the response headers are
+    received; a connection lost while the body is being read raises from
+    the iteration. The payload cache is not used, since the payload is
+    never held as a whole.
+
+    Args:
+        database_url: Firebase database URL
+        path: Path inside the database, without the .json suffix
+        params: Query parameters (auth, ...)
+        session_pool: Session pool to use, defaults to the shared one
+        stats: Dictionary filled with the HTTP status, body size in bytes,
+            duration in seconds, cache outcome ('off'), attempts and hedged
+            requests, even when the request fails
+        chunk_size: Maximum size of a chunk in bytes
+
+    Yields:
+        Body chunks, decompressed
+    """
+    pool = session_pool or get_session_pool()
+    url = f"{database_url}/{path}.json"
+
+    if stats is None:
+        stats = {}
+    stats['cache'] = 'off'
+    stats['bytes'] = 0
+
+    start = time.perf_counter()
+    try:
+        response = pool.get(url, stats=stats, params=params, stream=True)
+        try:
+            stats['status'] = response.status_code
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size):
+                stats['bytes'] += len(chunk)
+                yield chunk
+        finally:
+            response.close()
+    finally:
+        stats['seconds'] = round(time.perf_counter() - start, 6)
@@ -0,0 +1,274 @@
+"""
+Moorea Life Schedule - Firebase REST streaming
+Subscribes to a database path through the Firebase REST streaming API
+(text/event-stream) and keeps a local copy of its value up to date by
+applying the put and patch events it receives
+"""
+
+import copy
+import json
+import socket
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import requests
+from http_resilience import DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_MAX, backoff_delay
+
+
+# Firebase sends a keep-alive event every 30 seconds: a silent stream is dead past this
+DEFAULT_STREAM_READ_TIMEOUT = 60
+DEFAULT_STREAM_CONNECT_TIMEOUT = 10
+
+
+def iter_sse_events(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Parse a text/event-stream body
+
+    Args:
+        lines: Lines of the body, without their line terminators
+
+    Yields:
+        Tuples of (event name, data) for every dispatched event
+    """
+    event = None
+    data: List[str] = []
+    for line in lines:
+        if not line:
+            if event is not None or data:
+                yield event or 'message', '\n'.join(data)
+            event = None
+            data = []
+            continue
+        if line.startswith(':'):
+            continue
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'event':
+            event = value
+        elif field == 'data':
+            data.append(value)
+
+
+def _get_child(node: Any, key: str) -> Any:
+    """Get a child of a dict or list node by its key"""
+    if isinstance(node, dict):
+        return node.get(key)
+    if isinstance(node, list) and key.isdigit() and int(key) < len(node):
+        return node[int(key)]
+    return None
+
+
+def _set_value(node: Any, parts: List[str], value: Any) -> Any:
+    """
+    Set the value at a path below a node, None deleting it
+
+    Lists are kept as lists while their keys are indexes, like Firebase
+    returns them, so payloads keep the shape of a REST answer.
+
+    Returns:
+        The node, which is a new object when it had to be created
+    """
+    if not parts:
+        return value
+    if not isinstance(node, (dict, list)):
+        if value is None:
+            return node
+        node = {}
+
+    key = parts[0]
+    child = _set_value(_get_child(node, key), parts[1:], value)
+
+    if isinstance(node, list):
+        if key.isdigit():
+            index = int(key)
+            if child is not None:
+                node.extend([None] * (index + 1 - len(node)))
+                node[index] = child
+            elif index < len(node):
+                node[index] = None
+            return node
+        node = {str(index): item for index, item in enumerate(node) if item is not None}
+
+    if child is None:
+        node.pop(key, None)
+    else:
+        node[key] = child
+    return node
+
+
+def apply_stream_event(value: Any, event: str, path: str, data: Any) -> Any:
+    """
+    Apply a Firebase streaming event to a local copy
+
+    A put replaces the value at path (None deletes it), a patch replaces
+    each of the given children of path.
+
+    Args:
+        value: Local copy of the subscribed path, updated in place when possible
+        event: 'put' or 'patch'
+        path: Path of the change relative to the subscribed path
+        data: Event data
+
+    Returns:
+        The updated local copy
+    """
+    parts = [part for part in path.split('/') if part]
+    if event == 'put':
+        return _set_value(value, parts, data)
+    if event == 'patch':
+        for key, child in (data or {}).items():
+            value = _set_value(value, parts + [part for part in key.split('/') if part], child)
+    return value
+
+
+class FirebaseStream:
+    """
+    Live copy of one Firebase path
+
+    A background thread holds a streaming request open and applies every
+    put and patch event to the copy, then calls on_change. Dropped
+    connections, keep-alive timeouts, cancel and auth_revoked events are
+    followed by a reconnection with exponential backoff; the first event
+    of each connection is a put of the whole value, so nothing is missed.
+    """
+
+    def __init__(self, database_url: str, path: str, params: Optional[Dict] = None,
+                 on_change: Optional[Callable[['FirebaseStream'], None]] = None,
+                 connect_timeout: float = DEFAULT_STREAM_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_STREAM_READ_TIMEOUT,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE,
+                 backoff_max: float = DEFAULT_BACKOFF_MAX):
+        """
+        Args:
+            database_url: Firebase database URL
+            path: Path inside the database, without the .json suffix
+            params: Query parameters (auth, ...)
+            on_change: Called from the stream thread after each applied event
+            connect_timeout: Connection timeout in seconds
+            read_timeout: Seconds without any event before reconnecting
+            backoff_base: Delay ceiling of the first reconnection in seconds
+            backoff_max: Upper bound of any reconnection delay in seconds
+        """
+        self.url = f"{database_url}/{path}.json"
+        self.path = path
+        self.params = params or {}
+        self.on_change = on_change
+        self.timeout = (connect_timeout, read_timeout)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.version = 0
+        self.events = 0
+        self.connections = 0
+        self.connected = False
+        self.error: Optional[str] = None
+        self._value: Any = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._session = requests.Session()
+        self._response: Optional[requests.Response] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'FirebaseStream':
+        """Start listening in a background thread"""
+        self._thread = threading.Thread(target=self._run, name=f"stream {self.path}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Close the stream
+
+        Args:
+            timeout: Seconds to wait for the stream thread to finish
+        """
+        self._stop.set()
+        response = self._response
+        if response is not None:
+            # Closing alone waits for the blocked read (up to a keep-alive) to release the body
+            connection = getattr(response.raw, 'connection', None)
+            sock = getattr(connection, 'sock', None)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            response.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._session.close()
+
+    def snapshot(self) -> Tuple[Any, int]:
+        """
+        Get a copy of the current value
+
+        Returns:
+            Tuple of (value, version), version being 0 until the first
+            event was received and increasing with every applied event
+        """
+        with self._lock:
+            return copy.deepcopy(self._value), self.version
+
+    def stats(self) -> Dict:
+        """Describe the stream for the run report"""
+        return {
+            'connected': self.connected,
+            'connections': self.connections,
+            'events': self.events,
+            'version': self.version,
+            'error': self.error
+        }
+
+    def _run(self):
+        """Listen until stopped, reconnecting after failures"""
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                if self._listen():
+                    attempt = 0
+            except Exception as e:
+                # Closing the response from stop() also ends up here
+                if not self._stop.is_set():
+                    self.error = str(e)
+            self.connected = False
+            if self._stop.wait(backoff_delay(attempt, self.backoff_base, self.backoff_max)):
+                break
+            attempt += 1
+
+    def _listen(self) -> bool:
+        """
+        Hold one streaming request open and apply its events
+
+        Returns:
+            True if at least one event was applied
+        """
+        received = False
+        response = self._session.get(self.url, params=self.params, stream=True, timeout=self.timeout,
+                                     headers={'Accept': 'text/event-stream'})
+        self._response = response
+        try:
+            response.raise_for_status()
+            self.connections += 1
+            # Firebase sends UTF-8 without a charset, which requests would read as ISO-8859-1
+            response.encoding = 'utf-8'
+            # chunk_size=None hands each chunk over as soon as it arrives
+            for event, data in iter_sse_events(response.iter_lines(chunk_size=None, decode_unicode=True)):
+                if event in ('put', 'patch'):
+                    message = json.loads(data)
+                    with self._lock:
+                        self._value = apply_stream_event(self._value, event, message['path'],
+                                                         message['data'])
+                        self.version += 1
+                    self.events += 1
+                    self.connected = True
+                    self.error = None
+                    received = True
+                    if self.on_change is not None:
+                        self.on_change(self)
+                elif event in ('cancel', 'auth_revoked'):
+                    self.error = f"{event}: {data}"
+                    break
+        finally:
+            self._response = None
+            response.close()
+        return received
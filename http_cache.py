@@ -0,0 +1,210 @@
+"""
+Moorea Life Schedule - On-disk cache for Firebase REST payloads
+Stores each payload with its Firebase ETag and content hash so unchanged
+weeks can be detected and skipped by the later stages, and serves recently
+validated payloads without any request
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+
+DEFAULT_CACHE_DIR = '.cache/firebase'
+
+# Entries not revalidated for this many seconds are evicted
+DEFAULT_TTL = 30 * 24 * 3600
+
+# Maximum total size of the cache directory in bytes
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+# Seconds during which an entry is served without asking Firebase, 0 to always ask
+DEFAULT_MAX_AGE = 0
+
+
+def content_hash(data: Any) -> str:
+    """
+    Compute a stable hash of a JSON payload
+
+    Args:
+        data: Decoded JSON payload
+
+    Returns:
+        Hex SHA-256 digest of the canonical JSON encoding
+    """
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class HttpCache:
+    """
+    Payload cache keyed by database URL and path
+
+    Each entry is a JSON file holding the payload, its ETag and its content
+    hash. The file modification time records the last successful
+    revalidation: it drives TTL and size-bounded eviction, and entries
+    younger than max_age are served without a request.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_age: float = DEFAULT_MAX_AGE):
+        """
+        Args:
+            directory: Directory holding the cache entries
+            ttl: Seconds after which an entry that was not revalidated expires
+            max_bytes: Maximum total size of the entries
+            max_age: Seconds after its last revalidation during which an
+                entry is served without a request
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def _entry_path(self, database_url: str, path: str) -> str:
+        key = hashlib.sha256(f"{database_url.rstrip('/')}/{path}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def lookup(self, database_url: str, path: str) -> Optional[Dict]:
+        """
+        Get the cached entry for a path
+
+        Args:
+            database_url: Firebase database URL
+            path: Path inside the database
+
+        Returns:
+            Entry dictionary, or None if missing, expired or unreadable
+        """
+        entry_path = self._entry_path(database_url, path)
+        try:
+            if time.time() - os.path.getmtime(entry_path) > self.ttl:
+                return None
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, database_url: str, path: str) -> bool:
+        """
+        Check whether an entry may be served without a request
+
+        Args:
+            database_url: Firebase database URL
+            path: Path inside the database
+
+        Returns:
+            True if the entry was revalidated less than max_age seconds ago
+        """
+        if self.max_age <= 0:
+            return False
+        try:
+            return time.time() - os.path.getmtime(self._entry_path(database_url, path)) < self.max_age
+        except OSError:
+            return False
+
+    def store(self, database_url: str, path: str, etag: Optional[str], data: Any) -> Dict:
+        """
+        Store a payload and its validators
+
+        Args:
+            database_url: Firebase database URL
+            path: Path inside the database
+            etag: ETag returned by Firebase, if any
+            data: Decoded JSON payload
+
+        Returns:
+            The stored entry
+        """
+        entry = {
+            'databaseURL': database_url,
+            'path': path,
+            'etag': etag,
+            'contentHash': content_hash(data),
+            'storedAt': time.time(),
+            'payload': data
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        entry_path = self._entry_path(database_url, path)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, entry_path)
+        return entry
+
+    def touch(self, database_url: str, path: str):
+        """
+        Record a successful revalidation of an entry
+
+        Args:
+            database_url: Firebase database URL
+            path: Path inside the database
+        """
+        try:
+            os.utime(self._entry_path(database_url, path))
+        except OSError:
+            pass
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then the least recently validated ones
+        until the cache fits in max_bytes
+
+        Returns:
+            Number of entries removed
+        """
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except OSError:
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for name in names:
+            entry_path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl:
+                os.remove(entry_path)
+                removed += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(entry_path)
+            total -= size
+            removed += 1
+
+        return removed
+
+
+_http_cache: Optional[HttpCache] = None
+
+
+def set_http_cache(cache: Optional[HttpCache]):
+    """
+    Set the cache shared by Firebase fetches
+
+    Args:
+        cache: Cache to use, or None to disable caching
+    """
+    global _http_cache
+    _http_cache = cache
+
+
+def get_http_cache() -> Optional[HttpCache]:
+    """
+    Get the cache shared by Firebase fetches
+
+    Returns:
+        Shared cache, or None if caching is disabled
+    """
+    return _http_cache
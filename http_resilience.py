@@ -0,0 +1,274 @@
+"""
+Moorea Life Schedule - Fault tolerance for Firebase REST requests
+Retry backoff, latency tracking for hedged requests, per-host circuit
+breakers used by the session pool, and the daemon worker pool running
+requests that may be abandoned
+"""
+
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Optional
+
+
+# Retries after a failed attempt, and bounds of the exponential backoff in seconds
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 8.0
+
+# Consecutive failures opening a host's circuit, and seconds before it is tried again
+DEFAULT_BREAKER_THRESHOLD = 3
+DEFAULT_BREAKER_RESET = 60.0
+
+# Latency samples kept per host, and samples needed before hedging kicks in
+LATENCY_WINDOW = 64
+DEFAULT_HEDGE_MIN_SAMPLES = 8
+
+# HTTP statuses worth retrying: rate limiting and server-side failures
+RETRYABLE_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host whose circuit is open"""
+
+
+def backoff_delay(attempt: int, base: float = DEFAULT_BACKOFF_BASE,
+                  maximum: float = DEFAULT_BACKOFF_MAX,
+                  retry_after: Optional[str] = None) -> float:
+    """
+    Get the delay before retrying a failed attempt
+
+    Uses exponential backoff with full jitter, or the server's Retry-After
+    header when it gives a number of seconds, capped at maximum either way.
+
+    Args:
+        attempt: Number of the failed attempt, starting at 0
+        base: Delay ceiling of the first retry in seconds
+        maximum: Upper bound of any delay in seconds
+        retry_after: Retry-After header of the failed response, if any
+
+    Returns:
+        Delay in seconds
+    """
+    if retry_after:
+        try:
+            return min(maximum, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one host
+
+    After threshold consecutive failures the circuit opens and requests
+    fail immediately. Once reset_timeout has elapsed, a single trial
+    request is let through: its success closes the circuit, its failure
+    opens it again.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_BREAKER_THRESHOLD,
+                 reset_timeout: float = DEFAULT_BREAKER_RESET):
+        """
+        Args:
+            threshold: Consecutive failures opening the circuit
+            reset_timeout: Seconds before an open circuit lets a trial through
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half-open'"""
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self) -> bool:
+        """
+        Check whether a request may be sent
+
+        Returns:
+            True if the circuit is closed, or if it is half-open and no
+            other trial request is in flight
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        """Close the circuit after a successful request"""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        """Count a failed request, opening the circuit past the threshold"""
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class LatencyTracker:
+    """Recent response times of one host, used to decide when to hedge"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        """
+        Args:
+            window: Number of most recent samples kept
+        """
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        """
+        Args:
+            seconds: Duration of a successful request
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent: float, min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES) -> Optional[float]:
+        """
+        Get a percentile of the recent response times
+
+        Args:
+            percent: Percentile between 0 and 100
+            min_samples: Samples needed for the percentile to be meaningful
+
+        Returns:
+            Response time in seconds, or None with too few samples
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples or len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
+
+
+def snapshot_breakers(breakers: Dict[str, CircuitBreaker]) -> Dict[str, Dict]:
+    """
+    Describe the circuit breakers of every host
+
+    Args:
+        breakers: Circuit breakers by host
+
+    Returns:
+        Dictionary mapping each host to its state and failure count
+    """
+    return {
+        host: {'state': breaker.state, 'failures': breaker.failures}
+        for host, breaker in breakers.items()
+    }
+
+
+class DaemonExecutor:
+    """
+    Minimal thread pool whose workers are daemon threads
+
+    ThreadPoolExecutor workers are joined when the interpreter exits, so a
+    request abandoned at a deadline would still keep the process alive
+    until it times out. Daemon workers are dropped at exit instead, and
+    jobs still queued can be cancelled by shutdown.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = 'worker'):
+        """
+        Args:
+            max_workers: Maximum number of worker threads
+            thread_name_prefix: Prefix of the worker thread names
+        """
+        self.max_workers = max(1, max_workers)
+        self.thread_name_prefix = thread_name_prefix
+        self._jobs: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads: List[threading.Thread] = []
+        # Released by a worker each time it is done with a job, like ThreadPoolExecutor
+        self._idle = threading.Semaphore(0)
+        self._shutdown = False
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Schedule a call
+
+        Args:
+            fn: Function to call from a worker thread
+            *args: Positional arguments of the call
+            **kwargs: Keyword arguments of the call
+
+        Returns:
+            Future of the call's result
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Exécuteur arrêté")
+            self._jobs.put((future, fn, args, kwargs))
+            # An idle worker picks the job up, a new one is started otherwise
+            if self._idle.acquire(blocking=False):
+                return future
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f"{self.thread_name_prefix}_{len(self._threads)}")
+                thread.start()
+                self._threads.append(thread)
+        return future
+
+    def _work(self):
+        """Run queued calls until shutdown"""
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            future, fn, args, kwargs = job
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            self._idle.release()
+
+    def shutdown(self, cancel_futures: bool = False):
+        """
+        Stop the workers once the calls already started are done
+
+        Never waits: running calls finish in the background, or are
+        dropped if the interpreter exits first.
+
+        Args:
+            cancel_futures: Whether to cancel the calls not started yet
+        """
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        job = self._jobs.get_nowait()
+                    except queue.Empty:
+                        break
+                    job[0].cancel()
+            for _ in self._threads:
+                self._jobs.put(None)
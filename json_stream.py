@@ -0,0 +1,205 @@
+"""
+Moorea Life Schedule - Incremental JSON parsing
+Parses a JSON document from a stream of byte chunks without building its
+object tree: containers down to a given depth are reported as start and
+end events, and only the values found at that depth are decoded, so
+memory is bounded by the chunk size and the largest of those values
+"""
+
+import codecs
+import json
+from typing import Any, Iterable, Iterator, List, Tuple
+
+
+WHITESPACE = ' \t\n\r'
+NUMBER_CHARS = '0123456789.eE+-'
+
+# Consumed text kept in the buffer before it is dropped
+COMPACT_THRESHOLD = 65536
+
+_DECODER = json.JSONDecoder()
+
+
+def iter_json_events(chunks: Iterable[bytes], depth: int) -> Iterator[Tuple[str, Tuple, Any]]:
+    """
+    Parse a UTF-8 JSON document incrementally
+
+    Paths are tuples of object keys and array indexes from the root. A
+    container whose path is shorter than depth yields ('start', path,
+    '{' or '['), the events of its members, then ('end', path, None).
+    Values at depth, and scalars above it, yield ('value', path, value).
+
+    Args:
+        chunks: Body of the document, in chunks of any size
+        depth: Path length at which values are decoded as a whole
+
+    Yields:
+        Events in document order
+
+    Raises:
+        ValueError: If the document is malformed or truncated
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    chunk_iterator = iter(chunks)
+    buffer = ''
+    position = 0
+    eof = False
+
+    def fill() -> bool:
+        """Append the next chunk to the buffer, False at the end of the body"""
+        nonlocal buffer, position, eof
+        if eof:
+            return False
+        if position > COMPACT_THRESHOLD:
+            buffer = buffer[position:]
+            position = 0
+        for chunk in chunk_iterator:
+            text = decoder.decode(chunk)
+            if text:
+                buffer += text
+                return True
+        buffer += decoder.decode(b'', final=True)
+        eof = True
+        return False
+
+    def next_char() -> str:
+        """Skip whitespace, returning the next character or '' at the end"""
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not fill():
+                return ''
+
+    def decode() -> Any:
+        """Decode the value starting at position, reading more until it is complete"""
+        nonlocal position
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise ValueError(f"JSON invalide ou tronqué à la position {position}")
+            # A value ending with the buffer, or a number cut inside its
+            # fraction or exponent, may continue in the next chunk
+            cut = end == len(buffer) or (isinstance(value, (int, float)) and buffer[end] in NUMBER_CHARS)
+            if cut and fill():
+                continue
+            position = end
+            return value
+
+    # Open containers as [opening character, current key or index]
+    stack: List[List] = []
+    state = 'value'
+
+    while True:
+        char = next_char()
+        if not char:
+            if stack or state != 'after':
+                raise ValueError("JSON tronqué")
+            return
+
+        if state == 'value':
+            path = tuple(entry[1] for entry in stack)
+            if len(stack) >= depth or char not in '{[':
+                yield 'value', path, decode()
+                state = 'after'
+            else:
+                position += 1
+                yield 'start', path, char
+                stack.append([char, None])
+                state = 'first'
+
+        elif state == 'first':
+            container = stack[-1]
+            if char == ('}' if container[0] == '{' else ']'):
+                position += 1
+                path = tuple(entry[1] for entry in stack[:-1])
+                stack.pop()
+                yield 'end', path, None
+                state = 'after'
+            elif container[0] == '{':
+                state = 'key'
+            else:
+                container[1] = 0
+                state = 'value'
+
+        elif state == 'key':
+            if char != '"':
+                raise ValueError(f"Clé attendue à la position {position}")
+            stack[-1][1] = decode()
+            state = 'colon'
+
+        elif state == 'colon':
+            if char != ':':
+                raise ValueError(f"':' attendu à la position {position}")
+            position += 1
+            state = 'value'
+
+        else:
+            if not stack:
+                raise ValueError(f"Données après la fin du document à la position {position}")
+            container = stack[-1]
+            if char == ',':
+                position += 1
+                if container[0] == '{':
+                    state = 'key'
+                else:
+                    container[1] += 1
+                    state = 'value'
+            elif char == ('}' if container[0] == '{' else ']'):
+                position += 1
+                path = tuple(entry[1] for entry in stack[:-1])
+                stack.pop()
+                yield 'end', path, None
+            else:
+                raise ValueError(f"',' ou fin de conteneur attendu à la position {position}")
+
+
+class JsonEventWriter:
+    """
+    Serialize parse events back into a JSON document
+
+    Receives the events of one subtree, with paths relative to its root,
+    and writes them to a text file as they come.
+    """
+
+    def __init__(self, stream):
+        """
+        Args:
+            stream: Text file to write to
+        """
+        self.stream = stream
+        # Open containers as [opening character, whether a member was written]
+        self._stack: List[List] = []
+
+    def _member(self, path: Tuple):
+        """Write the separator and key preceding a member"""
+        if not self._stack:
+            return
+        container = self._stack[-1]
+        if container[1]:
+            self.stream.write(',')
+        container[1] = True
+        if container[0] == '{':
+            self.stream.write(json.dumps(path[-1], ensure_ascii=False))
+            self.stream.write(':')
+
+    def start(self, path: Tuple, char: str):
+        """Open a container"""
+        self._member(path)
+        self.stream.write(char)
+        self._stack.append([char, False])
+
+    def value(self, path: Tuple, value: Any):
+        """Write a value"""
+        self._member(path)
+        self.stream.write(json.dumps(value, ensure_ascii=False, separators=(',', ':')))
+
+    def end(self):
+        """Close the innermost container"""
+        char, _ = self._stack.pop()
+        self.stream.write('}' if char == '{' else ']')
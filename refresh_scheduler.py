@@ -0,0 +1,164 @@
+"""
+Moorea Life Schedule - Adaptive refresh scheduling
+Decides when each (company, week) is fetched again in daemon mode: near
+weeks often, far weeks rarely, static schedules once, and less and less
+often while a payload keeps coming back unchanged
+"""
+
+import time
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+# Refresh interval of the current week, and longest interval of any week, in seconds
+DEFAULT_BASE_INTERVAL = 600.0
+DEFAULT_MAX_INTERVAL = 6 * 3600.0
+
+# Interval growth per week of distance from the current week, and per unchanged refresh
+DEFAULT_DISTANCE_FACTOR = 2.0
+DEFAULT_BACKOFF_FACTOR = 2.0
+
+
+class RefreshScheduler:
+    """
+    Refresh deadlines of a set of keys
+
+    Each key has a distance (0 for the current week, 1 for the next, ...)
+    giving its initial interval, base * distance_factor ** distance. Every
+    refresh that brings back an unchanged payload multiplies the interval
+    by backoff_factor, a changed payload resets it, and a failed refresh
+    retries after the initial interval. Intervals never exceed
+    max_interval. Keys without distance are static: due once, then never.
+    """
+
+    def __init__(self, base_interval: float = DEFAULT_BASE_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_INTERVAL,
+                 distance_factor: float = DEFAULT_DISTANCE_FACTOR,
+                 backoff_factor: float = DEFAULT_BACKOFF_FACTOR):
+        """
+        Args:
+            base_interval: Refresh interval of the current week in seconds
+            max_interval: Longest refresh interval in seconds
+            distance_factor: Interval growth per week of distance
+            backoff_factor: Interval growth per unchanged refresh
+        """
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.distance_factor = distance_factor
+        self.backoff_factor = backoff_factor
+        # key -> [distance or None, interval, due time (monotonic) or None]
+        self._entries: Dict[Hashable, List] = {}
+
+    def initial_interval(self, distance: int) -> float:
+        """
+        Get the interval of a key that just changed
+
+        Args:
+            distance: Weeks between the key's week and the current week
+
+        Returns:
+            Interval in seconds
+        """
+        return min(self.max_interval, self.base_interval * self.distance_factor ** distance)
+
+    def sync(self, keys: Iterable[Tuple[Hashable, Optional[int]]], now: Optional[float] = None) -> List:
+        """
+        Follow a new set of keys, new keys being due immediately
+
+        Known keys keep their interval and deadline, but take their new
+        distance into account: a week becoming nearer is not refreshed
+        later than its new initial interval. Keys missing from the set are
+        forgotten.
+
+        Args:
+            keys: Tuples of (key, distance), distance None for static keys
+            now: Current monotonic time
+
+        Returns:
+            Keys that were added
+        """
+        now = time.monotonic() if now is None else now
+        wanted = dict(keys)
+        for key in [key for key in self._entries if key not in wanted]:
+            del self._entries[key]
+
+        added = []
+        for key, distance in wanted.items():
+            entry = self._entries.get(key)
+            if entry is None:
+                interval = self.initial_interval(distance) if distance is not None else None
+                self._entries[key] = [distance, interval, now]
+                added.append(key)
+            elif distance is not None and entry[0] != distance:
+                entry[0] = distance
+                entry[1] = min(entry[1], self.initial_interval(distance))
+                entry[2] = min(entry[2], now + entry[1])
+        return added
+
+    def due(self, now: Optional[float] = None) -> List:
+        """
+        Get the keys to refresh
+
+        Args:
+            now: Current monotonic time
+
+        Returns:
+            Keys whose deadline has passed
+        """
+        now = time.monotonic() if now is None else now
+        return [key for key, (_, _, due_at) in self._entries.items() if due_at is not None and due_at <= now]
+
+    def record(self, key: Hashable, changed: bool, success: bool = True, now: Optional[float] = None):
+        """
+        Schedule the next refresh of a key after refreshing it
+
+        Args:
+            key: Refreshed key
+            changed: Whether the payload differs from the previous one
+            success: Whether the refresh succeeded
+            now: Current monotonic time
+        """
+        now = time.monotonic() if now is None else now
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        distance, interval, _ = entry
+        if distance is None:
+            # Static schedules are only loaded again if they failed
+            entry[2] = None if success else now + self.base_interval
+            return
+        if changed or not success:
+            interval = self.initial_interval(distance)
+        else:
+            interval = min(self.max_interval, interval * self.backoff_factor)
+        entry[1] = interval
+        entry[2] = now + interval
+
+    def next_due(self) -> Optional[float]:
+        """
+        Get the earliest deadline
+
+        Returns:
+            Monotonic time of the next refresh, or None if nothing is scheduled
+        """
+        deadlines = [due_at for _, _, due_at in self._entries.values() if due_at is not None]
+        return min(deadlines) if deadlines else None
+
+    def describe(self, now: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Describe the schedule for the run report
+
+        Args:
+            now: Current monotonic time
+
+        Returns:
+            Dictionary mapping each key to its interval and the seconds
+            before its next refresh (None when it will not be refreshed)
+        """
+        now = time.monotonic() if now is None else now
+        return {
+            '/'.join(map(str, key)) if isinstance(key, tuple) else str(key): {
+                'interval': round(interval, 1) if interval is not None else None,
+                'dueIn': round(max(0.0, due_at - now), 1) if due_at is not None else None
+            }
+            for key, (_, interval, due_at) in self._entries.items()
+        }
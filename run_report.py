@@ -0,0 +1,165 @@
+"""
+Moorea Life Schedule - Run instrumentation
+Records wall time, downloaded bytes, HTTP statuses, cache outcomes and
+record counts for every stage and every (company, week), and writes them
+to run_report.json
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+
+DEFAULT_REPORT_FILE = 'run_report.json'
+
+
+class RunReport:
+    """
+    Structured telemetry of one pipeline run
+
+    Stages are timed with the stage() context manager, HTTP requests and
+    per-week outcomes are appended from any thread.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stages: Dict[str, Dict] = {}
+        self.requests: List[Dict] = []
+        self.weeks: List[Dict] = []
+        self.extra: Dict = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict]:
+        """
+        Time a stage of the pipeline
+
+        The yielded dictionary can be filled with counters; it is stored in
+        the report with the stage duration, even if the stage fails.
+
+        Args:
+            name: Stage name
+
+        Yields:
+            Dictionary of stage counters
+        """
+        counters: Dict = {}
+        start = time.perf_counter()
+        try:
+            yield counters
+        except Exception as e:
+            counters['error'] = str(e)
+            raise
+        finally:
+            counters['seconds'] = round(time.perf_counter() - start, 6)
+            with self._lock:
+                self.stages[name] = counters
+
+    def record_request(self, **fields):
+        """
+        Record one HTTP request
+
+        Args:
+            **fields: Request fields (company, path, weeks, status, bytes,
+                seconds, cache, error, ...)
+        """
+        with self._lock:
+            self.requests.append(fields)
+
+    def record_week(self, **fields):
+        """
+        Record the outcome of one (company, week)
+
+        Args:
+            **fields: Week fields (company, week, year, success, records, ...)
+        """
+        with self._lock:
+            self.weeks.append(fields)
+
+    def to_dict(self, success: bool = True) -> Dict:
+        """
+        Build the report
+
+        Args:
+            success: Whether the run succeeded
+
+        Returns:
+            Report dictionary
+        """
+        with self._lock:
+            requests = list(self.requests)
+            return {
+                'startedAt': self.started_at.isoformat(),
+                'finishedAt': datetime.now().isoformat(),
+                'seconds': round(time.perf_counter() - self._start, 6),
+                'success': success,
+                'totals': {
+                    'requests': len(requests),
+                    'bytes': sum(r.get('bytes', 0) for r in requests),
+                    'cacheHits': sum(1 for r in requests if r.get('cache') in ('hit', 'fresh')),
+                    'errors': sum(1 for r in requests if r.get('error')),
+                    'records': sum(w.get('records', 0) for w in self.weeks)
+                },
+                'stages': dict(self.stages),
+                'requests': requests,
+                'weeks': list(self.weeks),
+                **self.extra
+            }
+
+    def write(self, filename: str = DEFAULT_REPORT_FILE, success: bool = True):
+        """
+        Write the report as JSON
+
+        Args:
+            filename: Output file
+            success: Whether the run succeeded
+        """
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(success), f, indent=2, ensure_ascii=False)
+
+
+_run_report: Optional[RunReport] = None
+
+# Serializes progress lines printed by concurrent fetch and normalizer threads
+_log_lock = threading.Lock()
+
+
+def log(message: str = ''):
+    """
+    Print a progress line, safely from any thread
+
+    print() writes the text and the line end separately, so lines printed
+    by concurrent threads could otherwise be spliced together. Like print(),
+    the line goes to the current sys.stdout, silenced by --quiet.
+
+    Args:
+        message: Line to print
+    """
+    with _log_lock:
+        print(message, flush=True)
+
+
+def start_run_report() -> RunReport:
+    """
+    Start recording a new run
+
+    Returns:
+        The new current report
+    """
+    global _run_report
+    _run_report = RunReport()
+    return _run_report
+
+
+def get_run_report() -> Optional[RunReport]:
+    """
+    Get the report of the current run
+
+    Returns:
+        Current report, or None when no run is being recorded
+    """
+    return _run_report
@@ -0,0 +1,341 @@
+"""
+Moorea Life Schedule - SQLite schedule archive
+Keeps every departure ever published, keyed by (company, vessel, origin,
+destination, departure time), so history survives the overwritten JSON
+outputs and can be queried by time range or by run
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from schedule_model import Departure, Port, get_monday_of_week, get_ports, parse_port, to_epoch_minutes
+from schedule_query import format_departure
+
+
+DEFAULT_ARCHIVE_FILE = 'data/archive.sqlite'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    records INTEGER NOT NULL DEFAULT 0,
+    added INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    removed INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS departures (
+    company TEXT NOT NULL,
+    vessel TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    minute INTEGER NOT NULL,
+    status,
+    stale INTEGER NOT NULL DEFAULT 0,
+    first_seen_run INTEGER NOT NULL,
+    last_seen_run INTEGER NOT NULL,
+    changed_run INTEGER NOT NULL,
+    removed_run INTEGER,
+    PRIMARY KEY (company, vessel, origin, destination, minute)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS departures_by_minute ON departures (minute);
+CREATE INDEX IF NOT EXISTS departures_by_route ON departures (origin, destination, minute);
+CREATE INDEX IF NOT EXISTS departures_by_change ON departures (changed_run);
+'''
+
+# A departure counts as changed when it is new, comes back after being
+# removed, or its status changed
+UPSERT = '''
+INSERT INTO departures (company, vessel, origin, destination, minute, status, stale,
+                        first_seen_run, last_seen_run, changed_run)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (company, vessel, origin, destination, minute) DO UPDATE SET
+    changed_run = CASE
+        WHEN departures.status IS NOT excluded.status OR departures.removed_run IS NOT NULL
+        THEN excluded.changed_run ELSE departures.changed_run END,
+    status = excluded.status,
+    stale = excluded.stale,
+    last_seen_run = excluded.last_seen_run,
+    removed_run = NULL
+'''
+
+COLUMNS = 'company, vessel, origin, destination, minute, status, stale'
+
+
+class ScheduleArchive:
+    """
+    SQLite archive of published departures
+
+    Each run upserts the departures of the weeks it covers in a single
+    transaction. Departures of a covered week that a run no longer
+    publishes are marked as removed by that run rather than deleted.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_FILE):
+        """
+        Args:
+            path: SQLite database file, created if needed
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        """Close the database"""
+        self._connection.close()
+
+    def __enter__(self) -> 'ScheduleArchive':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record_run(self, departures: Iterable[Departure],
+                   covered: Iterable[Tuple[str, int, int]]) -> Dict:
+        """
+        Archive the departures published by a run
+
+        Args:
+            departures: Departures of the run
+            covered: (company name, week, year) of every week the run
+                published, used to detect removed departures
+
+        Returns:
+            Dictionary with the run 'id' and its 'records', 'added',
+            'updated' and 'removed' counts
+        """
+        with self._lock, self._connection as connection:
+            run_id = connection.execute(
+                'INSERT INTO runs (started_at) VALUES (?)', (datetime.now().isoformat(),)
+            ).lastrowid
+
+            rows = [
+                (d.company, d.vessel, d.origin, d.destination, d.minute,
+                 d.status, int(d.stale), run_id, run_id, run_id)
+                for d in departures
+            ]
+            connection.executemany(UPSERT, rows)
+
+            removed = 0
+            for company, week, year in covered:
+                start = to_epoch_minutes(get_monday_of_week(week, year))
+                removed += connection.execute(
+                    'UPDATE departures SET removed_run = ?, changed_run = ? '
+                    'WHERE company = ? AND minute >= ? AND minute < ? '
+                    'AND last_seen_run < ? AND removed_run IS NULL',
+                    (run_id, run_id, company, start, start + 7 * 1440, run_id)
+                ).rowcount
+
+            added = connection.execute(
+                'SELECT COUNT(*) FROM departures WHERE first_seen_run = ?', (run_id,)
+            ).fetchone()[0]
+            changed = connection.execute(
+                'SELECT COUNT(*) FROM departures WHERE changed_run = ?', (run_id,)
+            ).fetchone()[0]
+
+            stats = {
+                'id': run_id,
+                'records': len(rows),
+                'added': added,
+                'updated': changed - added - removed,
+                'removed': removed
+            }
+            connection.execute(
+                'UPDATE runs SET records = ?, added = ?, updated = ?, removed = ? WHERE id = ?',
+                (stats['records'], stats['added'], stats['updated'], stats['removed'], run_id)
+            )
+        return stats
+
+    def runs(self, limit: int = 20) -> List[Dict]:
+        """
+        Get the most recent runs
+
+        Args:
+            limit: Maximum number of runs
+
+        Returns:
+            Runs, most recent first
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                'SELECT id, started_at, records, added, updated, removed '
+                'FROM runs ORDER BY id DESC LIMIT ?', (limit,)
+            )
+            return [
+                dict(zip(('id', 'startedAt', 'records', 'added', 'updated', 'removed'), row))
+                for row in cursor
+            ]
+
+    def departures_between(self, start: datetime, end: datetime,
+                           origin: Optional[Port] = None,
+                           destination: Optional[Port] = None,
+                           include_removed: bool = False) -> List[Departure]:
+        """
+        Get the archived departures of a time range
+
+        Args:
+            start: Start of the range (included)
+            end: End of the range (excluded)
+            origin: Only departures from this port
+            destination: Only departures to this port
+            include_removed: Also return departures removed since publication
+
+        Returns:
+            Departures sorted by departure time
+        """
+        query = f'SELECT {COLUMNS} FROM departures WHERE minute >= ? AND minute < ?'
+        params: List = [to_epoch_minutes(start), to_epoch_minutes(end)]
+        if origin is not None:
+            query += ' AND origin = ?'
+            params.append(origin)
+        if destination is not None:
+            query += ' AND destination = ?'
+            params.append(destination)
+        if not include_removed:
+            query += ' AND removed_run IS NULL'
+        query += ' ORDER BY minute'
+
+        with self._lock:
+            return [self._departure(row) for row in self._connection.execute(query, params)]
+
+    def changes_since(self, run_id: int) -> Dict[str, List[Departure]]:
+        """
+        Get what changed after a given run
+
+        Args:
+            run_id: Run to compare with, 0 for the whole history
+
+        Returns:
+            Dictionary with the 'added', 'updated' and 'removed'
+            departures, each sorted by departure time
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                f'SELECT {COLUMNS}, first_seen_run, removed_run FROM departures '
+                'WHERE changed_run > ? ORDER BY minute', (run_id,)
+            ).fetchall()
+
+        changes = {'added': [], 'updated': [], 'removed': []}
+        for row in rows:
+            first_seen_run, removed_run = row[-2:]
+            if removed_run is not None:
+                if first_seen_run <= run_id:
+                    changes['removed'].append(self._departure(row))
+            elif first_seen_run > run_id:
+                changes['added'].append(self._departure(row))
+            else:
+                changes['updated'].append(self._departure(row))
+        return changes
+
+    @staticmethod
+    def _departure(row: Tuple) -> Departure:
+        """Build a departure from the first columns of a row"""
+        company, vessel, origin, destination, minute, status, stale = row[:7]
+        return Departure(minute, origin, destination, vessel, company, status, bool(stale))
+
+
+def get_covered_weeks(results: List[Dict]) -> List[Tuple[str, int, int]]:
+    """
+    Get the weeks published by a run
+
+    Args:
+        results: Fetch results of the run
+
+    Returns:
+        List of (company name, week, year) of the successful results
+    """
+    return [(r['company']['name'], r['week'], r['year']) for r in results if r['success']]
+
+
+def run_archive(args) -> int:
+    """
+    Run an archive subcommand
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Process exit code
+    """
+    if not os.path.exists(args.db):
+        print(f"❌ Archive introuvable: {args.db}")
+        return 1
+
+    with ScheduleArchive(args.db) as archive:
+        if args.archive_query == 'runs':
+            for run in archive.runs(args.n):
+                print(f"#{run['id']}  {run['startedAt'][:19]}  {run['records']} horaires, "
+                      f"+{run['added']} ~{run['updated']} -{run['removed']}")
+            return 0
+
+        if args.archive_query == 'range':
+            start = datetime.fromisoformat(args.start)
+            end = datetime.fromisoformat(args.end) if args.end else start + timedelta(days=1)
+            origin = parse_port(args.origin.upper()) if args.origin else None
+            destination = parse_port(args.destination.upper()) if args.destination else None
+            if (args.origin and origin is None) or (args.destination and destination is None):
+                print(f"❌ Port inconnu (ports connus: {', '.join(get_ports())})")
+                return 1
+            departures = archive.departures_between(start, end, origin, destination,
+                                                    args.include_removed)
+            if args.json:
+                print(json.dumps([d.to_record() for d in departures], indent=2, ensure_ascii=False))
+            elif departures:
+                for departure in departures:
+                    print(format_departure(departure))
+            else:
+                print("Aucun départ trouvé")
+            return 0
+
+        since = args.since
+        if since is None:
+            runs = archive.runs(2)
+            since = runs[1]['id'] if len(runs) > 1 else 0
+        changes = archive.changes_since(since)
+        if args.json:
+            print(json.dumps({kind: [d.to_record() for d in departures]
+                              for kind, departures in changes.items()}, indent=2, ensure_ascii=False))
+            return 0
+        labels = {'added': '➕ Ajoutés', 'updated': '✏️  Modifiés', 'removed': '➖ Supprimés'}
+        for kind, departures in changes.items():
+            print(f"{labels[kind]} depuis l'exécution #{since}: {len(departures)}")
+            for departure in departures:
+                print(f"   {format_departure(departure)}")
+        return 0
+
+
+def add_archive_arguments(subparsers):
+    """
+    Register the archive subcommand on an argparse subparsers object
+
+    Args:
+        subparsers: Result of ArgumentParser.add_subparsers()
+    """
+    parser = subparsers.add_parser('archive', help="interroge l'archive SQLite des horaires")
+    parser.add_argument('--db', default=DEFAULT_ARCHIVE_FILE, help="base SQLite de l'archive")
+    parser.add_argument('--json', action='store_true', help="sortie JSON au format horaires.json")
+    queries = parser.add_subparsers(dest='archive_query', required=True)
+
+    runs_parser = queries.add_parser('runs', help="dernières exécutions archivées")
+    runs_parser.add_argument('-n', type=int, default=20, help="nombre d'exécutions (défaut: 20)")
+
+    range_parser = queries.add_parser('range', help="départs archivés d'une période")
+    range_parser.add_argument('start', help="début, date ou date et heure ISO")
+    range_parser.add_argument('end', nargs='?', help="fin exclue (défaut: début + 1 jour)")
+    range_parser.add_argument('--from', dest='origin', help="port de départ (PPT, MOZ)")
+    range_parser.add_argument('--to', dest='destination', help="port d'arrivée")
+    range_parser.add_argument('--include-removed', action='store_true',
+                              help="inclut les départs supprimés depuis leur publication")
+
+    changes_parser = queries.add_parser('changes', help="départs ajoutés, modifiés ou supprimés")
+    changes_parser.add_argument('--since', type=int,
+                                help="numéro d'exécution de référence (défaut: l'avant-dernière)")
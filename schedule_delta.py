@@ -0,0 +1,163 @@
+"""
+Moorea Life Schedule - Schedule deltas
+Compares the new unified schedule with the previous horaires.json and
+writes the differences to changes.json, so clients can patch their copy
+instead of downloading every departure again
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from build_state import fingerprint
+from schedule_model import Departure
+
+
+DEFAULT_CHANGES_FILE = 'changes.json'
+
+# Bumped whenever the layout of changes.json changes
+CHANGES_FORMAT_VERSION = 1
+
+
+def departure_key(departure: Departure) -> Tuple:
+    """
+    Get the identity of a departure
+
+    Args:
+        departure: Departure
+
+    Returns:
+        (company, vessel, origin, destination, minute)
+    """
+    return (departure.company, departure.vessel, departure.origin, departure.destination,
+            departure.minute)
+
+
+def day_route_key(departure: Departure) -> Tuple:
+    """
+    Get the key under which a departure can be retimed
+
+    Args:
+        departure: Departure
+
+    Returns:
+        (company, vessel, origin, destination, day since EPOCH)
+    """
+    return (departure.company, departure.vessel, departure.origin, departure.destination,
+            departure.minute // 1440)
+
+
+def diff_departures(old: List[Departure], new: List[Departure]) -> Dict[str, List]:
+    """
+    Compute the differences between two schedules in linear time
+
+    Departures are matched on their identity. A removed and an added
+    departure of the same company, vessel and route on the same day are
+    reported as one retimed departure; an identical departure whose status
+    changed is reported as updated. Staleness is not compared: serving a
+    week from its last good snapshot does not change its departures.
+
+    Args:
+        old: Previous departures
+        new: New departures
+
+    Returns:
+        Dictionary with 'added', 'removed' and 'updated' departure lists
+        and 'retimed' (old, new) pairs, each sorted by departure time
+    """
+    old_by_key = {departure_key(d): d for d in old}
+    new_by_key = {departure_key(d): d for d in new}
+
+    added = []
+    updated = []
+    for key, departure in new_by_key.items():
+        previous = old_by_key.get(key)
+        if previous is None:
+            added.append(departure)
+        elif previous.status != departure.status:
+            updated.append(departure)
+    removed = [d for key, d in old_by_key.items() if key not in new_by_key]
+
+    # Pair removals and additions of the same vessel and route on the same day, in time order
+    added.sort(key=lambda d: d.minute)
+    removed.sort(key=lambda d: d.minute)
+    removed_by_day: Dict[Tuple, List[Departure]] = {}
+    for departure in removed:
+        removed_by_day.setdefault(day_route_key(departure), []).append(departure)
+
+    retimed = []
+    still_added = []
+    for departure in added:
+        candidates = removed_by_day.get(day_route_key(departure))
+        if candidates:
+            retimed.append((candidates.pop(0), departure))
+        else:
+            still_added.append(departure)
+
+    retimed_old = {id(previous) for previous, _ in retimed}
+    return {
+        'added': still_added,
+        'removed': [d for d in removed if id(d) not in retimed_old],
+        'retimed': retimed,
+        'updated': sorted(updated, key=lambda d: d.minute)
+    }
+
+
+def build_changes(diff: Dict[str, List], base: Optional[str], target: str) -> Dict:
+    """
+    Build the changes.json document
+
+    Args:
+        diff: Output of diff_departures
+        base: Version of the schedule the changes apply to, None if there
+            was no previous schedule
+        target: Version of the schedule obtained after applying them
+
+    Returns:
+        JSON-serializable changes document
+    """
+    return {
+        'format': CHANGES_FORMAT_VERSION,
+        'generatedAt': datetime.now().isoformat(),
+        'base': base,
+        'target': target,
+        'added': [d.to_record() for d in diff['added']],
+        'removed': [d.to_record() for d in diff['removed']],
+        'retimed': [{'from': previous.to_record(), 'to': departure.to_record()}
+                    for previous, departure in diff['retimed']],
+        'updated': [d.to_record() for d in diff['updated']]
+    }
+
+
+def load_schedule_version(filename: str) -> Tuple[List[Departure], Optional[str]]:
+    """
+    Load a unified schedule file along with its version
+
+    Args:
+        filename: Unified schedule file
+
+    Returns:
+        Tuple of (departures, version), ([], None) if the file is missing
+        or unreadable
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            content = f.read()
+        records = json.loads(content)
+    except (OSError, ValueError):
+        return [], None
+
+    departures = [Departure.from_record(record) for record in records]
+    return [d for d in departures if d is not None], fingerprint(content)
+
+
+def write_changes(changes: Dict, filename: str = DEFAULT_CHANGES_FILE):
+    """
+    Write a changes document
+
+    Args:
+        changes: Output of build_changes
+        filename: Output file
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(changes, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,327 @@
+"""
+Moorea Life Schedule - Compact departure records
+A single departure type shared by every stage of the pipeline, with the
+textual fields of horaires.json only built when serializing, and the
+routes (origin and destination ports) departures are grouped by
+"""
+
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+
+# Departure times are stored as minutes since this (naive, local) epoch
+EPOCH = datetime(1970, 1, 1)
+
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+def get_monday_of_week(week: int, year: int) -> datetime:
+    """
+    Get the Monday of a specific ISO week
+
+    Args:
+        week: ISO week number
+        year: Year
+
+    Returns:
+        Date of the Monday of that week
+    """
+    # January 4th is always in week 1
+    jan4 = datetime(year, 1, 4)
+    # Get the Monday of week 1
+    monday_week1 = jan4 - timedelta(days=jan4.weekday())
+    # Calculate target Monday
+    target_monday = monday_week1 + timedelta(weeks=week - 1)
+    return target_monday
+
+
+def extract_vessel_name(vessel_field: str) -> str:
+    """
+    Extract clean vessel name from Firebase vessel field
+
+    Examples:
+        "Aremiti 5-26v" -> "Aremiti 5"
+        "Aremiti 6-12a" -> "Aremiti 6"
+        "Terevau" -> "Terevau"
+
+    Args:
+        vessel_field: Raw vessel string from Firebase
+
+    Returns:
+        Clean vessel name
+    """
+    if not vessel_field:
+        return ""
+
+    # Try to extract "Aremiti N" pattern (where N is a number)
+    match = re.match(r'(Aremiti \d+)', vessel_field, re.IGNORECASE)
+    if match:
+        return match.group(1)
+
+    # For other vessels, return as-is
+    return vessel_field
+
+
+# Ports are identified by their code, e.g. "PPT"; the codes of departures
+# are interned, so every departure of a port shares the same string
+Port = str
+
+
+@dataclass(frozen=True)
+class Route:
+    """
+    Route served by the ferries, from one port to another
+
+    Attributes:
+        id: Route identifier, "{origin}-{destination}" unless configured
+        origin: Departure port
+        destination: Arrival port
+        label: Name displayed on the page, e.g. "Papeete → Moorea"
+        static_section: Section of static schedule files listing its times
+    """
+    id: str
+    origin: Port
+    destination: Port
+    label: str
+    static_section: Optional[str] = None
+
+
+# Routes used when companies.json has no "routes" section
+DEFAULT_ROUTES = (
+    {'origin': 'PPT', 'destination': 'MOZ', 'label': 'Papeete → Moorea', 'staticSection': 'TahitiVersMoorea'},
+    {'origin': 'MOZ', 'destination': 'PPT', 'label': 'Moorea → Papeete', 'staticSection': 'MooreaVersTahiti'}
+)
+
+
+def route_id(origin: Port, destination: Port) -> str:
+    """
+    Get the identifier of the route between two ports
+
+    Args:
+        origin: Departure port
+        destination: Arrival port
+
+    Returns:
+        Configured route id, or "{origin}-{destination}" for a route that
+        is not configured
+    """
+    route = _routes_by_ports.get((origin, destination))
+    return route.id if route is not None else f"{origin}-{destination}"
+
+
+def configure_routes(routes_config: Optional[Iterable[Dict]] = None) -> List[Route]:
+    """
+    Set the routes served by the ferries, and so the known ports
+
+    Args:
+        routes_config: "routes" section of companies.json, a list of
+            objects with origin and destination port codes, and optionally
+            id, label and staticSection; defaults to DEFAULT_ROUTES
+
+    Returns:
+        Configured routes, in configuration order
+
+    Raises:
+        ValueError: If a route lacks a port or is defined twice
+    """
+    global _routes, _routes_by_ports, _ports
+    routes = []
+    by_ports: Dict[Tuple[Port, Port], Route] = {}
+    for config in routes_config or DEFAULT_ROUTES:
+        if not config.get('origin') or not config.get('destination'):
+            raise ValueError(f"Route sans origine ou destination: {config}")
+        origin = sys.intern(config['origin'])
+        destination = sys.intern(config['destination'])
+        route = Route(
+            config.get('id') or f"{origin}-{destination}", origin, destination,
+            config.get('label') or f"{origin} → {destination}", config.get('staticSection')
+        )
+        if (origin, destination) in by_ports or any(r.id == route.id for r in routes):
+            raise ValueError(f"Route définie deux fois: {route.id}")
+        routes.append(route)
+        by_ports[(origin, destination)] = route
+    _routes, _routes_by_ports = routes, by_ports
+    _ports = {port: port for route in routes for port in (route.origin, route.destination)}
+    return list(routes)
+
+
+def get_routes() -> List[Route]:
+    """
+    Get the configured routes
+
+    Returns:
+        Routes in configuration order
+    """
+    return list(_routes)
+
+
+def get_payload_keys() -> List[str]:
+    """
+    Get the top-level keys of a week payload
+
+    Firebase groups the days of a week payload by destination port, so
+    there is one key per destination of the configured routes.
+
+    Returns:
+        Destination port codes, in route order
+    """
+    return list(dict.fromkeys(route.destination for route in _routes))
+
+
+def get_ports() -> List[Port]:
+    """
+    Get the ports of the configured routes
+
+    Returns:
+        Port codes, in route order
+    """
+    return list(_ports)
+
+
+def parse_port(code: str) -> Optional[Port]:
+    """
+    Get the known port matching a code such as "PPT"
+
+    Args:
+        code: Port code from Firebase or the command line
+
+    Returns:
+        Interned port code, or None if no configured route serves it
+    """
+    return _ports.get(code)
+
+
+_routes: List[Route] = []
+_routes_by_ports: Dict[Tuple[Port, Port], Route] = {}
+_ports: Dict[str, Port] = {}
+configure_routes()
+
+
+def to_epoch_minutes(date: datetime) -> int:
+    """
+    Convert a naive datetime to minutes since EPOCH
+
+    Args:
+        date: Date and time
+
+    Returns:
+        Minutes since EPOCH
+    """
+    return (date - EPOCH) // timedelta(minutes=1)
+
+
+def from_epoch_minutes(minutes: int) -> datetime:
+    """
+    Convert minutes since EPOCH to a naive datetime
+
+    Args:
+        minutes: Minutes since EPOCH
+
+    Returns:
+        Date and time
+    """
+    return EPOCH + timedelta(minutes=minutes)
+
+
+@dataclass(slots=True)
+class Departure:
+    """
+    One ferry departure
+
+    Attributes:
+        minute: Departure time in minutes since EPOCH
+        origin: Departure port code (interned)
+        destination: Arrival port code (interned)
+        vessel: Vessel name (interned)
+        company: Company name (interned)
+        status: Status code as given by the source
+        stale: Whether it comes from the last good snapshot of a week that
+            could not be fetched
+    """
+    minute: int
+    origin: Port
+    destination: Port
+    vessel: str
+    company: str
+    status: Union[int, str] = 'active'
+    stale: bool = False
+
+    def __post_init__(self):
+        self.origin = sys.intern(self.origin)
+        self.destination = sys.intern(self.destination)
+        self.vessel = sys.intern(self.vessel)
+        self.company = sys.intern(self.company)
+
+    @property
+    def departure_time(self) -> datetime:
+        """Departure date and time"""
+        return from_epoch_minutes(self.minute)
+
+    def to_record(self) -> Dict:
+        """
+        Serialize to the horaires.json record format
+
+        Returns:
+            Record dictionary with textual date and time fields, and
+            'perime' set to true for stale departures
+        """
+        date = from_epoch_minutes(self.minute)
+        record = {
+            'bateau': self.vessel,
+            'compagnie': self.company,
+            'origine': self.origin,
+            'destination': self.destination,
+            'date': date.strftime('%Y-%m-%d'),
+            'jour': DAY_NAMES[date.weekday()],
+            'heure': f"{date.hour:02d}:{date.minute:02d}",
+            'timestamp': date.isoformat(),
+            'statut': self.status
+        }
+        if self.stale:
+            record['perime'] = True
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict) -> Optional['Departure']:
+        """
+        Parse a horaires.json record
+
+        Args:
+            record: Record dictionary
+
+        Returns:
+            Departure, or None if it has no origin or destination
+        """
+        if not record.get('origine') or not record.get('destination'):
+            return None
+        return cls(
+            to_epoch_minutes(datetime.fromisoformat(record['timestamp'])),
+            record['origine'], record['destination'], record['bateau'], record['compagnie'],
+            record.get('statut', 'active'), bool(record.get('perime'))
+        )
+
+    def to_row(self) -> List:
+        """
+        Serialize to a compact list, e.g. for caching
+
+        Returns:
+            [minute, origin, destination, vessel, company, status, stale]
+        """
+        return [self.minute, self.origin, self.destination,
+                self.vessel, self.company, self.status, self.stale]
+
+    @classmethod
+    def from_row(cls, row: List) -> 'Departure':
+        """
+        Parse a list produced by to_row
+
+        Args:
+            row: Compact departure list
+
+        Returns:
+            Departure
+        """
+        return cls(*row)
@@ -0,0 +1,600 @@
+"""
+Moorea Life Schedule - Normalization stage
+Walks each raw week payload exactly once and streams the resulting
+departures to every consumer (data/ snapshots, unified schedule, ...),
+optionally on background threads while the other fetches are running
+"""
+
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from build_state import fingerprint
+from json_stream import JsonEventWriter
+from run_report import log
+from schedule_model import (
+    Departure, Port, extract_vessel_name, get_monday_of_week, get_payload_keys, get_routes,
+    parse_port, route_id, to_epoch_minutes
+)
+
+# Bytes read from the end of a snapshot to find its dataHash
+SNAPSHOT_TAIL_BYTES = 256
+_DATA_HASH_PATTERN = re.compile(r'"dataHash":\s*"([0-9a-f]+)"\s*}\s*$')
+
+
+def normalize_schedule(schedule: Dict, monday_minute: int, company: Dict,
+                       stale: bool = False) -> Optional[Departure]:
+    """
+    Normalize one schedule dict of a week payload
+
+    The schedule dict is left as is, so payloads can be shared between
+    runs and saved as data/ snapshots exactly as received.
+
+    Args:
+        schedule: Schedule dict of a day
+        monday_minute: Epoch minute of the Monday of its week
+        company: Company configuration
+        stale: Whether the payload is the last good snapshot of a week that
+            could not be fetched
+
+    Returns:
+        Departure, or None if the schedule has no day or an unknown port
+    """
+    # Determine vessel_name (use company name if not specified)
+    default_vessel_name = company.get('vessel_name', company['name'])
+
+    # Extract vessel name from the 'vessel' field unless already known
+    vessel_name = schedule.get('vessel_name')
+    if vessel_name is None:
+        vessel_name = extract_vessel_name(schedule['vessel']) if schedule.get('vessel') else default_vessel_name
+
+    day = schedule.get('day')
+    if day is None:
+        return None
+
+    origin = parse_port(schedule.get('origin', ''))
+    destination = parse_port(schedule.get('destination', ''))
+    if origin is None or destination is None:
+        return None
+
+    time_begin = schedule.get('timeBegin', 0)
+    return Departure(
+        monday_minute + day * 1440 + time_begin // 60,
+        origin,
+        destination,
+        vessel_name or default_vessel_name,
+        company['name'],
+        schedule.get('status', 'active'),
+        stale
+    )
+
+
+def iter_departures(data: Dict, week: int, year: int, company: Dict,
+                    stale: bool = False) -> Iterator[Departure]:
+    """
+    Normalize a raw week payload into a stream of departures
+
+    The payload is walked once and is not modified.
+
+    Args:
+        data: Week payload (destination port -> day list -> schedule dict)
+        week: ISO week number
+        year: ISO year
+        company: Company configuration
+        stale: Whether the payload is the last good snapshot of a week that
+            could not be fetched
+
+    Yields:
+        Departures in payload order
+    """
+    if not data or not isinstance(data, dict):
+        return
+
+    monday_minute = to_epoch_minutes(get_monday_of_week(week, year))
+
+    for payload_key in get_payload_keys():
+        day_list = data.get(payload_key)
+        if not isinstance(day_list, list):
+            continue
+
+        for day_data in day_list:
+            if not day_data or not isinstance(day_data, dict):
+                continue
+
+            for schedule in day_data.values():
+                if not schedule or not isinstance(schedule, dict):
+                    continue
+
+                departure = normalize_schedule(schedule, monday_minute, company, stale)
+                if departure is not None:
+                    yield departure
+
+
+# Route of a departure, as (origin, destination)
+Direction = Tuple[Port, Port]
+
+
+_departure_minute = attrgetter('minute')
+
+
+def split_directions(departures: Iterable[Departure]) -> Dict[Direction, List[Departure]]:
+    """
+    Split the departures of one week into one stream per direction
+
+    Each stream is sorted by departure minute, which costs a single linear
+    pass when the payload was already in day and time order.
+
+    Args:
+        departures: Departures of one (company, week)
+
+    Returns:
+        Dictionary mapping each (origin, destination) to its sorted departures
+    """
+    streams: Dict[Direction, List[Departure]] = {}
+    for departure in departures:
+        streams.setdefault((departure.origin, departure.destination), []).append(departure)
+    for stream in streams.values():
+        stream.sort(key=_departure_minute)
+    return streams
+
+
+def merge_timelines(streams: Iterable[Dict[Direction, List[Departure]]]) -> Dict[str, List[Departure]]:
+    """
+    Merge per-(company, week) direction streams into one timeline per route
+
+    This is the route index of the unified schedule: it is built once, and
+    every output then reads only the timelines of the routes it shows.
+
+    The sorted streams of a direction are laid end to end and merged by
+    list.sort, which finds each stream as an ordered run and merges the
+    runs: a k-way merge in O(n log k), without sorting the whole schedule
+    again. heapq.merge does the same work one Python-level step per
+    departure and is several times slower on a full schedule (see
+    benchmarks/bench_merge.py). Departures at the same minute keep the
+    order of their streams.
+
+    Args:
+        streams: Direction streams of every (company, week), as returned by
+            split_directions
+
+    Returns:
+        Dictionary mapping each route id to its departures sorted by
+        departure minute, configured routes first in configuration order,
+        then routes that are not configured by id
+    """
+    timelines: Dict[Direction, List[Departure]] = {}
+    for week_streams in streams:
+        for direction, stream in week_streams.items():
+            timelines.setdefault(direction, []).extend(stream)
+    for timeline in timelines.values():
+        timeline.sort(key=_departure_minute)
+
+    by_route = {route_id(*direction): timeline for direction, timeline in timelines.items()}
+    order = [route.id for route in get_routes() if route.id in by_route]
+    order += sorted(set(by_route) - set(order))
+    return {route: by_route[route] for route in order}
+
+
+def merge_departures(timelines: Dict[str, List[Departure]]) -> List[Departure]:
+    """
+    Merge route timelines into a single timeline
+
+    Like merge_timelines, this is a run merge rather than a new sort: each
+    timeline is already sorted, so list.sort only merges one run per
+    route. heapq.merge of the timelines is about four times slower
+    (benchmarks/bench_merge.py).
+
+    Args:
+        timelines: Sorted departures per route, as returned by merge_timelines
+
+    Returns:
+        Every departure sorted by departure minute, departures at the same
+        minute in route order
+    """
+    departures = [departure for timeline in timelines.values() for departure in timeline]
+    departures.sort(key=_departure_minute)
+    return departures
+
+
+class DepartureSink:
+    """
+    Consumer of the departure stream of one fetch result
+
+    Subclasses override the hooks they need: begin is called before the
+    first departure, add for every departure and end once the payload has
+    been fully walked.
+    """
+
+    def begin(self, result: Dict):
+        """
+        Args:
+            result: Fetch result being normalized
+        """
+
+    def add(self, departure: Departure):
+        """
+        Args:
+            departure: Next departure of the stream
+        """
+
+    def end(self, result: Dict):
+        """
+        Args:
+            result: Fetch result whose payload was fully walked
+        """
+
+
+class DepartureCollector(DepartureSink):
+    """Collect the departures of a result into a list"""
+
+    def __init__(self):
+        self.departures: List[Departure] = []
+
+    def add(self, departure: Departure):
+        self.departures.append(departure)
+
+
+class SnapshotWriter(DepartureSink):
+    """
+    Save the payload of a result to data/{company-id}_week{week}.json
+
+    The snapshot's lastUpdate is the time its content last changed, and its
+    modification time the last time its week was successfully fetched, so
+    it can stand in for a week whose fetch fails.
+    """
+
+    def __init__(self, directory: str = 'data'):
+        """
+        Args:
+            directory: Directory holding the snapshots
+        """
+        self.directory = directory
+
+    def filename(self, result: Dict) -> str:
+        """
+        Get the snapshot file of a result
+
+        Args:
+            result: Fetch result
+
+        Returns:
+            Snapshot file path
+        """
+        return os.path.join(self.directory, f"{result['company']['id']}_week{result['week']}.json")
+
+    def is_current(self, result: Dict) -> bool:
+        """
+        Check whether the snapshot on disk already holds this result's payload
+
+        A week fetched in the same range request as a changed week is not
+        flagged unchanged, so its payload hash is compared with the one
+        stored in the snapshot.
+
+        Args:
+            result: Fetch result
+
+        Returns:
+            True if the snapshot exists and the payload is unchanged
+        """
+        if not os.path.exists(self.filename(result)):
+            return False
+        return bool(result.get('unchanged')) or self.stored_hash(result) == self.data_hash(result)
+
+    @staticmethod
+    def data_hash(result: Dict) -> str:
+        """
+        Get the hash of a result's payload, computed once per result
+
+        Args:
+            result: Successful fetch result
+
+        Returns:
+            Hash stored as the snapshot's dataHash
+        """
+        if 'dataHash' not in result:
+            result['dataHash'] = fingerprint(result['data'])
+        return result['dataHash']
+
+    def touch(self, result: Dict):
+        """
+        Mark the snapshot of a successfully fetched result as validated now
+
+        Args:
+            result: Fetch result whose payload matches its snapshot
+        """
+        if not result.get('stale'):
+            try:
+                os.utime(self.filename(result))
+            except OSError:
+                pass
+
+    def stored_hash(self, result: Dict) -> Optional[str]:
+        """
+        Get the dataHash of a result's snapshot without parsing its payload
+
+        It is the last key of the snapshot, so it is read from the end of
+        the file.
+
+        Args:
+            result: Fetch result
+
+        Returns:
+            Hash of the snapshot's data, or None if unknown
+        """
+        try:
+            with open(self.filename(result), 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - SNAPSHOT_TAIL_BYTES))
+                tail = f.read().decode('utf-8', errors='replace')
+        except OSError:
+            return None
+        match = _DATA_HASH_PATTERN.search(tail)
+        return match.group(1) if match else None
+
+    def load(self, result: Dict) -> Optional[Dict]:
+        """
+        Load the last good snapshot of a result's week
+
+        Args:
+            result: Fetch result, usually a failed one
+
+        Returns:
+            Snapshot dictionary with the time of its last successful fetch
+            as 'validatedAt' (datetime), or None if there is no snapshot of
+            that week and year
+        """
+        filename = self.filename(result)
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            validated_at = datetime.fromtimestamp(os.path.getmtime(filename))
+        except (OSError, ValueError):
+            return None
+
+        if snapshot.get('year') != result['year'] or not snapshot.get('data'):
+            return None
+        snapshot['validatedAt'] = validated_at
+        return snapshot
+
+    def end(self, result: Dict):
+        if self.is_current(result):
+            self.touch(result)
+            return
+
+        company = result['company']
+        snapshot = {
+            'company': company['name'],
+            'companyId': company['id'],
+            'week': result['week'],
+            'year': result['year'],
+            'data': result['data'],
+            'lastUpdate': datetime.now().isoformat()
+        }
+        if result.get('source'):
+            snapshot['source'] = result['source']
+        snapshot['dataHash'] = self.data_hash(result)
+        self.write(self.filename(result), snapshot)
+
+    def write(self, filename: str, snapshot: Dict):
+        """
+        Write a snapshot file
+
+        Args:
+            filename: Snapshot file path
+            snapshot: Snapshot dictionary
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+        log(f"💾 Données sauvegardées: {filename}")
+
+
+class QueuedSnapshotWriter(SnapshotWriter):
+    """
+    Snapshot writer handing its writes over to a writer thread
+
+    The snapshot dictionaries are queued as they are, so the payloads they
+    hold must not be modified once normalized.
+    """
+
+    def __init__(self, writes: queue.Queue, directory: str = 'data'):
+        """
+        Args:
+            writes: Queue receiving (filename, snapshot) tuples
+            directory: Directory holding the snapshots
+        """
+        super().__init__(directory)
+        self.writes = writes
+
+    def write(self, filename: str, snapshot: Dict):
+        self.writes.put((filename, snapshot))
+
+
+class _HashingWriter:
+    """Text file wrapper hashing everything written through it"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.digest = hashlib.sha256()
+
+    def write(self, text: str):
+        self.digest.update(text.encode('utf-8'))
+        self.stream.write(text)
+
+
+class StreamingSnapshot:
+    """
+    data/ snapshot of one week written while its payload is being parsed
+
+    Receives the parse events of the week payload (json_stream paths
+    relative to the week) and writes them to a temporary file, in compact
+    JSON. finish() completes it with lastUpdate and the hash of the data,
+    then replaces the previous snapshot unless its data is identical, in
+    which case the previous snapshot is only marked as validated now.
+    abort() drops it, leaving the previous snapshot to serve as stale data.
+    """
+
+    def __init__(self, writer: SnapshotWriter, result: Dict):
+        """
+        Args:
+            writer: Snapshot store the snapshot belongs to
+            result: Fetch result of the week (company, week, year)
+        """
+        self.writer = writer
+        self.result = result
+        self.filename = writer.filename(result)
+        self.temporary = f"{self.filename}.tmp"
+
+        company = result['company']
+        os.makedirs(writer.directory, exist_ok=True)
+        self._file = open(self.temporary, 'w', encoding='utf-8')
+        header = {'company': company['name'], 'companyId': company['id'],
+                  'week': result['week'], 'year': result['year']}
+        self._file.write(json.dumps(header, ensure_ascii=False)[:-1] + ',"data":')
+        self._data = _HashingWriter(self._file)
+        self._events = JsonEventWriter(self._data)
+
+    def start(self, path: Tuple, char: str):
+        """Open a container of the payload"""
+        self._events.start(path, char)
+
+    def value(self, path: Tuple, value: Any):
+        """Write a value of the payload"""
+        self._events.value(path, value)
+
+    def end(self):
+        """Close the innermost container of the payload"""
+        self._events.end()
+
+    def finish(self) -> Tuple[str, bool]:
+        """
+        Complete the snapshot and put it in place
+
+        Returns:
+            Tuple of (hash of the data, whether it is unchanged)
+        """
+        data_hash = self._data.digest.hexdigest()
+        self._file.write(f',"lastUpdate":{json.dumps(datetime.now().isoformat())},'
+                         f'"dataHash":"{data_hash}"}}')
+        self._file.close()
+
+        if self.writer.stored_hash(self.result) == data_hash:
+            os.remove(self.temporary)
+            self.writer.touch(self.result)
+            return data_hash, True
+
+        os.replace(self.temporary, self.filename)
+        log(f"💾 Données sauvegardées: {self.filename}")
+        return data_hash, False
+
+    def abort(self):
+        """Drop the partially written snapshot"""
+        self._file.close()
+        try:
+            os.remove(self.temporary)
+        except OSError:
+            pass
+
+
+def feed_sinks(departures: Iterable[Departure], result: Dict, sinks: List[DepartureSink]):
+    """
+    Push a departure stream through a list of sinks
+
+    Args:
+        departures: Departure stream of the result
+        result: Fetch result the stream comes from
+        sinks: Consumers of the stream
+    """
+    for sink in sinks:
+        sink.begin(result)
+    for departure in departures:
+        for sink in sinks:
+            sink.add(departure)
+    for sink in sinks:
+        sink.end(result)
+
+
+class OverlappedNormalizer:
+    """
+    Normalize fetch results as they arrive, while other fetches are running
+
+    Three stages connected by queues: fetch workers hand their results
+    over with submit(), a normalization thread runs process on each of
+    them in arrival order, and a writer thread writes the data/ snapshots
+    it produces. close() waits for both queues to drain, so the final
+    merge only gathers results that are already normalized and persisted.
+    """
+
+    def __init__(self, process: Callable[[Dict, SnapshotWriter], None], directory: str = 'data'):
+        """
+        Args:
+            process: Normalizes one result, saving its snapshot through the
+                given snapshot writer; only ever called from one thread
+            directory: Directory holding the snapshots
+        """
+        self.process = process
+        self.processed = 0
+        self._results: queue.Queue = queue.Queue()
+        self._writes: queue.Queue = queue.Queue()
+        self.snapshot_writer = QueuedSnapshotWriter(self._writes, directory)
+        self._disk = SnapshotWriter(directory)
+        self._errors: List[BaseException] = []
+        self._threads = [
+            threading.Thread(target=self._normalize, name='normalize', daemon=True),
+            threading.Thread(target=self._write, name='write snapshots', daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, results: List[Dict]):
+        """
+        Queue results for normalization, from any thread
+
+        Args:
+            results: Fetch results
+        """
+        for result in results:
+            self._results.put(result)
+
+    def _normalize(self):
+        """Normalization stage: process every queued result"""
+        while True:
+            result = self._results.get()
+            if result is None:
+                break
+            try:
+                self.process(result, self.snapshot_writer)
+                self.processed += 1
+            except Exception as e:
+                self._errors.append(e)
+        self._writes.put(None)
+
+    def _write(self):
+        """Writer stage: write every queued snapshot"""
+        while True:
+            item = self._writes.get()
+            if item is None:
+                break
+            try:
+                self._disk.write(*item)
+            except Exception as e:
+                self._errors.append(e)
+
+    def close(self):
+        """
+        Wait for every submitted result to be normalized and persisted
+
+        Raises:
+            Exception: The first error raised by a stage
+        """
+        self._results.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self._errors:
+            raise self._errors[0]
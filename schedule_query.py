@@ -0,0 +1,274 @@
+"""
+Moorea Life Schedule - Indexed queries over the unified schedule
+Answers "next departures" style questions with binary search instead of
+scanning horaires.json
+"""
+
+import heapq
+import json
+import os
+import threading
+from bisect import bisect_left
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from schedule_model import Departure, Port, get_ports, get_routes, route_id, to_epoch_minutes
+
+
+class ScheduleIndex:
+    """
+    Read-only index of departures
+
+    Departures are kept in per-route lists sorted by departure time, keyed
+    by route id, alongside parallel lists of departure minutes used for
+    bisection, plus a global timeline and a per-vessel index. Queries on a
+    route only read the list of that route.
+    """
+
+    def __init__(self, departures: List[Departure]):
+        """
+        Args:
+            departures: Departures to index, in any order
+        """
+        self.departures = sorted(departures, key=lambda d: d.minute)
+        self.minutes = [d.minute for d in self.departures]
+
+        self.routes: Dict[str, List[Departure]] = {}
+        self.route_ports: Dict[str, Tuple[Port, Port]] = {}
+        for departure in self.departures:
+            route = route_id(departure.origin, departure.destination)
+            route_departures = self.routes.get(route)
+            if route_departures is None:
+                route_departures = self.routes[route] = []
+                self.route_ports[route] = (departure.origin, departure.destination)
+            route_departures.append(departure)
+        self.route_minutes = {
+            route: [d.minute for d in route_departures]
+            for route, route_departures in self.routes.items()
+        }
+
+        self.vessels: Dict[str, List[Departure]] = {}
+        for departure in self.departures:
+            self.vessels.setdefault(departure.vessel.casefold(), []).append(departure)
+
+    @classmethod
+    def from_file(cls, filename: str = 'horaires.json') -> 'ScheduleIndex':
+        """
+        Build an index from a horaires.json file
+
+        Args:
+            filename: Unified schedule file
+
+        Returns:
+            Schedule index
+        """
+        with open(filename, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        departures = [Departure.from_record(record) for record in records]
+        return cls([d for d in departures if d is not None])
+
+    def next_departures(self, origin: Port, after: datetime, n: int = 5,
+                        destination: Optional[Port] = None) -> List[Departure]:
+        """
+        Get the next departures from a port
+
+        Args:
+            origin: Departure port
+            after: Earliest departure time (inclusive)
+            n: Maximum number of departures
+            destination: Arrival port, or None for any destination
+
+        Returns:
+            Up to n departures sorted by departure time
+        """
+        after_minute = to_epoch_minutes(after)
+        if destination is not None:
+            routes = [route_id(origin, destination)]
+        else:
+            routes = [route for route, (route_origin, _) in self.route_ports.items() if route_origin == origin]
+
+        streams = []
+        for route in routes:
+            if route not in self.routes:
+                continue
+            start = bisect_left(self.route_minutes[route], after_minute)
+            streams.append(self.routes[route][start:start + n])
+
+        if not streams:
+            return []
+        if len(streams) == 1:
+            return streams[0]
+        return list(heapq.merge(*streams, key=lambda d: d.minute))[:n]
+
+    def departures_on(self, day: date, route: Optional[str] = None) -> List[Departure]:
+        """
+        Get every departure of a day
+
+        Args:
+            day: Date
+            route: Route id, or None for every route
+
+        Returns:
+            Departures of that day sorted by departure time
+        """
+        start_minute = to_epoch_minutes(datetime(day.year, day.month, day.day))
+        if route is not None:
+            minutes = self.route_minutes.get(route, [])
+            start = bisect_left(minutes, start_minute)
+            end = bisect_left(minutes, start_minute + 1440)
+            return self.routes.get(route, [])[start:end]
+        start = bisect_left(self.minutes, start_minute)
+        end = bisect_left(self.minutes, start_minute + 1440)
+        return self.departures[start:end]
+
+    def by_vessel(self, name: str, after: Optional[datetime] = None) -> List[Departure]:
+        """
+        Get the departures of a vessel
+
+        Args:
+            name: Vessel name (case insensitive)
+            after: Earliest departure time, or None for all departures
+
+        Returns:
+            Departures of the vessel sorted by departure time
+        """
+        departures = self.vessels.get(name.casefold(), [])
+        if after is None:
+            return departures
+        start = bisect_left(departures, to_epoch_minutes(after), key=lambda d: d.minute)
+        return departures[start:]
+
+
+_index_cache: Dict[str, Tuple[int, ScheduleIndex]] = {}
+_index_cache_lock = threading.Lock()
+
+
+def load_schedule_index(filename: str = 'horaires.json') -> ScheduleIndex:
+    """
+    Get the index of a horaires.json file, rebuilt only when the file changes
+
+    Long-running callers can call this on every query: the index is kept
+    in memory until the file's modification time changes.
+
+    Args:
+        filename: Unified schedule file
+
+    Returns:
+        Schedule index
+    """
+    mtime = os.stat(filename).st_mtime_ns
+    with _index_cache_lock:
+        cached = _index_cache.get(filename)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    index = ScheduleIndex.from_file(filename)
+    with _index_cache_lock:
+        _index_cache[filename] = (mtime, index)
+    return index
+
+
+def parse_after(value: Optional[str], now: Optional[datetime] = None) -> datetime:
+    """
+    Parse a query start time
+
+    Args:
+        value: "HH:MM" (today), ISO date and time, or None for now
+        now: Current time, defaults to datetime.now()
+
+    Returns:
+        Start time
+    """
+    now = now or datetime.now()
+    if not value:
+        return now.replace(second=0, microsecond=0)
+    if len(value) <= 5 and ':' in value:
+        hours, minutes = map(int, value.split(':'))
+        return now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+    return datetime.fromisoformat(value)
+
+
+def format_departure(departure: Departure) -> str:
+    """
+    Format a departure for display
+
+    Args:
+        departure: Departure
+
+    Returns:
+        Line such as "2025-11-24 08:30  PPT → MOZ  Aremiti 5 (Aremiti Express)"
+    """
+    return (f"{departure.departure_time.strftime('%Y-%m-%d %H:%M')}  "
+            f"{departure.origin} → {departure.destination}  "
+            f"{departure.vessel} ({departure.company})")
+
+
+def run_query(args) -> int:
+    """
+    Run a query subcommand
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Process exit code
+    """
+    try:
+        index = load_schedule_index(args.file)
+    except FileNotFoundError:
+        print(f"❌ Fichier introuvable: {args.file}")
+        return 1
+
+    if args.query == 'next':
+        ports = list(dict.fromkeys(get_ports() + [port for route in index.route_ports.values() for port in route]))
+        origin = args.origin.upper()
+        destination = args.destination.upper() if args.destination else None
+        if origin not in ports or (destination is not None and destination not in ports):
+            print(f"❌ Port inconnu (ports connus: {', '.join(ports)})")
+            return 1
+        departures = index.next_departures(origin, parse_after(args.after), args.n, destination)
+    elif args.query == 'day':
+        routes = list(dict.fromkeys([route.id for route in get_routes()] + list(index.routes)))
+        if args.route and args.route not in routes:
+            print(f"❌ Ligne inconnue (lignes connues: {', '.join(routes)})")
+            return 1
+        day = date.fromisoformat(args.date) if args.date else date.today()
+        departures = index.departures_on(day, args.route)
+    else:
+        departures = index.by_vessel(args.name, parse_after(args.after) if args.after else None)
+
+    if args.json:
+        print(json.dumps([d.to_record() for d in departures], indent=2, ensure_ascii=False))
+    elif departures:
+        for departure in departures:
+            print(format_departure(departure))
+    else:
+        print("Aucun départ trouvé")
+    return 0
+
+
+def add_query_arguments(subparsers):
+    """
+    Register the query subcommand on an argparse subparsers object
+
+    Args:
+        subparsers: Result of ArgumentParser.add_subparsers()
+    """
+    parser = subparsers.add_parser('query', help="interroge horaires.json")
+    parser.add_argument('--file', default='horaires.json', help="fichier horaires unifié")
+    parser.add_argument('--json', action='store_true', help="sortie JSON au format horaires.json")
+    queries = parser.add_subparsers(dest='query', required=True)
+
+    next_parser = queries.add_parser('next', help="prochains départs depuis un port")
+    next_parser.add_argument('origin', help="port de départ (PPT, MOZ)")
+    next_parser.add_argument('--to', dest='destination', help="port d'arrivée")
+    next_parser.add_argument('--after', help="heure de début, HH:MM ou date ISO (défaut: maintenant)")
+    next_parser.add_argument('-n', type=int, default=5, help="nombre de départs (défaut: 5)")
+
+    day_parser = queries.add_parser('day', help="tous les départs d'une journée")
+    day_parser.add_argument('date', nargs='?', help="date AAAA-MM-JJ (défaut: aujourd'hui)")
+    day_parser.add_argument('--route', help="identifiant de la ligne, ex. PPT-MOZ (défaut: toutes)")
+
+    vessel_parser = queries.add_parser('vessel', help="départs d'un bateau")
+    vessel_parser.add_argument('name', help="nom du bateau")
+    vessel_parser.add_argument('--after', help="heure de début, HH:MM ou date ISO")
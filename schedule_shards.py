@@ -0,0 +1,174 @@
+"""
+Moorea Life Schedule - Sharded static outputs
+Splits the unified schedule into small per-day, per-direction files with
+content-hashed names, listed in a manifest, plus gzip copies of every
+published file
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from schedule_model import Departure, from_epoch_minutes, route_id
+
+
+DEFAULT_SHARDS_DIR = 'shards'
+MANIFEST_FILE = 'manifest.json'
+
+# Bumped whenever the layout of the manifest or of the shards changes
+SHARDS_FORMAT_VERSION = 1
+
+
+def precompress(filename: str) -> str:
+    """
+    Write a gzip copy of a file next to it
+
+    The copy is reproducible (no timestamp in the gzip header), so an
+    unchanged file always gives an identical .gz.
+
+    Args:
+        filename: File to compress
+
+    Returns:
+        Path of the .gz copy
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    gz_filename = f"{filename}.gz"
+    with open(gz_filename, 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    return gz_filename
+
+
+def hashed_name(stem: str, content: bytes) -> str:
+    """
+    Build a content-addressed file name
+
+    Args:
+        stem: Name without extension, e.g. "2025-11-24_PPT-MOZ"
+        content: File content
+
+    Returns:
+        Name such as "2025-11-24_PPT-MOZ.1a2b3c4d5e6f.json"
+    """
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}.json"
+
+
+def encode_records(departures: List[Departure]) -> bytes:
+    """
+    Encode departures as compact horaires.json records
+
+    Args:
+        departures: Departures
+
+    Returns:
+        UTF-8 JSON without whitespace
+    """
+    records = [d.to_record() for d in departures]
+    return json.dumps(records, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def manifest_files(manifest: Dict) -> List[str]:
+    """
+    List the shard files a manifest refers to
+
+    Args:
+        manifest: Manifest dictionary
+
+    Returns:
+        File names, without their .gz copies
+    """
+    files = [manifest['full']['file']] if 'full' in manifest else []
+    for directions in manifest.get('days', {}).values():
+        files.extend(entry['file'] for entry in directions.values())
+    return files
+
+
+def read_manifest(directory: str = DEFAULT_SHARDS_DIR) -> Optional[Dict]:
+    """
+    Read the manifest currently published in a directory
+
+    Args:
+        directory: Shards directory
+
+    Returns:
+        Manifest dictionary, or None if missing or unreadable
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_shards(departures: List[Departure], directory: str = DEFAULT_SHARDS_DIR,
+                 version: Optional[str] = None) -> Dict:
+    """
+    Write the sharded copy of a unified schedule and its manifest
+
+    Every shard holds the departures of one day on one route, keyed by
+    route id, under a name derived from its content: a shard that did not
+    change keeps its name and is not rewritten, so it can be cached
+    indefinitely. Only the manifest has a fixed name. Files referenced by the previous manifest
+    are kept for one more run, so that a client which loaded it just before
+    the update can still fetch its shards; older files are removed.
+
+    Args:
+        departures: Unified departures sorted by departure time
+        directory: Output directory
+        version: Version of the unified schedule, recorded in the manifest
+
+    Returns:
+        Manifest dictionary
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    shards: Dict[str, Dict[str, List[Departure]]] = {}
+    for departure in departures:
+        day = from_epoch_minutes(departure.minute).date().isoformat()
+        direction = route_id(departure.origin, departure.destination)
+        shards.setdefault(day, {}).setdefault(direction, []).append(departure)
+
+    kept = {MANIFEST_FILE, f"{MANIFEST_FILE}.gz"}
+    previous = read_manifest(directory)
+    if previous:
+        for name in manifest_files(previous):
+            kept.update((name, f"{name}.gz"))
+
+    def publish(stem: str, shard_departures: List[Departure]) -> Dict:
+        content = encode_records(shard_departures)
+        name = hashed_name(stem, content)
+        path = os.path.join(directory, name)
+        if not os.path.exists(path) or not os.path.exists(f"{path}.gz"):
+            with open(path, 'wb') as f:
+                f.write(content)
+            precompress(path)
+        kept.update((name, f"{name}.gz"))
+        return {'file': name, 'count': len(shard_departures), 'bytes': len(content)}
+
+    manifest = {
+        'format': SHARDS_FORMAT_VERSION,
+        'generatedAt': datetime.now().isoformat(),
+        'version': version,
+        'full': publish('horaires', departures),
+        'days': {
+            day: {direction: publish(f"{day}_{direction}", shard_departures)
+                  for direction, shard_departures in sorted(directions.items())}
+            for day, directions in sorted(shards.items())
+        }
+    }
+
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    precompress(manifest_path)
+
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name not in kept and os.path.isfile(path):
+            os.remove(path)
+
+    return manifest
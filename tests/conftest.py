@@ -0,0 +1,46 @@
+"""
+Shared fixtures: the modules live at the repository root, and the Firebase
+stand-in server in benchmarks/
+"""
+
+import os
+import socket
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+from firebase_http import configure_session_pool  # noqa: E402
+from firebase_standin import FirebaseStandin, generate_week_payload  # noqa: E402
+from http_cache import set_http_cache  # noqa: E402
+
+
+YEAR = 2025
+WEEK = 47
+
+
+@pytest.fixture
+def standin():
+    """Stand-in server serving one synthetic week, stopped after the test"""
+    server = FirebaseStandin({YEAR: {WEEK: generate_week_payload(0, YEAR, WEEK, 3)}}, stall=2.0)
+    with server:
+        yield server
+
+
+@pytest.fixture
+def dead_url():
+    """URL of a local port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+def isolated_fetch(tmp_path, monkeypatch):
+    """Run fetches from an empty directory, without cache, on a fresh session pool"""
+    monkeypatch.chdir(tmp_path)
+    set_http_cache(None)
+    configure_session_pool()
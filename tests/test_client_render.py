@@ -0,0 +1,81 @@
+"""
+Compact columnar payload and page shell of the client-side rendering
+"""
+
+import json
+from datetime import datetime
+
+from client_render import COMPACT_FORMAT_VERSION, build_compact_payload, render_client_shell, write_compact_payload
+from schedule_model import Departure, to_epoch_minutes
+
+NOW = datetime(2025, 11, 29, 18, 30)
+
+
+def make_departure(day: int, hour: int, origin: str = 'PPT', destination: str = 'MOZ',
+                   vessel: str = 'Aremiti 5', stale: bool = False) -> Departure:
+    return Departure(to_epoch_minutes(datetime(2025, 11, day, hour, 15)), origin, destination,
+                     vessel, 'Aremiti', stale=stale)
+
+
+DEPARTURES = [
+    make_departure(29, 6, origin='MOZ', destination='PPT', vessel='Terevau'),
+    make_departure(29, 23),
+    make_departure(30, 7, destination='TAH', stale=True),
+    make_departure(30, 9, vessel='Terevau')
+]
+
+
+def decode(payload: dict) -> list:
+    """Read the columns back the way the page script does"""
+    stale = set(payload['stale'])
+    return [
+        (payload['baseDay'] * 1440 + minute, payload['routes'][route], payload['vessels'][vessel], index in stale)
+        for index, (minute, vessel, route) in enumerate(zip(payload['minute'], payload['vessel'], payload['route']))
+    ]
+
+
+def test_payload_decodes_to_the_departures():
+    payload = build_compact_payload(DEPARTURES, NOW)
+
+    assert payload['format'] == COMPACT_FORMAT_VERSION
+    assert payload['generatedAt'] == '2025-11-29T18:30:00'
+    assert decode(payload) == [
+        (d.minute, f"{d.origin}-{d.destination}", d.vessel, d.stale) for d in DEPARTURES
+    ]
+    # Times are counted from midnight of the first day
+    assert payload['baseDay'] == to_epoch_minutes(datetime(2025, 11, 29)) // 1440
+    assert payload['minute'][:2] == [6 * 60 + 15, 23 * 60 + 15]
+    assert payload['vessels'] == ['Terevau', 'Aremiti 5']
+
+
+def test_configured_routes_come_first_and_are_labelled():
+    payload = build_compact_payload(DEPARTURES, NOW)
+
+    # Configured routes are listed even before any of their departures
+    assert payload['routes'] == ['PPT-MOZ', 'MOZ-PPT', 'PPT-TAH']
+    assert payload['labels'] == ['Papeete → Moorea', 'Moorea → Papeete']
+
+
+def test_empty_payload():
+    payload = build_compact_payload([], NOW)
+
+    assert payload['baseDay'] == 0
+    assert payload['minute'] == payload['vessel'] == payload['route'] == payload['stale'] == []
+
+
+def test_payload_file_is_compact(tmp_path):
+    filename = tmp_path / 'horaires.compact.json'
+
+    write_compact_payload(DEPARTURES, NOW, str(filename))
+
+    text = filename.read_text(encoding='utf-8')
+    assert json.loads(text) == build_compact_payload(DEPARTURES, NOW)
+    assert ' ' not in text.replace('Aremiti 5', '').replace(' → ', '')
+
+
+def test_shell_escapes_labels_and_loads_the_payload():
+    html = render_client_shell('Semaines 47 & 48', 'les <2> prochaines semaines', 'data/horaires.compact.json')
+
+    assert 'Semaines 47 &amp; 48' in html
+    assert 'les &lt;2&gt; prochaines semaines' in html
+    assert "fetch('data/horaires.compact.json')" in html
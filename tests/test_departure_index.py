@@ -0,0 +1,77 @@
+"""
+Binary departure index: round trip and string table limits
+"""
+
+import os
+from datetime import date, datetime
+
+import pytest
+
+import departure_index
+from departure_index import DepartureIndex, write_departure_index
+from schedule_model import Departure, Port, to_epoch_minutes
+
+
+def make_departure(hour: int, vessel: str = 'Aremiti 5', origin: Port = 'PPT',
+                   destination: Port = 'MOZ') -> Departure:
+    minute = to_epoch_minutes(datetime(2025, 11, 24, hour))
+    return Departure(minute, origin, destination, vessel, 'Aremiti', 3, False)
+
+
+def test_index_round_trip(tmp_path):
+    filename = str(tmp_path / 'horaires.idx')
+    departures = [make_departure(9, 'Tūrai'), make_departure(7), make_departure(8, origin='MOZ',
+                                                                                 destination='PPT')]
+    write_departure_index(departures, filename)
+
+    with DepartureIndex(filename) as index:
+        next_departures = index.next_departures('PPT', datetime(2025, 11, 24, 6), n=5)
+        assert [(d.departure_time.hour, d.vessel, d.status) for d in next_departures] == [
+            (7, 'Aremiti 5', 3), (9, 'Tūrai', 3)
+        ]
+        assert len(index.departures_on(date(2025, 11, 24))) == 3
+
+
+def test_too_many_strings_is_a_clear_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(departure_index, 'MAX_RECORD_STRINGS', 8)
+    filename = str(tmp_path / 'horaires.idx')
+    departures = [make_departure(hour, f"Bateau {hour}") for hour in range(10)]
+
+    with pytest.raises(ValueError, match="noms distincts"):
+        write_departure_index(departures, filename)
+    assert not os.path.exists(filename)
+    assert not os.path.exists(f"{filename}.tmp")
+
+
+def test_empty_file_is_a_clear_error(tmp_path):
+    filename = tmp_path / 'horaires.idx'
+    filename.write_bytes(b'')
+
+    with pytest.raises(ValueError, match="n'est pas un index"):
+        DepartureIndex(str(filename))
+
+
+def test_other_file_is_a_clear_error(tmp_path):
+    filename = tmp_path / 'horaires.idx'
+    filename.write_bytes(b'[{"bateau": "Aremiti 5", "compagnie": "Aremiti"}]')
+
+    with pytest.raises(ValueError, match="n'est pas un index"):
+        DepartureIndex(str(filename))
+
+
+@pytest.mark.parametrize('cut', [departure_index.HEADER.size, 60, -1])
+def test_truncated_file_is_a_clear_error(tmp_path, cut):
+    filename = tmp_path / 'horaires.idx'
+    write_departure_index([make_departure(7), make_departure(9)], str(filename))
+    filename.write_bytes(filename.read_bytes()[:cut])
+
+    with pytest.raises(ValueError, match="tronqué"):
+        DepartureIndex(str(filename))
+
+
+def test_cli_reports_an_invalid_index(tmp_path, capsys):
+    filename = tmp_path / 'horaires.idx'
+    filename.write_bytes(b'')
+
+    assert departure_index.main(['--file', str(filename), 'day', '2025-11-24']) == 1
+    assert "❌" in capsys.readouterr().out
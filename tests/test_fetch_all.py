@@ -0,0 +1,60 @@
+"""
+Concurrent fetch of every (company, week) pair
+"""
+
+import pytest
+
+from conftest import YEAR
+from fetch_schedules import fetch_all_results
+from firebase_http import configure_session_pool
+from firebase_standin import FirebaseStandin, generate_week_payload
+
+WEEKS = [(10, YEAR), (11, YEAR)]
+
+
+@pytest.fixture
+def servers():
+    # The first company answers last, the last one first
+    calendar = {YEAR: {week: generate_week_payload(0, YEAR, week, 2) for week, _ in WEEKS}}
+    with FirebaseStandin(calendar, latency=0.4) as slow, FirebaseStandin(calendar, latency=0.2) as medium, \
+            FirebaseStandin(calendar) as fast:
+        yield slow, medium, fast
+
+
+def make_companies(servers):
+    return [
+        {'id': f"c{index}", 'name': f"Comp{index}", 'firebase': {'databaseURL': server.url}}
+        for index, server in enumerate(servers)
+    ]
+
+
+@pytest.mark.usefixtures('isolated_fetch')
+def test_results_follow_company_then_week_order(servers):
+    completed = []
+
+    results = fetch_all_results(make_companies(servers), WEEKS,
+                                on_results=lambda job: completed.append(job[0]['company']['id']))
+
+    assert completed == ['c2', 'c1', 'c0']
+    assert [(r['company']['id'], r['week'], r['year']) for r in results] == [
+        ('c0', 10, YEAR), ('c0', 11, YEAR),
+        ('c1', 10, YEAR), ('c1', 11, YEAR),
+        ('c2', 10, YEAR), ('c2', 11, YEAR)
+    ]
+    assert all(r['success'] for r in results)
+
+
+@pytest.mark.usefixtures('isolated_fetch')
+def test_failing_company_does_not_fail_the_others(servers):
+    configure_session_pool(retries=1, backoff_base=0.01, backoff_max=0.01)
+    servers[1].inject('error', 'error')
+
+    results = fetch_all_results(make_companies(servers), WEEKS)
+
+    assert [(r['company']['id'], r['week'], r['success']) for r in results] == [
+        ('c0', 10, True), ('c0', 11, True),
+        ('c1', 10, False), ('c1', 11, False),
+        ('c2', 10, True), ('c2', 11, True)
+    ]
+    assert all(r['error'] for r in results if not r['success'])
+    assert servers[1].request_count == 2
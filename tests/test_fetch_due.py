@@ -0,0 +1,60 @@
+"""
+Daemon mode fetches: every due (company, week) in one concurrent batch
+"""
+
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from conftest import YEAR
+from fetch_schedules import consecutive_runs, fetch_due_results
+from firebase_standin import FirebaseStandin, generate_week_payload
+
+
+@pytest.fixture
+def servers():
+    calendar = {YEAR: {week: generate_week_payload(0, YEAR, week, 2) for week in (10, 11, 12)}}
+    with FirebaseStandin(calendar, latency=0.5) as first, FirebaseStandin(calendar, latency=0.5) as second:
+        yield first, second
+
+
+@pytest.mark.usefixtures('isolated_fetch')
+def test_due_weeks_are_fetched_in_one_batch(servers):
+    companies = [
+        {'id': f"c{index}", 'name': f"Comp{index}", 'firebase': {'databaseURL': server.url}}
+        for index, server in enumerate(servers)
+    ]
+    due = [('c1', 12, YEAR), ('c0', 10, YEAR), ('c0', 11, YEAR)]
+
+    start = time.perf_counter()
+    results = fetch_due_results(companies, due, max_per_host=2)
+    elapsed = time.perf_counter() - start
+
+    assert [(r['company']['id'], r['week'], r['year']) for r in results] == [
+        ('c0', 10, YEAR), ('c0', 11, YEAR), ('c1', 12, YEAR)
+    ]
+    assert all(r['success'] for r in results)
+    # One range request per company, both in flight at the same time
+    assert [server.request_count for server in servers] == [1, 1]
+    assert elapsed < 0.9
+
+
+def test_consecutive_runs():
+    assert consecutive_runs([12, 10, 11, 14, 20, 21]) == [[10, 11, 12], [14], [20, 21]]
+    assert consecutive_runs([]) == []
+
+
+@pytest.mark.usefixtures('isolated_fetch')
+def test_weeks_that_are_not_due_are_not_downloaded(servers):
+    server = servers[0]
+    companies = [{'id': 'c0', 'name': 'Comp0', 'firebase': {'databaseURL': server.url}}]
+
+    results = fetch_due_results(companies, [('c0', 10, YEAR), ('c0', 12, YEAR)], max_per_host=2)
+
+    assert [(r['week'], r['success']) for r in results] == [(10, True), (12, True)]
+    ranges = sorted(
+        (query['startAt'][0], query['endAt'][0])
+        for query in (parse_qs(urlparse(path).query) for path in server.request_paths)
+    )
+    assert ranges == [('"10"', '"10"'), ('"12"', '"12"')]
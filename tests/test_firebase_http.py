@@ -0,0 +1,202 @@
+"""
+Connection reuse, retries, circuit breaker and hedging of the session
+pool, against the fault-injecting Firebase stand-in
+"""
+
+import time
+
+import pytest
+import requests
+
+from conftest import WEEK, YEAR
+from firebase_http import SessionPool, get_firebase_json
+from firebase_standin import FirebaseStandin
+from http_resilience import CircuitOpenError
+
+
+def week_url(server) -> str:
+    return f"{server.url}/Calendar/{YEAR}/{WEEK}.json"
+
+
+def make_pool(**kwargs) -> SessionPool:
+    kwargs.setdefault('backoff_base', 0.01)
+    kwargs.setdefault('backoff_max', 0.01)
+    return SessionPool(**kwargs)
+
+
+def test_transient_error_is_retried(standin):
+    standin.inject('error', 'drop')
+    pool = make_pool(retries=2)
+    stats = {}
+
+    data, unchanged = get_firebase_json(standin.url, f"Calendar/{YEAR}/{WEEK}", session_pool=pool, stats=stats)
+
+    assert set(data) == {'MOZ', 'PPT'}
+    assert not unchanged
+    assert stats['attempts'] == 3
+    assert standin.request_count == 3
+    pool.close()
+
+
+def test_retries_are_bounded(standin):
+    standin.inject('error', 'error', 'error', 'error', 'error')
+    pool = make_pool(retries=2, breaker_threshold=10)
+    stats = {}
+
+    response = pool.get(week_url(standin), stats=stats)
+
+    assert response.status_code == 503
+    assert stats['attempts'] == 3
+    assert standin.request_count == 3
+    pool.close()
+
+
+def test_streamed_retry_releases_connections(standin):
+    standin.inject('error', 'error')
+    pool = make_pool(retries=2, pool_maxsize=1)
+
+    response = pool.get(week_url(standin), stream=True)
+    response.close()
+
+    # Failed attempts gave their connection back instead of opening new ones
+    assert pool.stats()[standin.url.split('//')[1]]['connections'] == 1
+    pool.close()
+
+
+def test_breaker_fails_fast_for_dead_host(dead_url):
+    pool = make_pool(retries=0, breaker_threshold=2, breaker_reset=60, connect_timeout=1)
+
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            pool.get(f"{dead_url}/Calendar.json")
+    assert pool.breakers()[dead_url.split('//')[1]]['state'] == 'open'
+
+    start = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+        pool.get(f"{dead_url}/Calendar.json")
+    assert time.perf_counter() - start < 0.1
+    pool.close()
+
+
+def test_breaker_closes_after_successful_trial(standin):
+    standin.inject('error', 'error')
+    pool = make_pool(retries=0, breaker_threshold=2, breaker_reset=0.2)
+
+    for _ in range(2):
+        assert pool.get(week_url(standin)).status_code == 503
+    with pytest.raises(CircuitOpenError):
+        pool.get(week_url(standin))
+
+    time.sleep(0.25)
+    assert pool.get(week_url(standin)).status_code == 200
+    assert pool.breakers()[standin.url.split('//')[1]]['state'] == 'closed'
+    pool.close()
+
+
+def test_unexpected_error_ends_breaker_trial(standin, monkeypatch):
+    standin.inject('error', 'error')
+    pool = make_pool(retries=0, breaker_threshold=2, breaker_reset=0.1)
+    for _ in range(2):
+        assert pool.get(week_url(standin)).status_code == 503
+    time.sleep(0.15)
+
+    def broken_get(*args, **kwargs):
+        raise ValueError("boom")
+
+    session = pool.session_for(week_url(standin))
+    monkeypatch.setattr(session, 'get', broken_get)
+    with pytest.raises(ValueError):
+        pool.get(week_url(standin))
+    monkeypatch.undo()
+
+    # The failed trial reopened the circuit instead of blocking it for good
+    time.sleep(0.15)
+    assert pool.get(week_url(standin)).status_code == 200
+    assert pool.breakers()[standin.url.split('//')[1]]['state'] == 'closed'
+    pool.close()
+
+
+def test_hedge_loser_response_is_closed(standin, monkeypatch):
+    pool = make_pool(retries=0, hedge_percentile=90, hedge_min_samples=4)
+    for _ in range(4):
+        assert pool.get(week_url(standin)).status_code == 200
+
+    responses = []
+    closed = []
+    timed_get = pool._timed_get
+
+    def recording_get(*args):
+        response = timed_get(*args)
+        response.close = lambda: closed.append(response)
+        responses.append(response)
+        return response
+
+    monkeypatch.setattr(pool, '_timed_get', recording_get)
+    standin.stall = 0.3
+    standin.inject('stall')
+    winner = pool.get(week_url(standin))
+
+    time.sleep(0.5)
+    assert len(responses) == 2
+    loser = next(response for response in responses if response is not winner)
+    assert closed == [loser]
+    pool.close()
+
+
+def test_slow_request_is_hedged(standin):
+    pool = make_pool(retries=0, hedge_percentile=90, hedge_min_samples=4)
+    for _ in range(4):
+        assert pool.get(week_url(standin)).status_code == 200
+
+    standin.inject('stall')
+    stats = {}
+    start = time.perf_counter()
+    response = pool.get(week_url(standin), stats=stats)
+
+    assert response.status_code == 200
+    assert stats['hedged'] == 1
+    # The hedged copy answered long before the stalled request
+    assert time.perf_counter() - start < standin.stall / 2
+    pool.close()
+
+
+def test_streamed_request_is_not_hedged(standin):
+    pool = make_pool(retries=0, hedge_percentile=90, hedge_min_samples=4)
+    for _ in range(4):
+        pool.get(week_url(standin))
+
+    standin.stall = 0.3
+    standin.inject('stall')
+    stats = {}
+    response = pool.get(week_url(standin), stats=stats, stream=True)
+    response.close()
+
+    assert stats['hedged'] == 0
+    pool.close()
+
+
+def test_sequential_requests_reuse_one_connection(standin):
+    pool = make_pool()
+
+    for _ in range(5):
+        pool.get(week_url(standin)).close()
+
+    host = standin.url.split('://', 1)[1]
+    assert pool.session_for(week_url(standin)) is pool.session_for(f"{standin.url}/Calendar.json")
+    assert pool.stats() == {host: {'requests': 5, 'connections': 1, 'reused': 4}}
+    pool.close()
+
+
+def test_each_host_has_its_own_session(standin):
+    calendar = {YEAR: {WEEK: {}}}
+    with FirebaseStandin(calendar) as other:
+        pool = make_pool()
+        pool.get(week_url(standin)).close()
+        for _ in range(2):
+            pool.get(week_url(other)).close()
+
+        assert pool.session_for(standin.url) is not pool.session_for(other.url)
+        assert {host: stats['requests'] for host, stats in pool.stats().items()} == {
+            standin.url.split('://', 1)[1]: 1, other.url.split('://', 1)[1]: 2
+        }
+        pool.close()
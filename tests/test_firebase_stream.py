@@ -0,0 +1,114 @@
+"""
+Firebase REST streaming: events applied to the live copy, reconnection
+and debounced rebuilds, against the SSE stand-in
+"""
+
+import threading
+import time
+
+from conftest import WEEK, YEAR
+from fetch_schedules import collect_stream_results, wait_for_quiet
+from firebase_stream import FirebaseStream, apply_stream_event
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def open_stream(server, **kwargs) -> FirebaseStream:
+    stream = FirebaseStream(server.url, f"Calendar/{YEAR}/{WEEK}", backoff_base=0.05, **kwargs).start()
+    wait_until(lambda: stream.version >= 1)
+    return stream
+
+
+def test_apply_stream_event_keeps_day_lists():
+    value = {'MOZ': [{'a': {'status': 3}}, {}]}
+
+    value = apply_stream_event(value, 'patch', '/MOZ/0/a', {'status': 0, 'timeEnd': 60})
+    value = apply_stream_event(value, 'put', '/MOZ/1/b', {'status': 3})
+
+    assert value == {'MOZ': [{'a': {'status': 0, 'timeEnd': 60}}, {'b': {'status': 3}}]}
+    assert apply_stream_event(value, 'put', '/MOZ/0/a', None)['MOZ'][0] == {}
+
+
+def test_put_and_patch_update_the_live_copy(standin):
+    stream = open_stream(standin)
+    try:
+        data, _ = stream.snapshot()
+        key, schedule = next(iter(data['MOZ'][0].items()))
+
+        standin.push(YEAR, WEEK, f"/MOZ/0/{key}", {'status': 0, 'timeBegin': 7200}, event='patch')
+        standin.push(YEAR, WEEK, '/MOZ/0/-Nnew', dict(schedule, vessel='Tūrai Île'))
+        wait_until(lambda: stream.version >= 3)
+
+        data, _ = stream.snapshot()
+        assert data['MOZ'][0][key] == dict(schedule, status=0, timeBegin=7200)
+        # UTF-8 names come through intact
+        assert data['MOZ'][0]['-Nnew']['vessel'] == 'Tūrai Île'
+        assert data == standin.calendar[YEAR][WEEK]
+    finally:
+        stream.stop()
+
+
+def test_stream_reconnects_after_close(standin):
+    stream = open_stream(standin)
+    try:
+        standin.close_streams()
+        wait_until(lambda: stream.connections >= 2)
+
+        standin.push(YEAR, WEEK, '/PPT/2/-Nlate', {'day': 2, 'timeBegin': 3600, 'origin': 'MOZ',
+                                                   'destination': 'PPT', 'vessel': 'Terevau'})
+        wait_until(lambda: '-Nlate' in stream.snapshot()[0]['PPT'][2])
+        assert stream.error is None
+    finally:
+        stream.stop()
+
+
+def test_changes_are_rebuilt_once_after_debounce(standin):
+    changed = threading.Event()
+    company = {'id': 'c0', 'name': 'Comp0', 'firebase': {'databaseURL': standin.url}}
+    stream = open_stream(standin, on_change=lambda _: changed.set())
+    streams = {('c0', WEEK, YEAR): stream}
+    fingerprints = {}
+    try:
+        first = collect_stream_results([company], [(WEEK, YEAR)], streams, fingerprints)[0]
+        assert first['success'] and not first['unchanged']
+        changed.clear()
+
+        # A burst of events ends up in a single rebuild, once the stream is quiet
+        for status in (0, 1, 2):
+            standin.push(YEAR, WEEK, '/MOZ/0/-Nburst', {'day': 0, 'timeBegin': 3600, 'origin': 'PPT',
+                                                        'destination': 'MOZ', 'status': status})
+            time.sleep(0.05)
+        assert changed.wait(2)
+        start = time.monotonic()
+        wait_for_quiet(changed, debounce=0.3, max_delay=5)
+        assert time.monotonic() - start >= 0.3
+
+        result = collect_stream_results([company], [(WEEK, YEAR)], streams, fingerprints)[0]
+        assert not result['unchanged']
+        assert result['data']['MOZ'][0]['-Nburst']['status'] == 2
+        assert collect_stream_results([company], [(WEEK, YEAR)], streams, fingerprints)[0]['unchanged']
+    finally:
+        stream.stop()
+
+
+def test_debounce_gives_up_after_max_delay():
+    changed = threading.Event()
+    stop = threading.Event()
+
+    def keep_changing():
+        while not stop.wait(0.02):
+            changed.set()
+
+    thread = threading.Thread(target=keep_changing, daemon=True)
+    thread.start()
+    try:
+        start = time.monotonic()
+        wait_for_quiet(changed, debounce=0.1, max_delay=0.5)
+        assert 0.45 <= time.monotonic() - start < 1.0
+    finally:
+        stop.set()
@@ -0,0 +1,54 @@
+"""
+Horizon weeks across ISO year boundaries, and one range request per ISO
+year of the horizon
+"""
+
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from fetch_schedules import fetch_all_results, get_horizon_weeks
+from firebase_standin import FirebaseStandin, generate_week_payload
+
+
+def requested_range(target: str):
+    url = urlparse(target)
+    query = parse_qs(url.query)
+    return url.path, query['startAt'][0], query['endAt'][0]
+
+
+def test_52_week_year_rolls_over_to_week_1():
+    # 2025 has 52 ISO weeks; 29 December 2025 is in week 1 of 2026
+    assert get_horizon_weeks(datetime(2025, 12, 24), 3) == [(52, 2025), (1, 2026), (2, 2026)]
+
+
+def test_53_week_year_keeps_week_53():
+    # 2026 has 53 ISO weeks: 28 December 2026 to 3 January 2027
+    assert get_horizon_weeks(datetime(2026, 12, 21), 3) == [(52, 2026), (53, 2026), (1, 2027)]
+    assert get_horizon_weeks(datetime(2027, 1, 2), 2) == [(53, 2026), (1, 2027)]
+
+
+def test_start_on_any_day_of_the_week():
+    for day in range(21, 28):
+        assert get_horizon_weeks(datetime(2026, 12, day), 1) == [(52, 2026)]
+
+
+@pytest.mark.usefixtures('isolated_fetch')
+def test_horizon_across_years_sends_one_range_per_year():
+    calendar = {
+        2026: {week: generate_week_payload(0, 2026, week, 2) for week in (52, 53)},
+        2027: {1: generate_week_payload(0, 2027, 1, 2)}
+    }
+    weeks = get_horizon_weeks(datetime(2026, 12, 21), 3)
+    with FirebaseStandin(calendar) as server:
+        company = {'id': 'c0', 'name': 'Comp0', 'firebase': {'databaseURL': server.url}}
+        results = fetch_all_results([company], weeks)
+
+        assert [(r['week'], r['year'], r['success']) for r in results] == [
+            (52, 2026, True), (53, 2026, True), (1, 2027, True)
+        ]
+        assert [r['data'] for r in results] == [calendar[2026][52], calendar[2026][53], calendar[2027][1]]
+        assert sorted(map(requested_range, server.request_paths)) == [
+            ('/Calendar/2026.json', '"52"', '"53"'), ('/Calendar/2027.json', '"1"', '"1"')
+        ]
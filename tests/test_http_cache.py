@@ -0,0 +1,58 @@
+"""
+Payload cache: fresh entries served without a request, and revalidation
+of plain paths and week ranges
+"""
+
+from conftest import WEEK, YEAR
+from firebase_http import SessionPool, get_firebase_json
+from http_cache import HttpCache
+
+
+RANGE_PARAMS = {'orderBy': '"$key"', 'startAt': f'"{WEEK}"', 'endAt': f'"{WEEK}"'}
+
+
+def test_fresh_entry_avoids_the_download(standin, tmp_path):
+    cache = HttpCache(str(tmp_path), max_age=60)
+    pool = SessionPool()
+    first_stats, second_stats = {}, {}
+
+    first, unchanged = get_firebase_json(standin.url, f"Calendar/{YEAR}", RANGE_PARAMS, cache=cache,
+                                         session_pool=pool, stats=first_stats)
+    assert not unchanged and first_stats['cache'] == 'miss'
+
+    second, unchanged = get_firebase_json(standin.url, f"Calendar/{YEAR}", RANGE_PARAMS, cache=cache,
+                                          session_pool=pool, stats=second_stats)
+    assert unchanged and second == first
+    assert second_stats['cache'] == 'fresh' and second_stats['bytes'] == 0
+    assert standin.request_count == 1
+    pool.close()
+
+
+def test_range_query_is_downloaded_then_compared(standin, tmp_path):
+    cache = HttpCache(str(tmp_path))
+    pool = SessionPool()
+    get_firebase_json(standin.url, f"Calendar/{YEAR}", RANGE_PARAMS, cache=cache, session_pool=pool)
+    stats = {}
+
+    _, unchanged = get_firebase_json(standin.url, f"Calendar/{YEAR}", RANGE_PARAMS, cache=cache,
+                                     session_pool=pool, stats=stats)
+
+    # No ETag for queries: the body comes again, and matches the cached hash
+    assert unchanged and stats['cache'] == 'hit'
+    assert stats['status'] == 200 and stats['bytes'] > 0
+    assert standin.request_count == 2
+    pool.close()
+
+
+def test_plain_path_is_revalidated_without_body(standin, tmp_path):
+    cache = HttpCache(str(tmp_path))
+    pool = SessionPool()
+    get_firebase_json(standin.url, f"Calendar/{YEAR}/{WEEK}", cache=cache, session_pool=pool)
+    stats = {}
+
+    data, unchanged = get_firebase_json(standin.url, f"Calendar/{YEAR}/{WEEK}", cache=cache,
+                                        session_pool=pool, stats=stats)
+
+    assert unchanged and data == standin.calendar[YEAR][WEEK]
+    assert stats['status'] == 304 and stats['bytes'] == 0
+    pool.close()
@@ -0,0 +1,60 @@
+"""
+Circuit breaker states and the daemon worker pool
+"""
+
+import threading
+import time
+
+from http_resilience import CircuitBreaker, DaemonExecutor
+
+
+def test_breaker_opens_and_lets_one_trial_through():
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    # A single trial at a time while half-open
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_idle_workers_are_reused():
+    executor = DaemonExecutor(8, 'test')
+    try:
+        for value in range(20):
+            assert executor.submit(lambda v: v * 2, value).result(timeout=1) == value * 2
+            # Let the worker report itself idle before the next submit
+            time.sleep(0.005)
+        assert len(executor._threads) == 1
+    finally:
+        executor.shutdown()
+
+
+def test_busy_workers_grow_up_to_the_limit():
+    executor = DaemonExecutor(3, 'test')
+    release = threading.Event()
+    try:
+        futures = [executor.submit(release.wait, 5) for _ in range(5)]
+        assert len(executor._threads) == 3
+        release.set()
+        assert all(future.result(timeout=1) for future in futures)
+    finally:
+        executor.shutdown()
+
+
+def test_shutdown_cancels_queued_calls():
+    executor = DaemonExecutor(1, 'test')
+    release = threading.Event()
+    running = executor.submit(release.wait, 5)
+    queued = executor.submit(lambda: None)
+
+    executor.shutdown(cancel_futures=True)
+    release.set()
+
+    assert running.result(timeout=1)
+    assert queued.cancelled()
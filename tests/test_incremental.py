@@ -0,0 +1,83 @@
+"""
+Incremental runs: nothing is rewritten when no input changed, and only
+the changed input is normalized again
+"""
+
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from fetch_schedules import fetch_all_schedules, get_horizon_weeks
+from firebase_standin import FirebaseStandin, generate_week_payload
+
+
+OUTPUTS = ('horaires.json', 'index.html')
+
+
+@pytest.fixture
+def server(isolated_fetch):
+    horizon = get_horizon_weeks(datetime.now(), 2)
+    calendar = {}
+    for week, year in horizon:
+        calendar.setdefault(year, {})[week] = generate_week_payload(0, year, week, 3)
+    with FirebaseStandin(calendar) as server:
+        with open('companies.json', 'w', encoding='utf-8') as f:
+            json.dump({'companies': [
+                {'id': 'ferry', 'name': 'Ferry', 'firebase': {'databaseURL': server.url}}
+            ]}, f)
+        yield server, horizon
+
+
+def mtimes(*filenames):
+    return {filename: os.stat(filename).st_mtime_ns for filename in filenames}
+
+
+def contents(*filenames):
+    # Snapshots are touched when revalidated, so compare what they hold
+    contents = {}
+    for filename in filenames:
+        with open(filename, 'rb') as f:
+            contents[filename] = f.read()
+    return contents
+
+
+def run():
+    assert fetch_all_schedules(incremental=True, weeks=2) == 0
+    with open('run_report.json', encoding='utf-8') as f:
+        report = json.load(f)
+    return {(w['week'], w['year']): w['reused'] for w in report['weeks']}
+
+
+def test_unchanged_run_rewrites_nothing(server):
+    _, horizon = server
+    snapshots = [f"data/ferry_week{week}.json" for week, _ in horizon]
+    assert not any(run().values())
+    outputs, before = mtimes(*OUTPUTS), contents(*snapshots)
+
+    reused = run()
+
+    assert all(reused.values()) and len(reused) == 2
+    assert mtimes(*OUTPUTS) == outputs
+    assert contents(*snapshots) == before
+
+
+def test_changed_week_is_the_only_one_rebuilt(server):
+    server, horizon = server
+    (first_week, first_year), (second_week, second_year) = horizon
+    run()
+    changed, untouched = f"data/ferry_week{first_week}.json", f"data/ferry_week{second_week}.json"
+    before = contents(changed, untouched)
+    output = mtimes('horaires.json')
+
+    day = next(day for day in server.calendar[first_year][first_week]['MOZ'] if day)
+    schedule = next(iter(day.values()))
+    schedule['status'] = 0 if schedule.get('status') != 0 else 3
+    reused = run()
+
+    assert reused == {(first_week, first_year): False, (second_week, second_year): True}
+    after = contents(changed, untouched)
+    assert after[untouched] == before[untouched]
+    assert after[changed] != before[changed]
+    assert mtimes('horaires.json') != output
@@ -0,0 +1,102 @@
+"""
+Incremental JSON parsing: documents cut at every possible chunk boundary
+give the same events as json.loads, and malformed input is rejected
+"""
+
+import io
+import json
+
+import pytest
+
+from json_stream import JsonEventWriter, iter_json_events
+
+
+DOCUMENT = (
+    '{"MOZ": [{"-Na": {"vessel": "Aremiti 5 \\"Tūrai\\"", "timeBegin": 25200, "status": 3,'
+    ' "ratio": -1.5e-3, "note": "\\ud83d\\udea2 \\u00e9\\n\\t\\\\/", "late": true,'
+    ' "cancelled": false, "comment": null}}, {}, [1, [2, [3, []]]]],'
+    ' "PPT": {"nested": {"deeper": {"deepest": [12345678901234567890, 0.25, 1E+2]}}}, "é": "ü"}'
+)
+
+
+def chunked(text: str, size: int):
+    data = text.encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def rebuild(chunks, depth: int):
+    """Serialize the events back with JsonEventWriter and decode the result"""
+    output = io.StringIO()
+    writer = JsonEventWriter(output)
+    for kind, path, value in iter_json_events(chunks, depth):
+        if kind == 'start':
+            writer.start(path, value)
+        elif kind == 'value':
+            writer.value(path, value)
+        else:
+            writer.end()
+    return json.loads(output.getvalue())
+
+
+@pytest.mark.parametrize('depth', [0, 1, 2, 3, 10])
+def test_every_chunk_size_gives_the_document(depth):
+    expected = json.loads(DOCUMENT)
+    for size in range(1, len(DOCUMENT.encode('utf-8')) + 1):
+        assert rebuild(chunked(DOCUMENT, size), depth) == expected, size
+
+
+def test_events_follow_the_depth():
+    events = list(iter_json_events([b'{"MOZ": [{"a": 1}, 2], "PPT": "x"}'], depth=2))
+
+    assert events == [
+        ('start', (), '{'),
+        ('start', ('MOZ',), '['),
+        ('value', ('MOZ', 0), {'a': 1}),
+        ('value', ('MOZ', 1), 2),
+        ('end', ('MOZ',), None),
+        ('value', ('PPT',), 'x'),
+        ('end', (), None),
+    ]
+
+
+def test_surrogate_pair_split_inside_escape():
+    document = b'["\\ud83d\\udea2"]'
+    for cut in range(1, len(document)):
+        events = list(iter_json_events([document[:cut], document[cut:]], depth=1))
+        assert events[1] == ('value', (0,), '\U0001f6a2')
+
+
+@pytest.mark.parametrize('literal', ['true', 'false', 'null', '-12.5e-3', '1234567', '0'])
+def test_scalars_split_across_chunks(literal):
+    expected = json.loads(literal)
+    data = f'[{literal}]'.encode()
+    for cut in range(1, len(data)):
+        assert list(iter_json_events([data[:cut], data[cut:]], depth=1))[1] == ('value', (0,), expected)
+    # A number ending the document is not cut short
+    assert list(iter_json_events([literal[:1].encode(), literal[1:].encode()], depth=0)) == [
+        ('value', (), expected)
+    ]
+
+
+def test_multibyte_character_split_across_chunks():
+    data = '{"vessel": "Tūrai"}'.encode('utf-8')
+    cut = data.index('ū'.encode('utf-8')) + 1
+    assert rebuild([data[:cut], data[cut:]], depth=1) == {'vessel': 'Tūrai'}
+
+
+@pytest.mark.parametrize('document', [
+    '', '{', '{"a"', '{"a":', '{"a": 1', '[1, 2', '["abc', '{"a": tru', '[1,',
+])
+def test_truncated_input_is_rejected(document):
+    for depth in (0, 1, 3):
+        with pytest.raises(ValueError, match='tronqué'):
+            list(iter_json_events(chunked(document, 2) if document else [], depth))
+
+
+@pytest.mark.parametrize('document', [
+    '{1: 2}', '{"a" 1}', '[1 2]', '{"a": 1,}', '[1,]', '{"a": nope}', '[1] [2]', '{"a": 1]',
+])
+def test_invalid_input_is_rejected(document):
+    for depth in (0, 1, 3):
+        with pytest.raises(ValueError):
+            list(iter_json_events(chunked(document, 3), depth))
@@ -0,0 +1,97 @@
+"""
+Adaptive refresh deadlines of the daemon mode
+"""
+
+from refresh_scheduler import RefreshScheduler
+
+
+def make_scheduler() -> RefreshScheduler:
+    return RefreshScheduler(base_interval=10.0, max_interval=100.0, distance_factor=2.0, backoff_factor=3.0)
+
+
+def test_new_keys_are_due_immediately():
+    scheduler = make_scheduler()
+
+    added = scheduler.sync([('near', 0), ('far', 2), ('static', None)], now=0.0)
+
+    assert added == ['near', 'far', 'static']
+    assert scheduler.due(now=0.0) == ['near', 'far', 'static']
+    assert scheduler.sync([('near', 0)], now=1.0) == []
+
+
+def test_interval_grows_with_distance_and_is_capped():
+    scheduler = make_scheduler()
+
+    assert [scheduler.initial_interval(distance) for distance in range(5)] == [10.0, 20.0, 40.0, 80.0, 100.0]
+
+
+def test_unchanged_payloads_back_off_and_changes_reset():
+    scheduler = make_scheduler()
+    scheduler.sync([('week', 1)], now=0.0)
+
+    scheduler.record('week', changed=False, now=0.0)
+    assert scheduler.next_due() == 60.0
+    scheduler.record('week', changed=False, now=60.0)
+    assert scheduler.next_due() == 160.0
+    assert scheduler.due(now=159.0) == []
+    assert scheduler.due(now=160.0) == ['week']
+
+    scheduler.record('week', changed=True, now=160.0)
+    assert scheduler.next_due() == 180.0
+
+
+def test_failure_retries_after_initial_interval():
+    scheduler = make_scheduler()
+    scheduler.sync([('week', 1)], now=0.0)
+    scheduler.record('week', changed=False, now=0.0)
+
+    scheduler.record('week', changed=False, success=False, now=60.0)
+
+    assert scheduler.next_due() == 80.0
+
+
+def test_static_keys_are_due_once_unless_they_fail():
+    scheduler = make_scheduler()
+    scheduler.sync([('static', None)], now=0.0)
+
+    scheduler.record('static', changed=True, success=False, now=0.0)
+    assert scheduler.next_due() == 10.0
+
+    scheduler.record('static', changed=True, now=10.0)
+    assert scheduler.next_due() is None
+    assert scheduler.due(now=1e9) == []
+
+
+def test_week_becoming_nearer_is_not_refreshed_later():
+    scheduler = make_scheduler()
+    scheduler.sync([('week', 3)], now=0.0)
+    scheduler.record('week', changed=False, now=0.0)
+    assert scheduler.next_due() == 100.0
+
+    # A week later, the same week is the next one
+    scheduler.sync([('week', 1)], now=5.0)
+
+    assert scheduler.next_due() == 25.0
+
+
+def test_missing_keys_are_forgotten():
+    scheduler = make_scheduler()
+    scheduler.sync([('old', 0), ('kept', 0)], now=0.0)
+
+    scheduler.sync([('kept', 0)], now=1.0)
+    scheduler.record('old', changed=True, now=1.0)
+
+    assert scheduler.due(now=1.0) == ['kept']
+    assert list(scheduler.describe(now=1.0)) == ['kept']
+
+
+def test_describe_reports_interval_and_remaining_time():
+    scheduler = make_scheduler()
+    scheduler.sync([(('c0', 47, 2025), 0), ('static', None)], now=0.0)
+    scheduler.record(('c0', 47, 2025), changed=True, now=0.0)
+    scheduler.record('static', changed=True, now=0.0)
+
+    assert scheduler.describe(now=4.0) == {
+        'c0/47/2025': {'interval': 10.0, 'dueIn': 6.0},
+        'static': {'interval': None, 'dueIn': None}
+    }
@@ -0,0 +1,73 @@
+"""
+Run instrumentation: stages, requests and weeks written to run_report.json
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from fetch_schedules import fetch_all_schedules, get_horizon_weeks
+from firebase_standin import FirebaseStandin, generate_week_payload
+from run_report import RunReport
+
+
+def test_stage_keeps_its_counters_and_error():
+    report = RunReport()
+
+    with report.stage('fetch') as stage:
+        stage['weeks'] = 2
+    with pytest.raises(RuntimeError):
+        with report.stage('render'):
+            raise RuntimeError("boom")
+
+    assert report.stages['fetch']['weeks'] == 2
+    assert report.stages['fetch']['seconds'] >= 0
+    assert report.stages['render']['error'] == 'boom'
+    assert 'seconds' in report.stages['render']
+
+
+def test_totals(tmp_path):
+    report = RunReport()
+    report.extra['horizonWeeks'] = 2
+    report.record_request(company='a', bytes=100, cache='miss')
+    report.record_request(company='a', bytes=0, cache='hit')
+    report.record_request(company='b', bytes=0, cache='fresh')
+    report.record_request(company='c', error='503')
+    report.record_week(company='a', week=47, year=2025, records=12)
+    report.record_week(company='c', week=47, year=2025, success=False)
+
+    filename = tmp_path / 'run_report.json'
+    report.write(str(filename), success=False)
+
+    written = json.loads(filename.read_text(encoding='utf-8'))
+    assert written['success'] is False
+    assert written['horizonWeeks'] == 2
+    assert written['totals'] == {'requests': 4, 'bytes': 100, 'cacheHits': 2, 'errors': 1, 'records': 12}
+    assert len(written['weeks']) == 2
+
+
+@pytest.mark.usefixtures('isolated_fetch')
+def test_run_writes_its_report():
+    horizon = get_horizon_weeks(datetime.now(), 2)
+    calendar = {}
+    for week, year in horizon:
+        calendar.setdefault(year, {})[week] = generate_week_payload(0, year, week, 3)
+    with FirebaseStandin(calendar) as server:
+        with open('companies.json', 'w', encoding='utf-8') as f:
+            json.dump({'companies': [
+                {'id': 'ferry', 'name': 'Ferry', 'firebase': {'databaseURL': server.url}}
+            ]}, f)
+
+        assert fetch_all_schedules(weeks=2) == 0
+
+    with open('run_report.json', encoding='utf-8') as f:
+        report = json.load(f)
+    assert report['success'] is True
+    assert report['horizonWeeks'] == 2
+    assert {'config', 'fetch'} <= set(report['stages'])
+    assert [(r['company'], r['status']) for r in report['requests']] == [('ferry', 200)] * len(report['requests'])
+    assert report['totals']['bytes'] > 0
+    assert sorted((w['week'], w['year']) for w in report['weeks']) == sorted(horizon)
+    assert all(w['success'] and w['records'] > 0 for w in report['weeks'])
+    assert report['totals']['records'] == sum(w['records'] for w in report['weeks'])
@@ -0,0 +1,75 @@
+"""
+SQLite archive: per-run counts of added, updated and removed departures
+"""
+
+from datetime import datetime
+
+import pytest
+
+from schedule_archive import ScheduleArchive
+from schedule_model import Departure, to_epoch_minutes
+
+
+# ISO week 48 of 2025 starts on Monday 24 November
+COVERED = [('Aremiti', 48, 2025)]
+
+
+def make_departure(hour: int, status=3, day: int = 24, month: int = 11) -> Departure:
+    return Departure(to_epoch_minutes(datetime(2025, month, day, hour)), 'PPT', 'MOZ',
+                     'Aremiti 5', 'Aremiti', status, False)
+
+
+def counts(stats):
+    return stats['added'], stats['updated'], stats['removed']
+
+
+@pytest.fixture
+def archive(tmp_path):
+    with ScheduleArchive(str(tmp_path / 'archive.sqlite')) as archive:
+        yield archive
+
+
+def test_identical_run_changes_nothing(archive):
+    departures = [make_departure(7), make_departure(9)]
+    assert counts(archive.record_run(departures, COVERED)) == (2, 0, 0)
+
+    stats = archive.record_run(departures, COVERED)
+
+    assert counts(stats) == (0, 0, 0) and stats['records'] == 2
+    assert archive.changes_since(stats['id'] - 1) == {'added': [], 'updated': [], 'removed': []}
+
+
+def test_changed_departure_is_updated(archive):
+    first = archive.record_run([make_departure(7), make_departure(9)], COVERED)
+
+    stats = archive.record_run([make_departure(7, status=0), make_departure(9)], COVERED)
+
+    assert counts(stats) == (0, 1, 0)
+    assert archive.changes_since(first['id'])['updated'] == [make_departure(7, status=0)]
+
+
+def test_removed_departure_is_kept_as_removed(archive):
+    first = archive.record_run([make_departure(7), make_departure(9)], COVERED)
+
+    stats = archive.record_run([make_departure(7)], COVERED)
+
+    assert counts(stats) == (0, 0, 1)
+    assert archive.changes_since(first['id'])['removed'] == [make_departure(9)]
+    start, end = datetime(2025, 11, 24), datetime(2025, 11, 25)
+    assert archive.departures_between(start, end) == [make_departure(7)]
+    assert archive.departures_between(start, end, include_removed=True) == [make_departure(7),
+                                                                            make_departure(9)]
+
+    # A departure coming back counts as updated, not as a new one
+    assert counts(archive.record_run([make_departure(7), make_departure(9)], COVERED)) == (0, 1, 0)
+
+
+def test_uncovered_weeks_are_left_alone(archive):
+    archive.record_run([make_departure(7), make_departure(9, day=1, month=12)], [('Aremiti', 48, 2025),
+                                                                         ('Aremiti', 49, 2025)])
+
+    # Week 49 (1 December) was not fetched this time: its departure stays
+    stats = archive.record_run([make_departure(7)], COVERED)
+
+    assert counts(stats) == (0, 0, 0)
+    assert [run['records'] for run in archive.runs()] == [1, 2]
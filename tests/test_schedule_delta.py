@@ -0,0 +1,80 @@
+"""
+Schedule deltas: added, removed, retimed and updated departures
+"""
+
+from datetime import datetime
+
+from schedule_delta import build_changes, diff_departures
+from schedule_model import Departure, to_epoch_minutes
+
+
+def make_departure(hour: int, minute: int = 0, vessel: str = 'Aremiti 5', status=3,
+                   stale: bool = False, day: int = 24) -> Departure:
+    return Departure(to_epoch_minutes(datetime(2025, 11, day, hour, minute)), 'PPT', 'MOZ',
+                     vessel, 'Aremiti', status, stale)
+
+
+def test_identical_schedules_have_no_changes():
+    old = [make_departure(7), make_departure(9)]
+    diff = diff_departures(old, [make_departure(9), make_departure(7)])
+
+    assert diff == {'added': [], 'removed': [], 'retimed': [], 'updated': []}
+
+
+def test_added_and_removed_departures():
+    old = [make_departure(7), make_departure(9, vessel='Terevau')]
+    new = [make_departure(7), make_departure(11, vessel='Tūrai')]
+
+    diff = diff_departures(old, new)
+
+    assert diff['added'] == [make_departure(11, vessel='Tūrai')]
+    assert diff['removed'] == [make_departure(9, vessel='Terevau')]
+    assert diff['retimed'] == [] and diff['updated'] == []
+
+
+def test_shifted_departure_is_retimed():
+    old = [make_departure(7), make_departure(9)]
+    new = [make_departure(7), make_departure(9, 30)]
+
+    diff = diff_departures(old, new)
+
+    assert diff['retimed'] == [(make_departure(9), make_departure(9, 30))]
+    assert diff['added'] == [] and diff['removed'] == []
+
+
+def test_move_to_another_day_is_not_a_retime():
+    diff = diff_departures([make_departure(9)], [make_departure(9, day=25)])
+
+    assert diff['added'] == [make_departure(9, day=25)]
+    assert diff['removed'] == [make_departure(9)]
+    assert diff['retimed'] == []
+
+
+def test_status_change_is_updated():
+    diff = diff_departures([make_departure(7), make_departure(9)], [make_departure(7, status=0),
+                                                                  make_departure(9)])
+
+    assert diff['updated'] == [make_departure(7, status=0)]
+    assert diff['added'] == [] and diff['removed'] == [] and diff['retimed'] == []
+
+
+def test_staleness_alone_is_not_a_change():
+    old = [make_departure(hour) for hour in (7, 9, 11)]
+    new = [make_departure(hour, stale=True) for hour in (7, 9, 11)]
+
+    diff = diff_departures(old, new)
+
+    assert diff == {'added': [], 'removed': [], 'retimed': [], 'updated': []}
+    assert diff_departures(new, old) == diff
+
+
+def test_changes_document_lists_records():
+    diff = diff_departures([make_departure(9)], [make_departure(9, 15), make_departure(12)])
+
+    changes = build_changes(diff, 'base', 'target')
+
+    assert (changes['base'], changes['target']) == ('base', 'target')
+    assert [record['heure'] for record in changes['added']] == ['12:00']
+    assert [(entry['from']['heure'], entry['to']['heure']) for entry in changes['retimed']] == [
+        ('09:00', '09:15')
+    ]
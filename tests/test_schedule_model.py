@@ -0,0 +1,103 @@
+"""
+Departure records and their serialized forms
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from schedule_model import (
+    Departure, configure_routes, get_payload_keys, get_ports, get_routes, parse_port, route_id, to_epoch_minutes
+)
+from schedule_pipeline import iter_departures
+
+COMPANY = {'id': 'ferry', 'name': 'Ferry'}
+
+
+@pytest.fixture
+def tahiti_routes():
+    """Routes of companies.json serving a third port, restored to the defaults afterwards"""
+    routes = configure_routes([
+        {'origin': 'PPT', 'destination': 'MOZ', 'label': 'Papeete → Moorea'},
+        {'origin': 'MOZ', 'destination': 'PPT'},
+        {'id': 'navette', 'origin': 'PPT', 'destination': 'TAH', 'staticSection': 'Navette'}
+    ])
+    yield routes
+    configure_routes()
+
+
+@pytest.mark.parametrize('status, stale', [('active', False), (2, True)])
+def test_departure_roundtrips(status, stale):
+    departure = Departure(to_epoch_minutes(datetime(2025, 11, 30, 23, 45)), 'MOZ', 'PPT',
+                          'Aremiti 5', 'Aremiti', status, stale)
+
+    record = json.loads(json.dumps(departure.to_record()))
+    row = json.loads(json.dumps(departure.to_row()))
+
+    assert Departure.from_record(record) == departure
+    assert Departure.from_row(row) == departure
+    assert record['date'] == '2025-11-30'
+    assert record['jour'] == 'Sunday'
+    assert record['heure'] == '23:45'
+    assert record['timestamp'] == '2025-11-30T23:45:00'
+    assert record.get('perime', False) is stale
+
+
+def test_record_without_port_is_skipped():
+    assert Departure.from_record({'origine': '', 'destination': 'MOZ', 'timestamp': '2025-11-30T08:00:00',
+                                  'bateau': 'Terevau', 'compagnie': 'Terevau'}) is None
+
+
+def test_port_codes_are_shared():
+    code = ''.join(['P', 'P', 'T'])
+    departure = Departure(0, code, 'MOZ', 'Terevau', 'Terevau')
+
+    assert departure.origin is parse_port('PPT')
+    assert parse_port('XYZ') is None
+
+
+def test_configured_routes(tahiti_routes):
+    assert [(route.id, route.label, route.static_section) for route in get_routes()] == [
+        ('PPT-MOZ', 'Papeete → Moorea', None),
+        ('MOZ-PPT', 'MOZ → PPT', None),
+        ('navette', 'PPT → TAH', 'Navette')
+    ]
+    assert get_ports() == ['PPT', 'MOZ', 'TAH']
+    assert get_payload_keys() == ['MOZ', 'PPT', 'TAH']
+    assert route_id('PPT', 'TAH') == 'navette'
+    assert route_id('TAH', 'PPT') == 'TAH-PPT'
+
+
+def test_payloads_follow_the_configured_routes(tahiti_routes):
+    payload = {'TAH': [{
+        'a': {'day': 0, 'timeBegin': 3600, 'origin': 'PPT', 'destination': 'TAH'},
+        'b': {'day': 0, 'timeBegin': 7200, 'origin': 'PPT', 'destination': 'RAI'}
+    }]}
+
+    departures = list(iter_departures(payload, 47, 2025, COMPANY))
+
+    # Ports no configured route serves are skipped
+    assert [route_id(d.origin, d.destination) for d in departures] == ['navette']
+
+
+def test_default_routes_are_restored():
+    configure_routes([{'origin': 'PPT', 'destination': 'TAH'}])
+    assert parse_port('MOZ') is None
+
+    configure_routes()
+
+    assert [route.id for route in get_routes()] == ['PPT-MOZ', 'MOZ-PPT']
+    assert parse_port('TAH') is None
+
+
+@pytest.mark.parametrize('routes', [
+    [{'origin': 'PPT'}],
+    [{'origin': 'PPT', 'destination': 'MOZ'}, {'origin': 'PPT', 'destination': 'MOZ', 'id': 'bis'}],
+    [{'origin': 'PPT', 'destination': 'MOZ'}, {'origin': 'MOZ', 'destination': 'PPT', 'id': 'PPT-MOZ'}]
+])
+def test_invalid_routes_are_rejected(routes):
+    with pytest.raises(ValueError):
+        configure_routes(routes)
+    # The previous routes are kept
+    assert [route.id for route in get_routes()] == ['PPT-MOZ', 'MOZ-PPT']
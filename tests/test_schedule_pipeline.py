@@ -0,0 +1,151 @@
+"""
+Normalization of week payloads, and the overlapped normalization stage
+"""
+
+import copy
+import json
+import os
+import random
+import threading
+from datetime import datetime
+
+import pytest
+
+from firebase_standin import generate_week_payload
+from schedule_model import Departure, to_epoch_minutes
+from schedule_pipeline import (
+    OverlappedNormalizer, iter_departures, merge_departures, merge_timelines, split_directions
+)
+
+
+COMPANY = {'id': 'c0', 'name': 'Comp0'}
+
+
+def test_normalization_leaves_the_payload_untouched():
+    payload = generate_week_payload(0, 2025, 47, 3)
+    for day in payload['MOZ']:
+        for schedule in day.values():
+            schedule.pop('vessel', None)
+    original = copy.deepcopy(payload)
+
+    departures = list(iter_departures(payload, 47, 2025, COMPANY))
+
+    assert payload == original
+    assert departures and list(iter_departures(payload, 47, 2025, COMPANY)) == departures
+    # Without a vessel field, the company name stands in for the vessel
+    assert {d.vessel for d in departures if d.destination == 'MOZ'} == {'Comp0'}
+
+
+def test_vessel_name_is_extracted_from_the_vessel_field():
+    payload = {'MOZ': [{'a': {'day': 0, 'timeBegin': 3600, 'origin': 'PPT', 'destination': 'MOZ',
+                              'vessel': 'Aremiti 5 (navette)'}}]}
+
+    departure, = iter_departures(payload, 47, 2025, COMPANY)
+
+    assert departure.vessel == 'Aremiti 5'
+    assert 'vessel_name' not in payload['MOZ'][0]['a']
+
+
+def random_week(rng: random.Random, company: str, week_start: int):
+    ports = ['PPT', 'MOZ', 'TAH']
+    departures = []
+    for _ in range(rng.randint(0, 60)):
+        origin, destination = rng.sample(ports, 2)
+        # Coarse minutes, so that departures often share the same minute
+        minute = week_start + rng.randrange(0, 7 * 1440, 30)
+        departures.append(Departure(minute, origin, destination, f"Bateau {rng.randint(1, 3)}", company))
+    return departures
+
+
+def minute_and_identity(departures):
+    return [(d.minute, id(d)) for d in departures]
+
+
+def test_merges_match_sorted():
+    rng = random.Random(7)
+    start = to_epoch_minutes(datetime(2025, 11, 24))
+    weeks = [random_week(rng, f"Compagnie {company}", start + week * 7 * 1440)
+             for company in range(5) for week in range(4)]
+    # Weeks arrive in any order, and each is split and sorted on its own
+    rng.shuffle(weeks)
+
+    timelines = merge_timelines(split_directions(week) for week in weeks)
+    unified = merge_departures(timelines)
+
+    every = [d for week in weeks for d in week]
+    assert sorted(map(id, unified)) == sorted(map(id, every))
+    assert [d.minute for d in unified] == sorted(d.minute for d in every)
+    for route, timeline in timelines.items():
+        expected = sorted((d for d in every if f"{d.origin}-{d.destination}" == route),
+                          key=lambda d: d.minute)
+        # Stable like sorted(): same-minute departures keep the order of their weeks
+        assert minute_and_identity(timeline) == minute_and_identity(expected)
+    assert minute_and_identity(unified) == minute_and_identity(
+        sorted((d for timeline in timelines.values() for d in timeline), key=lambda d: d.minute)
+    )
+    # Configured routes come first, in configuration order
+    assert list(timelines)[:2] == ['PPT-MOZ', 'MOZ-PPT']
+
+
+def make_result(week: int) -> dict:
+    return {'success': True, 'company': COMPANY, 'week': week, 'year': 2025,
+            'data': generate_week_payload(0, 2025, week, 1)}
+
+
+def save_snapshot(result, snapshot_writer):
+    snapshot_writer.end(result)
+
+
+def test_close_waits_for_every_snapshot(tmp_path):
+    seen = []
+
+    def process(result, snapshot_writer):
+        seen.append((result['week'], threading.current_thread().name))
+        save_snapshot(result, snapshot_writer)
+
+    normalizer = OverlappedNormalizer(process, str(tmp_path))
+    normalizer.submit([make_result(week) for week in (1, 2)])
+    normalizer.submit([make_result(3)])
+    normalizer.close()
+
+    assert seen == [(1, 'normalize'), (2, 'normalize'), (3, 'normalize')]
+    assert normalizer.processed == 3
+    for week in (1, 2, 3):
+        with open(tmp_path / f"c0_week{week}.json", encoding='utf-8') as f:
+            assert json.load(f)['data'] == make_result(week)['data']
+    assert not any(thread.is_alive() for thread in normalizer._threads)
+
+
+def test_close_without_results_stops_the_threads(tmp_path):
+    normalizer = OverlappedNormalizer(save_snapshot, str(tmp_path))
+    normalizer.close()
+
+    assert normalizer.processed == 0
+    assert not any(thread.is_alive() for thread in normalizer._threads)
+
+
+def test_worker_error_is_raised_by_close(tmp_path):
+    def process(result, snapshot_writer):
+        if result['week'] == 2:
+            raise ValueError("payload illisible")
+        save_snapshot(result, snapshot_writer)
+
+    normalizer = OverlappedNormalizer(process, str(tmp_path))
+    normalizer.submit([make_result(week) for week in (1, 2, 3)])
+
+    with pytest.raises(ValueError, match="payload illisible"):
+        normalizer.close()
+    # The other results were still normalized and saved
+    assert normalizer.processed == 2
+    assert sorted(os.listdir(tmp_path)) == ['c0_week1.json', 'c0_week3.json']
+
+
+def test_writer_error_is_raised_by_close(tmp_path):
+    blocked = tmp_path / 'data'
+    blocked.write_text('not a directory')
+    normalizer = OverlappedNormalizer(save_snapshot, str(blocked))
+    normalizer.submit([make_result(1)])
+
+    with pytest.raises(OSError):
+        normalizer.close()
+    assert not any(thread.is_alive() for thread in normalizer._threads)
@@ -0,0 +1,91 @@
+"""
+Indexed queries and the query subcommand, around midnight and the end of
+the week
+"""
+
+import json
+from datetime import date, datetime
+
+import pytest
+
+from fetch_schedules import main
+from schedule_model import Departure, Port, to_epoch_minutes
+from schedule_query import ScheduleIndex
+
+
+def make_departure(day: int, hour: int, minute: int = 0, origin: Port = 'PPT',
+                   destination: Port = 'MOZ', vessel: str = 'Aremiti 5') -> Departure:
+    # November 2025: Sunday the 30th ends ISO week 48, Monday 1 December starts week 49
+    month, day = (12, day - 30) if day > 30 else (11, day)
+    return Departure(to_epoch_minutes(datetime(2025, month, day, hour, minute)), origin, destination,
+                     vessel, 'Aremiti')
+
+
+DEPARTURES = [
+    make_departure(29, 23, 45),
+    make_departure(30, 6), make_departure(30, 23, 30),
+    make_departure(30, 22, origin='MOZ', destination='PPT', vessel='Terevau'),
+    make_departure(31, 0, 15), make_departure(31, 5, 40),
+    make_departure(31, 6, origin='MOZ', destination='PPT', vessel='Terevau'),
+]
+
+
+@pytest.fixture
+def index():
+    # Insertion order does not matter
+    return ScheduleIndex(list(reversed(DEPARTURES)))
+
+
+def times(departures):
+    return [d.departure_time.strftime('%d %H:%M') for d in departures]
+
+
+def test_next_departures_cross_midnight(index):
+    departures = index.next_departures('PPT', datetime(2025, 11, 29, 23, 50), n=3)
+
+    assert times(departures) == ['30 06:00', '30 23:30', '01 00:15']
+
+
+def test_next_departures_cross_the_end_of_the_week(index):
+    departures = index.next_departures('PPT', datetime(2025, 11, 30, 23, 31), n=5)
+
+    assert times(departures) == ['01 00:15', '01 05:40']
+
+
+def test_departure_at_the_start_time_is_included(index):
+    assert times(index.next_departures('PPT', datetime(2025, 11, 30, 23, 30), n=1)) == ['30 23:30']
+
+
+def test_next_departures_merge_destinations(index):
+    index = ScheduleIndex(DEPARTURES + [make_departure(31, 0, 10, destination='TAH')])
+
+    departures = index.next_departures('PPT', datetime(2025, 11, 30, 23, 31), n=2)
+
+    assert [(d.destination, d.departure_time.strftime('%H:%M')) for d in departures] == [
+        ('TAH', '00:10'), ('MOZ', '00:15')
+    ]
+    assert times(index.next_departures('PPT', datetime(2025, 11, 30, 23, 31), n=5,
+                                       destination='MOZ')) == ['01 00:15', '01 05:40']
+
+
+def test_nothing_after_the_last_departure(index):
+    assert index.next_departures('PPT', datetime(2025, 12, 1, 6), n=5) == []
+
+
+def test_day_and_vessel_queries(index):
+    assert times(index.departures_on(date(2025, 11, 30))) == ['30 06:00', '30 22:00', '30 23:30']
+    assert times(index.departures_on(date(2025, 11, 30), 'MOZ-PPT')) == ['30 22:00']
+    assert times(index.by_vessel('terevau', datetime(2025, 11, 30, 23))) == ['01 06:00']
+
+
+def test_query_subcommand(tmp_path, capsys):
+    filename = tmp_path / 'horaires.json'
+    filename.write_text(json.dumps([d.to_record() for d in DEPARTURES]), encoding='utf-8')
+
+    assert main(['query', '--file', str(filename), '--json', 'next', 'ppt',
+                 '--after', '2025-11-30T23:31', '-n', '1']) == 0
+    record, = json.loads(capsys.readouterr().out)
+    assert (record['date'], record['heure'], record['origine']) == ('2025-12-01', '00:15', 'PPT')
+
+    assert main(['query', '--file', str(filename), 'next', 'XYZ']) == 1
+    assert 'Port inconnu' in capsys.readouterr().out
@@ -0,0 +1,40 @@
+"""
+Sharded outputs: content-addressed names and retention of the previous
+generation
+"""
+
+import os
+from datetime import datetime
+
+from schedule_model import Departure, to_epoch_minutes
+from schedule_shards import MANIFEST_FILE, manifest_files, write_shards
+
+
+def make_departures(status: int):
+    return [Departure(to_epoch_minutes(datetime(2025, 11, 24, hour)), 'PPT', 'MOZ',
+                      'Aremiti 5', 'Aremiti', status, False) for hour in (7, 9)]
+
+
+def published(directory) -> set:
+    return {name for name in os.listdir(directory) if not name.endswith('.gz')} - {MANIFEST_FILE}
+
+
+def test_previous_generation_is_kept_for_one_run(tmp_path):
+    directory = str(tmp_path)
+    first = write_shards(make_departures(3), directory)
+    second = write_shards(make_departures(0), directory)
+
+    # Clients still holding the first manifest can fetch its shards
+    assert published(directory) == set(manifest_files(first)) | set(manifest_files(second))
+    assert all(os.path.exists(os.path.join(directory, f"{name}.gz")) for name in manifest_files(first))
+
+    third = write_shards(make_departures(1), directory)
+    assert published(directory) == set(manifest_files(second)) | set(manifest_files(third))
+
+
+def test_unchanged_schedule_keeps_its_names(tmp_path):
+    first = write_shards(make_departures(3), str(tmp_path))
+    second = write_shards(make_departures(3), str(tmp_path))
+
+    assert manifest_files(first) == manifest_files(second)
+    assert published(str(tmp_path)) == set(manifest_files(first))
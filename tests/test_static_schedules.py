@@ -0,0 +1,80 @@
+"""
+Static schedule files: weekly template and date-keyed exceptions
+"""
+
+import json
+
+import pytest
+
+from fetch_schedules import compile_static_schedules, project_static_week
+from schedule_pipeline import iter_departures
+
+
+REGULAR = {
+    'TahitiVersMoorea': {
+        'Lundi': ['05:40', '08:30'], 'Mardi': ['05:40', '08:30'], 'Mercredi': ['05:40', '08:30'],
+        'Jeudi': ['05:40', '08:30'], 'Vendredi': ['05:40', '08:30', '17:30'], 'Samedi': ['07:00'],
+        'Dimanche': ['07:00', '14:45']
+    },
+    'MooreaVersTahiti': {
+        'Lundi': ['07:15'], 'Mardi': ['07:15'], 'Mercredi': ['07:15'], 'Jeudi': ['07:15'],
+        'Vendredi': ['07:15'], 'Samedi': ['08:15'], 'Dimanche': ['13:30']
+    }
+}
+
+
+@pytest.fixture
+def make_company(tmp_path):
+    files = iter(range(100))
+
+    def make(exceptions):
+        # A new file each time: templates are memoized on path and mtime
+        path = tmp_path / f"horaires_{next(files)}.json"
+        path.write_text(json.dumps({'Ferry': dict(REGULAR, Exceptions=exceptions)}), encoding='utf-8')
+        return {'id': 'ferry', 'name': 'Ferry', 'staticSchedule': True, 'scheduleFile': str(path)}
+    return make
+
+
+def departures_by_day(company, week: int, year: int):
+    payload = project_static_week(compile_static_schedules(company), week, year)
+    days = {}
+    for departure in iter_departures(payload, week, year, company):
+        time = departure.departure_time
+        days.setdefault(time.date().isoformat(), []).append(
+            (departure.origin, time.strftime('%H:%M'))
+        )
+    return {day: sorted(times) for day, times in days.items()}
+
+
+def test_holiday_takes_the_schedule_of_another_day(make_company):
+    # Thursday 25 December 2025, in ISO week 52, runs the Sunday schedule
+    company = make_company({'2025-12-25': 'Dimanche'})
+
+    days = departures_by_day(company, 52, 2025)
+
+    assert days['2025-12-25'] == [('MOZ', '13:30'), ('PPT', '07:00'), ('PPT', '14:45')]
+    assert days['2025-12-24'] == [('MOZ', '07:15'), ('PPT', '05:40'), ('PPT', '08:30')]
+    assert days['2025-12-26'] == [('MOZ', '07:15'), ('PPT', '05:40'), ('PPT', '08:30'), ('PPT', '17:30')]
+
+
+def test_explicit_times_keep_routes_left_out(make_company):
+    company = make_company({'2025-12-31': {'TahitiVersMoorea': ['05:40']}})
+
+    days = departures_by_day(company, 1, 2026)
+
+    assert days['2025-12-31'] == [('MOZ', '07:15'), ('PPT', '05:40')]
+
+
+def test_empty_list_cancels_a_route(make_company):
+    company = make_company({'2025-12-31': {'MooreaVersTahiti': []}})
+
+    assert departures_by_day(company, 1, 2026)['2025-12-31'] == [('PPT', '05:40'), ('PPT', '08:30')]
+
+
+def test_override_outside_the_week_changes_nothing(make_company):
+    company = make_company({'2025-12-25': 'Dimanche'})
+    compiled = compile_static_schedules(company)
+
+    # Week 51 does not contain 25 December: it shares the regular template
+    assert project_static_week(compiled, 51, 2025) is compiled['data']
+    assert departures_by_day(company, 51, 2025) == departures_by_day(make_company({}), 51, 2025)